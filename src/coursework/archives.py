@@ -0,0 +1,128 @@
+"""
+archives.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Submission Archives
+
+A submission may be a single zip or tar archive instead of many files.
+Archives are extracted one entry at a time, and every limit is checked against the bytes
+actually written, so an archive cannot claim to be small and then fill the disk.
+"""
+
+from __future__ import annotations
+
+import stat
+import tarfile
+import zipfile
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from pathlib import PurePosixPath
+from typing import IO
+from typing import Callable
+from typing import Iterator
+
+MAX_SIZE = 64 * 1024 * 1024
+MAX_ENTRIES = 1000
+MAX_DEPTH = 8
+
+CHUNK_SIZE = 64 * 1024
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+# Operating systems leave these behind when making archives. They are never part of a submission.
+_IGNORED = ("__MACOSX", ".DS_Store")
+
+
+class ArchiveError(Exception):
+    """Raised if an archive cannot be extracted safely."""
+
+
+def is_archive(path: str | Path) -> bool:
+    """Check if the file is a supported archive, by its name."""
+
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def extract(
+    archive: Path,
+    destination: Path,
+    max_size: int = MAX_SIZE,
+    max_entries: int = MAX_ENTRIES,
+    max_depth: int = MAX_DEPTH,
+) -> list[Path]:
+    """
+    Extract the archive into the destination directory, returning the extracted files.
+
+    Submissions are flat, so every file is extracted by its base name and directories are dropped.
+    Two files with the same base name, links, and special files are errors,
+    as is an entry escaping the archive, or going over any of the limits.
+    """
+
+    files = []
+    written = 0
+
+    with _entries(archive) as entries:
+        for count, (name, is_file, is_dir, open_entry) in enumerate(entries, start=1):
+            if count > max_entries:
+                raise ArchiveError(f"{archive.name} has more than {max_entries} entries.")
+
+            path = PurePosixPath(name.replace("\\", "/"))
+            if path.is_absolute() or ".." in path.parts:
+                raise ArchiveError(f"{name} is outside of the archive.")
+            if len(path.parts) > max_depth:
+                raise ArchiveError(f"{name} is nested more than {max_depth} directories deep.")
+            if is_dir or any(part in _IGNORED for part in path.parts):
+                continue
+            if not is_file:
+                raise ArchiveError(f"{name} is not a regular file.")
+
+            target = destination / path.name
+            if target.exists():
+                raise ArchiveError(f"{path.name} appears more than once in {archive.name}.")
+
+            with open_entry() as source, target.open("wb") as out:
+                while chunk := source.read(CHUNK_SIZE):
+                    written += len(chunk)
+                    if written > max_size:
+                        raise ArchiveError(f"{archive.name} is larger than {max_size} bytes when extracted.")
+                    out.write(chunk)
+
+            files.append(target)
+
+    return files
+
+
+@contextmanager
+def _entries(archive: Path) -> Iterator[Iterator[tuple[str, bool, bool, Callable[[], IO[bytes]]]]]:
+    """Open the archive, yielding its entries as (name, is file, is directory, opener) in archive order."""
+
+    try:
+        if zipfile.is_zipfile(archive):
+            with zipfile.ZipFile(archive) as zf:
+                yield (
+                    (info.filename, _is_zip_file(info), info.is_dir(), lambda info=info: zf.open(info))
+                    for info in zf.infolist()
+                )
+        elif tarfile.is_tarfile(archive):
+            # Streaming mode reads the archive front to back, without ever seeking back.
+            with tarfile.open(archive, "r|*") as tf:
+                yield (
+                    (member.name, member.isfile(), member.isdir(), lambda member=member: tf.extractfile(member))
+                    for member in tf
+                )
+        else:
+            raise ArchiveError(f"{archive.name} is not a zip or tar archive.")
+    except (zipfile.BadZipFile, tarfile.TarError, zlib.error, EOFError) as e:
+        raise ArchiveError(f"{archive.name} is damaged: {e}") from e
+    except (RuntimeError, NotImplementedError) as e:
+        # Zip files raise these for encrypted entries, and for compression methods that are not supported.
+        raise ArchiveError(f"{archive.name} cannot be extracted: {e}") from e
+
+
+def _is_zip_file(info: zipfile.ZipInfo) -> bool:
+    # Zip files made on Unix keep the file mode in the high bits, which is how symlinks are recorded.
+    # Plenty of tools leave the file type out entirely, which means a regular file.
+    file_type = stat.S_IFMT(info.external_attr >> 16)
+    return not info.is_dir() and file_type in (0, stat.S_IFREG)
@@ -0,0 +1,184 @@
+"""
+buildcache.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Build Cache
+
+Assignments in compiled languages build the submitted files before testing them.
+Builds are cached by a hash of the build command and the submitted files, in the spirit of ccache,
+so regrading, or resubmitting identical files, restores the last build instead of building again.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+from contextlib import contextmanager
+from os import rename
+from os import replace
+from os import utime
+from pathlib import Path
+from shutil import copy2
+from shutil import rmtree
+from tempfile import mkdtemp
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+
+from coursework.loaders import Configuration
+
+
+class BuildCache:
+    """
+    # BuildCache.
+
+    A directory of cached builds, each a directory named by its key holding the build's artifacts.
+    Using a build refreshes its modification time, and once the cache grows past `max_size` bytes
+    the least recently used builds are removed. The size of the cache is recorded in `.size`.
+    """
+
+    def __init__(self, path: str | Path, max_size: int):
+        self.path = Path(path)
+        self.max_size = max_size
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config: Configuration) -> BuildCache | None:
+        """Open the build cache defined by the configuration, if there is one."""
+
+        return cls(config.build_cache, config.build_cache_size) if config.build_cache else None
+
+    def key(self, command: str, files: Iterable[Path]) -> str:
+        """The key of building the files with the command. Only the files' names and contents matter."""
+
+        digest = hashlib.sha256(command.encode() + b"\0")
+        for file in sorted(files, key=lambda file: file.name):
+            with file.open("rb") as f:
+                digest.update(f"{file.name}\0{hashlib.file_digest(f, 'sha256').hexdigest()}\0".encode())
+
+        return digest.hexdigest()
+
+    def restore(self, key: str, destination: Path) -> bool:
+        """
+        Copy the cached build's artifacts into the destination, if the build is cached.
+
+        The artifacts are copied into a staging directory in the destination, and only moved into place
+        once all of them have been, so a build evicted part way through leaves nothing behind.
+        A cached build without any artifacts is never restored, since it would stand in for a build that was not run.
+        """
+
+        entry = self.path / key
+        try:
+            utime(entry)
+            inode = entry.stat().st_ino
+        except FileNotFoundError:
+            return False
+
+        staging_path = Path(mkdtemp(prefix=".build-", dir=destination))
+        try:
+            artifacts = [artifact for artifact in entry.rglob("*") if artifact.is_file()]
+            for artifact in artifacts:
+                target = staging_path / artifact.relative_to(entry)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                copy2(artifact, target)
+
+            # Listing a build that is evicted while being copied can quietly miss some of it.
+            if not artifacts or entry.stat().st_ino != inode:
+                return False
+
+            for artifact in staging_path.rglob("*"):
+                if artifact.is_file():
+                    target = destination / artifact.relative_to(staging_path)
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    replace(artifact, target)
+
+            return True
+        except FileNotFoundError:
+            return False
+        finally:
+            rmtree(staging_path, ignore_errors=True)
+
+    def store(self, key: str, root: Path, artifacts: Iterable[Path]) -> None:
+        """Cache the artifacts, kept at their paths relative to the root, as the build with the key."""
+
+        artifacts = list(artifacts)
+        if not artifacts:
+            return
+
+        temp_path = Path(mkdtemp(prefix=".", dir=self.path))
+        size = 0
+        try:
+            for artifact in artifacts:
+                target = temp_path / artifact.relative_to(root)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                copy2(artifact, target)
+                size += target.stat().st_size
+
+            rename(temp_path, self.path / key)
+        except OSError:
+            # Either the same build was cached by someone else first, or it could not be copied.
+            rmtree(temp_path, ignore_errors=True)
+            if (self.path / key).exists():
+                return
+            raise
+
+        with self._size() as (total, write):
+            write(None if total is None else total + size)
+
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used builds until the cache fits in its size, returning how many were.
+
+        The recorded size is kept up to date as builds are stored, so the cache is only walked once it is too big,
+        or if its size is not known.
+        """
+
+        with self._size() as (total, write):
+            if total is not None and total <= self.max_size:
+                return 0
+
+            entries = []
+            for entry in self.path.iterdir():
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    size = sum(file.stat().st_size for file in entry.rglob("*") if file.is_file())
+                    entries.append((entry.stat().st_mtime, entry, size))
+                except FileNotFoundError:
+                    continue
+
+            total = sum(size for _, _, size in entries)
+            removed = 0
+            for _, entry, size in sorted(entries):
+                if total <= self.max_size:
+                    break
+                # The build is moved aside before being removed, so it is never restored half removed.
+                doomed = Path(mkdtemp(prefix=".", dir=self.path))
+                rename(entry, doomed / entry.name)
+                rmtree(doomed, ignore_errors=True)
+                total -= size
+                removed += 1
+
+            write(total)
+
+        return removed
+
+    @contextmanager
+    def _size(self) -> Iterator[tuple[int | None, Callable[[int | None], None]]]:
+        """Lock the recorded size of the cache, yielding it (None if unknown) and a function to record a new one."""
+
+        with open(self.path / ".size", "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            contents = f.read().strip()
+
+            def write(total: int | None):
+                f.seek(0)
+                f.truncate()
+                if total is not None:
+                    f.write(str(total))
+
+            yield (int(contents) if contents.isdigit() else None), write
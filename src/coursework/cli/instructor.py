@@ -11,17 +11,24 @@ from io import BufferedReader
 from io import BytesIO
 from pathlib import Path
 from shutil import chown
+from typing import Callable
 
 import click
 from rich.console import Console
+from rich.markup import escape
 from rich.progress import track
+from rich.table import Table
 
 from coursework import report
 from coursework.cli import ContextObj
 from coursework.cli import converters
+from coursework.index import SubmissionIndex
 from coursework.loaders import Configuration
 from coursework.loaders import User
+from coursework.models import ResultFormatError
 from coursework.models import RunnerResult
+from coursework.models import load_results
+from coursework.store import BlobStore
 
 
 @click.group(name="coursework-admin")
@@ -60,6 +67,11 @@ def report_assignment(ctx: ContextObj, course: Configuration.Course, assignment:
     console = ctx["console"]
     user = ctx["user"]
 
+    # With an index, we know who submitted without touching every submission directory.
+    submitted = None
+    if submission_index := SubmissionIndex.from_config(config):
+        submitted = {submission.student for submission in submission_index.gradebook(course.name, assignment.name)}
+
     reports: list[BytesIO] = []
     for student in track(
         course.students, description="Generating for students...", total=len(course.students), console=console
@@ -69,11 +81,15 @@ def report_assignment(ctx: ContextObj, course: Configuration.Course, assignment:
         )
 
         with user.as_root():
-            if not submission_path.exists():
+            if not (student in submitted if submitted is not None else submission_path.exists()):
                 console.print(f"[bold red]{student} has not submitted {assignment.name}[/]")
                 continue
 
-            result = RunnerResult.from_pickle(submission_path / ".runner-output")
+            try:
+                result = RunnerResult.from_file(submission_path / ".runner-output", config)
+            except (OSError, ResultFormatError) as e:
+                console.print(f"[bold red]Cannot read {student}'s submission of {assignment.name}: {escape(str(e))}[/]")
+                continue
 
             reports.append(
                 (
@@ -96,6 +112,96 @@ def report_assignment(ctx: ContextObj, course: Configuration.Course, assignment:
     console.print("[bold green]Reports generated![/]")
 
 
+@cli.command("gradebook")
+@click.argument("course", type=converters.CourseParamType())
+@click.pass_obj
+def gradebook(ctx: ContextObj, course: Configuration.Course):
+    """Show the score of every student for every assignment in the given COURSE."""
+
+    config = ctx["config"]
+    console = ctx["console"]
+    user = ctx["user"]
+
+    if submission_index := SubmissionIndex.from_config(config):
+        scores = {
+            (submission.student, submission.assignment): f"{submission.score}/{submission.total_points}"
+            for submission in submission_index.gradebook(course.name)
+        }
+    else:
+        paths = {
+            Path(config.submission.format(student=student, course=course.name, assignment=assignment))
+            / ".runner-output": (student, assignment)
+            for student in course.students
+            for assignment in course.assignments
+        }
+        with user.as_root():
+            scores = {
+                paths[path]: f"{result.earned_points()}/{result.assignment.total_points}"
+                for path, result in load_results(paths, config, on_error=_show_damaged(console))
+            }
+
+    table = Table("Student", *course.assignments, title=f"Gradebook for {course.name}", expand=True, show_edge=False)
+    for student in course.students:
+        table.add_row(
+            f"[bold blue]{student}[/]",
+            *(scores.get((student, assignment), "[bold red]Missing[/]") for assignment in course.assignments),
+        )
+
+    console.print(table)
+
+
+@cli.command("gc")
+@click.option(
+    "--keep", type=click.IntRange(min=0), default=None, help="Only keep the newest KEEP attempts of each submission."
+)
+@click.pass_obj
+def gc(ctx: ContextObj, keep: int | None):
+    """Remove files from the submission store that no submission attempt references."""
+
+    config = ctx["config"]
+    console = ctx["console"]
+    user = ctx["user"]
+
+    if not (store := BlobStore.from_config(config)):
+        raise click.ClickException("No submission store is configured.")
+
+    with user.as_root():
+        removed_manifests, removed_blobs = store.gc(keep)
+
+    console.print(f"[bold green]Removed {removed_manifests} attempts and {removed_blobs} files![/]")
+
+
+@cli.group("index")
+def index():
+    """Manage the submission index."""
+
+
+@index.command("rebuild")
+@click.pass_obj
+def index_rebuild(ctx: ContextObj):
+    """Rebuild the submission index from the submission directories."""
+
+    config = ctx["config"]
+    console = ctx["console"]
+    user = ctx["user"]
+
+    with user.as_root():
+        if not (submission_index := SubmissionIndex.from_config(config)):
+            raise click.ClickException("No submission index is configured.")
+
+        indexed = submission_index.rebuild(config, on_error=_show_damaged(console))
+
+    console.print(f"[bold green]Indexed {indexed} submissions![/]")
+
+
+def _show_damaged(console: Console) -> Callable[[Path, Exception], None]:
+    # A damaged submission is skipped, so the instructor is told which one to look at.
+    def show(path: Path, error: Exception):
+        console.print(f"[bold red]Skipping {escape(str(path))}: {escape(str(error))}[/]")
+
+    return show
+
+
 @cli.command("edit")
 @click.pass_obj
 def edit(ctx: ContextObj):
@@ -6,11 +6,10 @@ Ian Kollipara <ian.kollipara@cune.edu>
 Student Cli commands
 """
 
+from contextlib import ExitStack
 from io import BufferedReader
 from pathlib import Path
-from shutil import chown
-from shutil import copy2
-from shutil import rmtree
+from tempfile import TemporaryDirectory
 
 import click
 from rich.columns import Columns
@@ -23,11 +22,15 @@ from rich.prompt import Prompt
 from rich.rule import Rule
 from rich.table import Table
 
+from coursework import archives
+from coursework import submissions
 from coursework.cli import ContextObj
 from coursework.cli import converters
 from coursework.loaders import Configuration
 from coursework.loaders import User
 from coursework.runner import get_runner_by_name
+from coursework.scheduler import Scheduler
+from coursework.scheduler import SchedulerFull
 
 # https://click.palletsprojects.com/en/stable/arguments/#multiple-arguments
 # Click represents an arbitrary number of arguments as -1.
@@ -116,7 +119,11 @@ def detail(ctx: ContextObj, course: Configuration.Course, assignment: Configurat
 def submit(
     ctx: ContextObj, course: Configuration.Course, assignment: Configuration.Assignment, files: tuple[Path, ...]
 ):
-    """Create a submission for the given ASSIGNMENT from its COURSE. You may submit 0 or more FILES with your submission."""
+    """
+    Create a submission for the given ASSIGNMENT from its COURSE. You may submit 0 or more FILES with your submission.
+
+    A single zip or tar archive is extracted, and its files are submitted instead.
+    """
 
     console = ctx["console"]
     config = ctx["config"]
@@ -126,11 +133,19 @@ def submit(
     with user.as_root():
         files = [f for f in files if f.exists() and not f.is_dir()]
 
+        # A single archive is submitted as the files inside it.
+        if len(files) == 1 and archives.is_archive(files[0]):
+            extracted = Path(click.get_current_context().with_resource(TemporaryDirectory()))
+            try:
+                files = archives.extract(files[0], extracted)
+            except archives.ArchiveError as e:
+                raise click.ClickException(str(e)) from e
+
     save_path = Path(
         config.submission.format(student=user.name, course=course.name, assignment=assignment.name)
     ).absolute()
 
-    # We do this check to avoid keeping files from a past submission.
+    # The previous submission is only replaced once the new one has been saved.
     with user.as_root():
         if save_path.exists():
             response = Prompt.ask(
@@ -141,24 +156,35 @@ def submit(
             )
             if response == "n":
                 exit(1)
-            else:
-                rmtree(save_path)
 
     runner = get_runner_by_name(assignment.test.runner)
-    result = runner(user, config, course, assignment, files).run(console)
+    with ExitStack() as stack:
+        if scheduler := Scheduler.from_config(config):
+            with console.status("Waiting for a grading slot...") as status:
 
-    with user.as_root():
-        save_path.mkdir(parents=True, exist_ok=True)
-        result.to_pickle(save_path / ".runner-output")
+                def show_position(ahead: int):
+                    status.update(f"Waiting for a grading slot, {ahead} submission(s) ahead of yours...")
+
+                try:
+                    stack.enter_context(scheduler.slot(user.name, on_wait=show_position))
+                except SchedulerFull as e:
+                    raise click.ClickException(str(e)) from e
 
-        # chown(save_path, ROOT_UID, config.admin_group.gr_gid)
-        # chown(save_path / ".runner-output", ROOT_UID, config.admin_group.gr_gid)
+        # The output of the run is recorded, so the results can be looked at again on the web.
+        console.record = True
+        result = runner(user, config, course, assignment, files).run(console)
+        results_page = console.export_html(clear=True, inline_styles=True, code_format="{code}")
+        console.record = False
 
-        for file in track(files, "Saving submitted files...", total=len(files), console=console):
-            # We use copy2 instead of copy since copy2 is supposed to perserve file metadata
-            # https://docs.python.org/3/library/shutil.html#shutil.copy2
-            copy2(file.absolute(), save_path / file.name)
-            # chown(save_path / file.name, ROOT_UID, config.admin_group.gr_gid)
+    with user.as_root():
+        submissions.save(
+            config,
+            result,
+            save_path,
+            files,
+            progress=lambda files: track(files, "Saving submitted files...", total=len(files), console=console),
+            results_page=results_page,
+        )
 
     console.print(f"[bold green]{assignment.name} was successfully submitted![/]")
 
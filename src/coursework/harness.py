@@ -0,0 +1,141 @@
+"""
+harness.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Test Harness Results
+
+Test scripts may report their results as TAP on standard output, or as a JUnit XML file,
+instead of calling `coursework-score` once per test case.
+Points and hints are given to those test cases by a small scoring spec, since neither format has them.
+Both formats are read one test case at a time, so a harness can report thousands of them.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import stat
+import tomllib
+from dataclasses import dataclass
+from dataclasses import field
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Iterable
+from typing import Iterator
+from xml.etree.ElementTree import ParseError
+from xml.etree.ElementTree import iterparse
+
+from coursework.models import TestCaseResult
+
+# "ok 1 - description # SKIP reason", where everything after "ok" is optional.
+_TAP_RESULT = re.compile(r"^(not )?ok\b\s*(\d+)?\s*(?:-\s*)?([^#]*?)\s*(?:#\s*(\w+).*)?$")
+
+
+class HarnessError(Exception):
+    """Raised if a test harness's results cannot be read."""
+
+
+@dataclass(frozen=True)
+class _Rule:
+    match: str
+    points: int
+    hint: str = ""
+
+
+@dataclass(frozen=True)
+class ScoringSpec:
+    """
+    # ScoringSpec.
+
+    How many points each test case from a harness is worth, and what hint it gives when it fails.
+    A test case takes the points and hint of the first rule whose pattern matches its name,
+    or the default points if none do.
+
+    The spec is a toml file:
+
+        points = 1
+
+        [[cases]]
+        match = "test_parser.*"
+        points = 5
+        hint = "Check how the parser handles empty input."
+    """
+
+    points: int = 1
+    rules: list[_Rule] = field(default_factory=list)
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> ScoringSpec:
+        try:
+            with open(path, "rb") as f:
+                parsed = tomllib.load(f)
+            return cls(
+                parsed.get("points", 1),
+                [
+                    _Rule(rule["match"], rule.get("points", parsed.get("points", 1)), rule.get("hint", ""))
+                    for rule in parsed.get("cases", [])
+                ],
+            )
+        except (OSError, tomllib.TOMLDecodeError, KeyError, TypeError) as e:
+            raise HarnessError(f"Cannot read the scoring spec {path}: {e}") from e
+
+    def score(self, name: str, passed: bool) -> TestCaseResult:
+        for rule in self.rules:
+            if fnmatchcase(name, rule.match):
+                return TestCaseResult(name, passed, rule.points, rule.hint)
+
+        return TestCaseResult(name, passed, self.points)
+
+
+def parse_tap(lines: Iterable[str]) -> Iterator[tuple[str, bool]]:
+    """
+    Read test cases from TAP output, yielding each one's name and whether it passed.
+
+    Skipped test cases and those marked TODO are left out, and a "Bail out!" ends the results.
+    """
+
+    for line in lines:
+        if line.startswith("Bail out!"):
+            return
+
+        match = _TAP_RESULT.match(line)
+        if match is None:
+            continue
+
+        failed, number, description, directive = match.groups()
+        if directive and directive.upper() in ("SKIP", "TODO"):
+            continue
+
+        yield description or f"test {number}", not failed
+
+
+def parse_junit(path: str | Path) -> Iterator[tuple[str, bool]]:
+    """
+    Read test cases from a JUnit XML file, yielding each one's name and whether it passed.
+
+    Test cases are named "classname.name". Skipped test cases are left out.
+    The file is written by the test script, which could have put anything in its place,
+    so it is only read if it is a regular file, and never through a symlink.
+    A damaged file raises HarnessError once the test cases before the damage have been read.
+    """
+
+    try:
+        # Without O_NONBLOCK, opening a FIFO would wait for a writer.
+        with open(os.open(path, os.O_RDONLY | os.O_NOFOLLOW | os.O_NONBLOCK), "rb") as f:
+            if not stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+                raise HarnessError(f"Cannot read the JUnit results {path}: it is not a regular file")
+
+            for _, element in iterparse(f, events=("end",)):
+                if element.tag != "testcase":
+                    continue
+
+                name = ".".join(filter(None, (element.get("classname"), element.get("name"))))
+                if element.find("skipped") is None:
+                    yield name, element.find("failure") is None and element.find("error") is None
+
+                # Test cases are forgotten once read, so the whole file is never held at once.
+                element.clear()
+
+    except (OSError, ParseError) as e:
+        raise HarnessError(f"Cannot read the JUnit results {path}: {e}") from e
@@ -0,0 +1,247 @@
+"""
+index.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Submission Index
+
+The index is a local SQLite database recording every submission.
+It lets status, gradebook, and report queries avoid walking (possibly NFS mounted)
+submission directories.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from contextlib import closing
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+
+from coursework.loaders import Configuration
+from coursework.models import RunnerResult
+from coursework.models import load_results
+
+# The databases this process has already created the schema in.
+_initialized: set[Path] = set()
+_initialized_lock = threading.Lock()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY,
+    student TEXT NOT NULL,
+    course TEXT NOT NULL,
+    assignment TEXT NOT NULL,
+    submitted_at TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    total_points INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    UNIQUE (student, course, assignment)
+);
+CREATE INDEX IF NOT EXISTS submissions_by_assignment ON submissions (course, assignment);
+
+CREATE TABLE IF NOT EXISTS test_case_results (
+    submission_id INTEGER NOT NULL REFERENCES submissions (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    was_successful INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    hint TEXT NOT NULL,
+    PRIMARY KEY (submission_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS files (
+    submission_id INTEGER NOT NULL REFERENCES submissions (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (submission_id, name)
+);
+"""
+
+
+@dataclass(frozen=True)
+class IndexedSubmission:
+    """
+    # IndexedSubmission.
+
+    A submission as recorded in the index.
+    """
+
+    student: str
+    course: str
+    assignment: str
+    submitted_at: datetime
+    score: int
+    total_points: int
+    path: Path
+
+
+class SubmissionIndex:
+    """
+    # SubmissionIndex.
+
+    A SQLite-backed index of submissions.
+    Each student has at most one indexed submission per assignment, which is replaced on resubmission.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        with _initialized_lock:
+            if self.path not in _initialized:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with closing(sqlite3.connect(self.path, timeout=30)) as connection:
+                    connection.executescript(_SCHEMA)
+                    # WAL is kept by the database itself, so it only has to be turned on once.
+                    connection.execute("PRAGMA journal_mode = WAL")
+                _initialized.add(self.path)
+
+    @classmethod
+    def from_config(cls, config: Configuration) -> SubmissionIndex | None:
+        """Open the index defined by the configuration, if there is one."""
+
+        return cls(config.index) if config.index else None
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        with closing(sqlite3.connect(self.path, timeout=30)) as connection:
+            connection.execute("PRAGMA foreign_keys = ON")
+            with connection:
+                yield connection
+
+    def record(self, result: RunnerResult, path: Path, files: Iterable[Path]) -> None:
+        """Record the result as the current submission, replacing any previous one."""
+
+        file_rows = [(file.name, _sha256(file), file.stat().st_size) for file in files]
+
+        with self._connect() as connection:
+            _record(connection, result, path, file_rows)
+
+    def rebuild(self, config: Configuration, on_error: Callable[[Path, Exception], None] | None = None) -> int:
+        """
+        Replace everything in the index with the submissions in the submission directories, returning how many.
+
+        This fills the index from submissions made before it was configured, or repairs one that fell behind.
+        Submissions whose results cannot be read are left out, and given to `on_error` as by `load_results`.
+        """
+
+        paths = [
+            Path(config.submission.format(student=student, course=course.name, assignment=assignment))
+            / ".runner-output"
+            for course in config.courses.values()
+            for student in course.students
+            for assignment in course.assignments
+        ]
+        submissions = []
+        for path, result in load_results(paths, config, on_error):
+            submission_path = path.parent.absolute()
+            files = [
+                file for file in sorted(submission_path.iterdir()) if file.is_file() and not file.name.startswith(".")
+            ]
+            submissions.append(
+                (result, submission_path, [(file.name, _sha256(file), file.stat().st_size) for file in files])
+            )
+
+        with self._connect() as connection:
+            connection.execute("DELETE FROM submissions")
+            for result, path, file_rows in submissions:
+                _record(connection, result, path, file_rows)
+
+        return len(submissions)
+
+    def get(self, student: str, course: str, assignment: str) -> IndexedSubmission | None:
+        """Get the current submission of a student, if there is one."""
+
+        with self._connect() as connection:
+            row = connection.execute(
+                f"SELECT {_COLUMNS} FROM submissions WHERE student = ? AND course = ? AND assignment = ?",
+                (student, course, assignment),
+            ).fetchone()
+
+        return _to_submission(row) if row else None
+
+    def submitted(self, student: str, course: str) -> set[str]:
+        """Get the names of all assignments the student has submitted for the course."""
+
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT assignment FROM submissions WHERE student = ? AND course = ?", (student, course)
+            ).fetchall()
+
+        return {assignment for (assignment,) in rows}
+
+    def gradebook(self, course: str, assignment: str | None = None) -> list[IndexedSubmission]:
+        """Get every current submission for the course, optionally limited to one assignment."""
+
+        query = f"SELECT {_COLUMNS} FROM submissions WHERE course = ?"
+        parameters = [course]
+        if assignment is not None:
+            query += " AND assignment = ?"
+            parameters.append(assignment)
+
+        with self._connect() as connection:
+            rows = connection.execute(query + " ORDER BY student, assignment", parameters).fetchall()
+
+        return [_to_submission(row) for row in rows]
+
+    def files(self, student: str, course: str, assignment: str) -> dict[str, str]:
+        """Get the sha256 digest of each file in the student's current submission, by file name."""
+
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT files.name, files.sha256 FROM files JOIN submissions ON submissions.id = files.submission_id"
+                " WHERE student = ? AND course = ? AND assignment = ?",
+                (student, course, assignment),
+            ).fetchall()
+
+        return dict(rows)
+
+
+_COLUMNS = "student, course, assignment, submitted_at, score, total_points, path"
+
+
+def _record(connection: sqlite3.Connection, result: RunnerResult, path: Path, file_rows: list[tuple]) -> None:
+    connection.execute(
+        "DELETE FROM submissions WHERE student = ? AND course = ? AND assignment = ?",
+        (result.user.name, result.course.name, result.assignment.name),
+    )
+    cursor = connection.execute(
+        "INSERT INTO submissions (student, course, assignment, submitted_at, score, total_points, path)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            result.user.name,
+            result.course.name,
+            result.assignment.name,
+            result.ran_at.isoformat(),
+            result.earned_points(),
+            result.assignment.total_points,
+            str(path),
+        ),
+    )
+    submission_id = cursor.lastrowid
+    connection.executemany(
+        "INSERT INTO test_case_results VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (submission_id, position, tc.name, tc.was_successful, tc.points, tc.hint)
+            for position, tc in enumerate(result.test_case_results)
+        ],
+    )
+    connection.executemany("INSERT INTO files VALUES (?, ?, ?, ?)", [(submission_id, *row) for row in file_rows])
+
+
+def _to_submission(row: tuple) -> IndexedSubmission:
+    student, course, assignment, submitted_at, score, total_points, path = row
+    return IndexedSubmission(
+        student, course, assignment, datetime.fromisoformat(submitted_at), score, total_points, Path(path)
+    )
+
+
+def _sha256(path: Path) -> str:
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
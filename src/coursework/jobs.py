@@ -0,0 +1,276 @@
+"""
+jobs.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Grading Job Queue
+
+A durable, local job queue backed by SQLite.
+The web interface enqueues submissions here, and grading workers claim and complete them.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from contextlib import closing
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from shutil import rmtree
+from typing import Any
+from typing import Iterator
+from typing import Literal
+from typing import NamedTuple
+from uuid import uuid4
+
+JOB_STATUS = Literal["queued", "running", "finished", "failed"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    student TEXT NOT NULL,
+    course TEXT NOT NULL,
+    assignment TEXT NOT NULL,
+    status TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result BLOB,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, enqueued_at);
+CREATE INDEX IF NOT EXISTS jobs_by_finished_at ON jobs (finished_at);
+"""
+
+
+class JobNotFound(Exception):
+    """Raised if a job does not exist."""
+
+
+@dataclass(frozen=True)
+class Job:
+    """
+    # Job.
+
+    A single grading job. The submitted files live in the job's spool directory until it is graded.
+    """
+
+    id: str
+    student: str
+    course: str
+    assignment: str
+    status: JOB_STATUS
+    enqueued_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: bytes | None = None
+    error: str | None = None
+
+    @property
+    def is_done(self) -> bool:
+        return self.status in ("finished", "failed")
+
+
+class Event(NamedTuple):
+    """An event published while grading a job. The offset is where the next event starts."""
+
+    offset: int
+    event: str
+    data: Any
+
+
+class JobQueue:
+    """
+    # JobQueue.
+
+    The queue lives in a spool directory, as `jobs.db` alongside one directory of submitted files
+    and one event log per job.
+    """
+
+    def __init__(self, spool: str | Path):
+        self.spool = Path(spool)
+        self.spool.mkdir(parents=True, exist_ok=True)
+        with self._connect(write=False) as connection:
+            connection.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self, write: bool = True) -> Iterator[sqlite3.Connection]:
+        with closing(sqlite3.connect(self.spool / "jobs.db", timeout=30, isolation_level=None)) as connection:
+            connection.execute("PRAGMA journal_mode = WAL")
+            if not write:
+                yield connection
+                return
+
+            # Writers take the lock up front, so two workers can never claim the same job.
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def events_path(self, job_id: str) -> Path:
+        """The log of events published while grading the job."""
+
+        return self.spool / f"{job_id}.events"
+
+    def publish(self, job_id: str, event: str, data: Any) -> None:
+        """Append an event to the job's log. The data must be JSON serializable."""
+
+        line = json.dumps({"event": event, "data": data}, separators=(",", ":")) + "\n"
+        with self.events_path(job_id).open("a") as f:
+            f.write(line)
+
+    def events(self, job_id: str, offset: int = 0) -> list[Event]:
+        """Read the events published after the given byte offset of the job's log."""
+
+        try:
+            with self.events_path(job_id).open("rb") as f:
+                f.seek(offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return []
+
+        events = []
+        for line in chunk.splitlines(keepends=True):
+            # A partial line is still being written, so it is picked up next time.
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            values = json.loads(line)
+            events.append(Event(offset, values["event"], values["data"]))
+
+        return events
+
+    def files_path(self, job_id: str) -> Path:
+        """The directory holding the submitted files of the job."""
+
+        return self.spool / job_id
+
+    def create(self) -> str:
+        """Reserve a new job id and its (empty) files directory. The job is not visible to workers yet."""
+
+        job_id = uuid4().hex
+        self.files_path(job_id).mkdir()
+        return job_id
+
+    def enqueue(self, job_id: str, student: str, course: str, assignment: str) -> Job:
+        """Queue the job for grading, once its files have been written."""
+
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, student, course, assignment, status, enqueued_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, student, course, assignment, "queued", time.time()),
+            )
+
+        return self.get(job_id)
+
+    def claim(self) -> Job | None:
+        """Claim the oldest queued job, if there is one."""
+
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY enqueued_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+
+            connection.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (time.time(), row[0]))
+
+        return self.get(row[0])
+
+    def finish(self, job_id: str, result: bytes) -> None:
+        """Mark the job as graded, storing the encoded result."""
+
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'finished', finished_at = ?, result = ? WHERE id = ?",
+                (time.time(), result, job_id),
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        """Mark the job as failed."""
+
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                (time.time(), error, job_id),
+            )
+
+    def recover(self) -> int:
+        """Queue running jobs again. Only call this when no worker is running, such as at pool startup."""
+
+        with self._connect() as connection:
+            job_ids = [
+                job_id for (job_id,) in connection.execute("SELECT id FROM jobs WHERE status = 'running'").fetchall()
+            ]
+            connection.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+
+        # The partial output of the interrupted run is discarded.
+        for job_id in job_ids:
+            self.events_path(job_id).unlink(missing_ok=True)
+            rmtree(self.files_path(job_id), ignore_errors=True)
+
+        return len(job_ids)
+
+    def prune(self, retention: float) -> int:
+        """
+        Delete jobs that finished grading more than `retention` seconds ago, returning how many were.
+
+        The event logs of the deleted jobs are deleted with them, as are any files left behind by a crashed grading.
+        """
+
+        with self._connect() as connection:
+            job_ids = [
+                job_id
+                for (job_id,) in connection.execute(
+                    "SELECT id FROM jobs WHERE status IN ('finished', 'failed') AND finished_at < ?",
+                    (time.time() - retention,),
+                ).fetchall()
+            ]
+            connection.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+
+        for job_id in job_ids:
+            self.events_path(job_id).unlink(missing_ok=True)
+            rmtree(self.files_path(job_id), ignore_errors=True)
+
+        return len(job_ids)
+
+    def position(self, job_id: str) -> int:
+        """How many queued jobs are ahead of this one."""
+
+        with self._connect(write=False) as connection:
+            (count,) = connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued'"
+                " AND enqueued_at < (SELECT enqueued_at FROM jobs WHERE id = ?)",
+                (job_id,),
+            ).fetchone()
+
+        return count
+
+    def last_finished(self, student: str, course: str) -> float | None:
+        """When the student's most recent job for the course finished grading, if one ever has."""
+
+        with self._connect(write=False) as connection:
+            (finished_at,) = connection.execute(
+                "SELECT MAX(finished_at) FROM jobs WHERE student = ? AND course = ? AND status = 'finished'",
+                (student, course),
+            ).fetchone()
+
+        return finished_at
+
+    def get(self, job_id: str) -> Job:
+        with self._connect(write=False) as connection:
+            row = connection.execute(
+                "SELECT id, student, course, assignment, status, enqueued_at, started_at, finished_at,"
+                " result, error FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+
+        if row is None:
+            raise JobNotFound(job_id)
+
+        return Job(*row)
@@ -8,6 +8,9 @@ Load Contextual Data
 
 from __future__ import annotations
 
+import json
+import threading
+import time
 from contextlib import contextmanager
 from dataclasses import dataclass
 from dataclasses import field
@@ -16,7 +19,9 @@ from getpass import getuser
 from grp import getgrnam
 from grp import struct_group
 from os import geteuid
+from os import getpid
 from os import getuid
+from os import replace
 from os import seteuid
 from pathlib import Path
 from tomllib import load
@@ -45,6 +50,81 @@ class ImproperlyConfigured(ClickException):
     """Represents an improper configuration, leading to a parse error."""
 
 
+class GroupCache:
+    """
+    # GroupCache
+
+    A small on-disk cache of resolved groups.
+
+    Group lookups go through NSS, which may be backed by LDAP/SSSD and can be slow.
+    Entries younger than `ttl` seconds are used as is. Stale entries are refreshed in
+    a background thread, but if the lookup takes longer than `timeout` seconds the
+    stale entry is used instead. Unknown groups are always resolved synchronously.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, path: str | Path, ttl: float = 60 * 60, timeout: float = 0.25):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.timeout = timeout
+
+    def resolve(self, name: str) -> struct_group:
+        """Resolve the group by name. Raise KeyError if the group does not exist."""
+
+        entry = self._read().get(name)
+        if entry is not None and time.time() - entry["resolved_at"] < self.ttl:
+            return struct_group(entry["group"])
+
+        outcome: dict[str, struct_group | KeyError] = {}
+        refresh = threading.Thread(target=self._refresh, args=(name, outcome), daemon=True)
+        refresh.start()
+        refresh.join(None if entry is None else self.timeout)
+
+        if "group" in outcome:
+            return outcome["group"]
+        if "error" in outcome:
+            raise outcome["error"]
+
+        # NSS is slow, so we fall back to the last known value.
+        # The refresh keeps going and will update the cache when it finishes.
+        return struct_group(entry["group"])
+
+    def _refresh(self, name: str, outcome: dict):
+        try:
+            group = getgrnam(name)
+        except KeyError as e:
+            outcome["error"] = e
+            self._write(name, None)
+            return
+
+        outcome["group"] = group
+        self._write(name, group)
+
+    def _read(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, name: str, group: struct_group | None):
+        # The cache is purely an optimization, so failing to write it is not an error.
+        with self._lock:
+            entries = self._read()
+            if group is None:
+                entries.pop(name, None)
+            else:
+                entries[name] = {"group": list(group), "resolved_at": time.time()}
+
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = self.path.with_name(f".{self.path.name}.{getpid()}.{threading.get_ident()}")
+                temp_path.write_text(json.dumps(entries))
+                replace(temp_path, self.path)
+            except OSError:
+                pass
+
+
 @dataclass(frozen=True)
 class Configuration:
     """
@@ -60,6 +140,13 @@ class Configuration:
     submission: str
     collection: str
     courses: dict[str, Course]
+    index: str | None = None
+    store: str | None = None
+    scheduler: str | None = None
+    grading_slots: int = 4
+    max_waiting: int = 50
+    build_cache: str | None = None
+    build_cache_size: int = 1024 * 1024 * 1024
 
     @dataclass(frozen=True)
     class Course:
@@ -91,6 +178,15 @@ class Configuration:
         due_date: datetime
         total_points: int
         test: TestSpec
+        # How many seconds the tests may run for before they are stopped, if there is a limit.
+        timeout: float | None = None
+        # Where a cmd test script reports results besides coursework-score: "tap", or "junit:<file>".
+        results: str | None = None
+        # The scoring spec giving those results their points and hints.
+        scoring: str | None = None
+        # A shell command building the submitted files before they are tested, and the build's outputs to cache.
+        build: str | None = None
+        artifacts: tuple[str, ...] = ()
 
         def is_late(self, dt=None):
             dt = dt or datetime.now(pytz.timezone("America/Chicago"))
@@ -147,6 +243,8 @@ class Configuration:
         )
         parsed["coursework"].setdefault("collection", "/home/fs/{instructor}/coursework/{course}/{assignment}")
         parsed["coursework"].setdefault("admins", [])
+        parsed["coursework"].setdefault("group_cache", "/var/cache/coursework/groups.json")
+        parsed["coursework"].setdefault("group_cache_ttl", 60 * 60)
 
         assignments = cls._load_assignments(parsed)
         courses = cls._load_courses(parsed, assignments)
@@ -154,19 +252,33 @@ class Configuration:
         if len(courses) == 0:
             warn("No courses defined. Consider defining courses.")
 
+        group_cache = GroupCache(parsed["coursework"]["group_cache"], ttl=parsed["coursework"]["group_cache_ttl"])
+
         try:
             return cls(
                 admins=parsed["coursework"]["admins"],
-                admin_group=getgrnam(parsed["coursework"]["admin_group"]),
+                admin_group=group_cache.resolve(parsed["coursework"]["admin_group"]),
                 submission=parsed["coursework"]["submission"],
                 collection=parsed["coursework"]["collection"],
                 courses=courses,
+                index=parsed["coursework"].get("index"),
+                store=parsed["coursework"].get("store"),
+                scheduler=parsed["coursework"].get("scheduler"),
+                grading_slots=parsed["coursework"].get("grading_slots", 4),
+                max_waiting=parsed["coursework"].get("max_waiting", 50),
+                build_cache=parsed["coursework"].get("build_cache"),
+                build_cache_size=parsed["coursework"].get("build_cache_size", 1024 * 1024 * 1024),
             )
         except KeyError as e:
             raise ImproperlyConfigured(f"admin group {parsed['coursework']['admin_group']} does not exist") from e
 
     @classmethod
     def _load_assignments(cls, parsed: dict):
+        for name, values in parsed["assignments"].items():
+            results = values.get("results")
+            if results is not None and results != "tap" and not str(results).startswith("junit:"):
+                raise ImproperlyConfigured(f'The results of {name} must be "tap" or "junit:<file>".')
+
         try:
             return {
                 name: (
@@ -178,6 +290,11 @@ class Configuration:
                         ),
                         total_points=values.get("total_points", 0),
                         test=TestSpec(*values.get("test", " : ").split(":")),
+                        timeout=values.get("timeout"),
+                        results=values.get("results"),
+                        scoring=values.get("scoring"),
+                        build=values.get("build"),
+                        artifacts=tuple(values.get("artifacts", ())),
                     )
                 )
                 for name, values in parsed["assignments"].items()
@@ -0,0 +1,305 @@
+"""
+metrics.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Metrics
+
+Histograms and gauges for grading, exposed in the Prometheus text format.
+Grading happens in processes other than the web app, and the web app itself may run as several processes,
+so every process writes snapshots of its metrics to a shared directory, and they are added up when scraped.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SIZE_BUCKETS = tuple(1024 * 4**power for power in range(10))
+
+# Where this process writes its snapshots, if anywhere, and when it last did.
+_snapshot_directory: Path | None = None
+_snapshot_written_at = 0.0
+_snapshot_lock = threading.Lock()
+
+
+class Histogram:
+    """
+    # Histogram.
+
+    Observations counted into cumulative buckets, per set of label values.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # Each sample is the count per bucket (the last being +Inf), followed by the sum.
+        self.samples: dict[tuple[str, ...], list[float]] = {}
+        # Web requests are observed from many threads at once.
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_values(self, labels)
+        with self.lock:
+            sample = self.samples.setdefault(key, [0] * (len(self.buckets) + 2))
+            sample[bisect_left(self.buckets, value)] += 1
+            sample[-1] += value
+
+    def copy(self) -> dict[tuple[str, ...], list[float]]:
+        """A copy of the samples, which is safe to read while more are observed."""
+
+        with self.lock:
+            return {key: list(sample) for key, sample in self.samples.items()}
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe how many seconds the block takes."""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self, samples: dict[tuple[str, ...], list[float]]) -> Iterator[str]:
+        for key, sample in sorted(samples.items()):
+            count = 0
+            for bound, bucket in zip((*self.buckets, math.inf), sample):
+                count += bucket
+                yield f"{self.name}_bucket{_labels(self, key, le=_format(bound))} {_format(count)}"
+            yield f"{self.name}_sum{_labels(self, key)} {_format(sample[-1])}"
+            yield f"{self.name}_count{_labels(self, key)} {_format(count)}"
+
+
+class Gauge:
+    """
+    # Gauge.
+
+    A value that goes up and down, per set of label values.
+    Gauges only count while the process reporting them is alive.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.samples: dict[tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = _label_values(self, labels)
+        with self.lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+    def copy(self) -> dict[tuple[str, ...], float]:
+        """A copy of the samples, which is safe to read while they change."""
+
+        with self.lock:
+            return dict(self.samples)
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_in_progress(self, **labels: str) -> Iterator[None]:
+        """Count the block as in progress while it runs."""
+
+        self.inc(**labels)
+        write_snapshot()
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def render(self, samples: dict[tuple[str, ...], float]) -> Iterator[str]:
+        for key, value in sorted(samples.items()):
+            yield f"{self.name}{_labels(self, key)} {_format(value)}"
+
+
+RUNNER_DURATION = Histogram(
+    "coursework_runner_duration_seconds",
+    "How long running an assignment's tests took.",
+    ("course", "assignment", "runner"),
+)
+GRADINGS_IN_PROGRESS = Gauge(
+    "coursework_gradings_in_progress", "How many gradings are running right now.", ("course", "assignment", "runner")
+)
+SAVE_DURATION = Histogram("coursework_save_duration_seconds", "How long staging and saving a submission took.")
+RESULT_ENCODE_DURATION = Histogram(
+    "coursework_result_encode_seconds", "How long encoding a grading result took.", buckets=DEFAULT_BUCKETS[:8]
+)
+QUEUE_WAIT = Histogram("coursework_queue_wait_seconds", "How long submissions waited in the grading queue.")
+UPLOAD_SIZE = Histogram(
+    "coursework_upload_size_bytes", "How large submissions uploaded on the web were.", buckets=SIZE_BUCKETS
+)
+REQUEST_DURATION = Histogram(
+    "coursework_request_duration_seconds", "How long web requests took to answer.", ("endpoint", "method")
+)
+
+METRICS: tuple[Histogram | Gauge, ...] = (
+    RUNNER_DURATION,
+    GRADINGS_IN_PROGRESS,
+    SAVE_DURATION,
+    RESULT_ENCODE_DURATION,
+    QUEUE_WAIT,
+    UPLOAD_SIZE,
+    REQUEST_DURATION,
+)
+
+
+def configure(directory: str | Path | None) -> None:
+    """Write snapshots of this process's metrics to the directory from now on."""
+
+    global _snapshot_directory
+    _snapshot_directory = Path(directory) if directory else None
+
+
+def reset() -> None:
+    """Forget everything observed so far, such as what a forked process inherited from its parent."""
+
+    for metric in METRICS:
+        with metric.lock:
+            metric.samples.clear()
+
+
+def write_snapshot(every: float = 0) -> None:
+    """
+    Write a snapshot of this process's metrics, if snapshots are configured.
+
+    With `every`, nothing is written if the last snapshot is younger than that many seconds.
+    """
+
+    global _snapshot_written_at
+
+    if _snapshot_directory is None:
+        return
+
+    with _snapshot_lock:
+        if time.monotonic() - _snapshot_written_at < every:
+            return
+
+        _snapshot_directory.mkdir(parents=True, exist_ok=True)
+        path = _snapshot_directory / f"{os.getpid()}.json"
+        temp_path = path.with_name(f".{path.name}")
+        temp_path.write_text(json.dumps(_snapshot(METRICS)))
+        temp_path.chmod(0o644)
+        os.replace(temp_path, path)
+        _snapshot_written_at = time.monotonic()
+
+
+def fold(pid: int) -> None:
+    """
+    Add the snapshot of an exited process into this process's metrics, and remove it.
+
+    This keeps one snapshot per long-lived process, rather than one per grading.
+    """
+
+    if _snapshot_directory is None:
+        return
+
+    path = _snapshot_directory / f"{pid}.json"
+    try:
+        snapshot = json.loads(path.read_text())
+    except FileNotFoundError:
+        return
+
+    for metric in METRICS:
+        if metric.type != "gauge":
+            with metric.lock:
+                _add(metric, metric.samples, _samples(snapshot, metric))
+    write_snapshot()
+    path.unlink()
+
+
+def collect(*directories: str | Path | None) -> str:
+    """Render this process's metrics, added to every snapshot in the directories, in the Prometheus text format."""
+
+    totals = {metric.name: {} for metric in METRICS}
+    for metric in METRICS:
+        _add(metric, totals[metric.name], metric.copy())
+
+    paths = [path for directory in directories if directory for path in sorted(Path(directory).glob("*.json"))]
+    for path in paths:
+        # Snapshots are named by pid, and anything else, such as one being written, is not a snapshot.
+        # This process's own snapshot is older than what it has in memory.
+        if not path.stem.isdigit() or path.stem == str(os.getpid()):
+            continue
+
+        try:
+            snapshot = json.loads(path.read_text())
+        except (FileNotFoundError, ValueError):
+            continue
+
+        for metric in METRICS:
+            # A process that exited can no longer have anything in progress.
+            if metric.type != "gauge" or _is_alive(int(path.stem)):
+                _add(metric, totals[metric.name], _samples(snapshot, metric))
+
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(metric.render(totals[metric.name]))
+
+    return "\n".join(lines) + "\n"
+
+
+def _snapshot(metrics: tuple[Histogram | Gauge, ...]) -> dict:
+    return {metric.name: [[list(key), value] for key, value in metric.copy().items()] for metric in metrics}
+
+
+def _samples(snapshot: dict, metric: Histogram | Gauge) -> dict:
+    return {tuple(key): value for key, value in snapshot.get(metric.name, [])}
+
+
+def _add(metric: Histogram | Gauge, into: dict, samples: dict) -> None:
+    for key, value in samples.items():
+        if metric.type == "gauge":
+            into[key] = into.get(key, 0) + value
+        else:
+            total = into.setdefault(key, [0] * len(value))
+            for i, bucket in enumerate(value):
+                total[i] += bucket
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists, it just belongs to someone else.
+        return True
+    return True
+
+
+def _label_values(metric: Histogram | Gauge, labels: dict[str, str]) -> tuple[str, ...]:
+    return tuple(str(labels[name]) for name in metric.labelnames)
+
+
+def _labels(metric: Histogram | Gauge, key: tuple[str, ...], **extra: str) -> str:
+    pairs = [*zip(metric.labelnames, key), *extra.items()]
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
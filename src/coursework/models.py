@@ -6,21 +6,43 @@ Ian Kollipara <ian.kollipara@cune.edu>
 Data Models
 """
 
+import json
+import struct
+from dataclasses import MISSING
 from dataclasses import dataclass
 from dataclasses import field
+from dataclasses import fields
 from datetime import datetime
 from pathlib import Path
+from pickle import UnpicklingError
 from pickle import dump
 from pickle import dumps
 from pickle import load
 from pickle import loads
+from typing import Any
 from typing import BinaryIO
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
 from typing import Self
 from typing import overload
 
 from coursework.loaders import Configuration
+from coursework.loaders import TestSpec
 from coursework.loaders import User
 
+# Results are stored as a small fixed header followed by a JSON payload.
+# The header is the magic value, the format version, and the payload length.
+# Pickled results (the previous format) start with the pickle protocol opcode instead,
+# which can never collide with the magic value.
+RESULT_MAGIC = b"CWRR"
+RESULT_VERSION = 1
+_RESULT_HEADER = struct.Struct("<4sBI")
+
+
+class ResultFormatError(Exception):
+    """Raised if a stored result cannot be decoded."""
+
 
 class _CanBePickled:
     @overload
@@ -72,12 +94,22 @@ class TestCaseResult(_CanBePickled):
 
     The result of running a particular test case.
     It includes details such as hints, the number of points, and if the test was successful.
+    Some tests earn only part of their points, and some record what they measured, such as timings,
+    or what the student's code printed.
     """
 
     name: str
     was_successful: bool
     points: int
     hint: str = ""
+    partial_points: int | None = None
+    measurements: dict[str, Any] | None = None
+    output: str | None = None
+
+    def earned_points(self) -> int:
+        if self.partial_points is not None:
+            return self.partial_points
+        return self.points if self.was_successful else 0
 
 
 @dataclass(frozen=True)
@@ -91,6 +123,7 @@ class RunnerResult(_CanBePickled):
     - The course
     - The assignment
     - the collection of test case results.
+    - whether the tests ran out of time, leaving only the results from before.
     """
 
     user: User
@@ -98,6 +131,143 @@ class RunnerResult(_CanBePickled):
     course: Configuration.Course
     assignment: Configuration.Assignment
     test_case_results: list[TestCaseResult] = field(default_factory=list)
+    timed_out: bool = False
 
     def earned_points(self):
-        return sum(tc.points for tc in self.test_case_results if tc.was_successful)
+        return sum(tc.earned_points() for tc in self.test_case_results)
+
+    @overload
+    def to_file(self, fp: BinaryIO) -> None:
+        """Write the result into the file pointer/IO buffer."""
+
+    @overload
+    def to_file(self, fp: Path) -> None:
+        """Write the result into the given file path."""
+
+    def to_file(self, fp: BinaryIO | Path) -> None:
+        if isinstance(fp, Path):
+            with fp.open("wb+") as f:
+                f.write(self.encode())
+        else:
+            fp.write(self.encode())
+
+    @overload
+    @classmethod
+    def from_file(cls, fp: bytes, config: Configuration) -> Self:
+        """Decode from the stored byte string."""
+
+    @overload
+    @classmethod
+    def from_file(cls, fp: BinaryIO, config: Configuration) -> Self:
+        """Decode from the file pointer/IO buffer."""
+
+    @overload
+    @classmethod
+    def from_file(cls, fp: Path, config: Configuration) -> Self:
+        """Decode from the given file path."""
+
+    @classmethod
+    def from_file(cls, fp: BinaryIO | Path | bytes, config: Configuration) -> Self:
+        if isinstance(fp, Path):
+            return cls.decode(fp.read_bytes(), config)
+        if isinstance(fp, bytes):
+            return cls.decode(fp, config)
+        return cls.decode(fp.read(), config)
+
+    def encode(self) -> bytes:
+        """
+        Encode the result in the compact result format.
+
+        The course and assignment are stored by name, and test case results are
+        stored column-wise, one list per `TestCaseResult` field.
+        """
+
+        payload = json.dumps(
+            {
+                "user": [self.user.name, self.user.role],
+                "ran_at": self.ran_at.isoformat(),
+                "course": self.course.name,
+                "assignment": self.assignment.name,
+                "test_case_results": {
+                    f.name: [getattr(tc, f.name) for tc in self.test_case_results] for f in fields(TestCaseResult)
+                },
+                "timed_out": self.timed_out,
+            },
+            separators=(",", ":"),
+        ).encode()
+
+        return _RESULT_HEADER.pack(RESULT_MAGIC, RESULT_VERSION, len(payload)) + payload
+
+    @classmethod
+    def decode(cls, data: bytes, config: Configuration) -> Self:
+        """
+        Decode a stored result, resolving its course and assignment from the configuration.
+
+        A course or assignment no longer in the configuration is kept by name only,
+        so results stored before the configuration changed can still be read.
+        """
+
+        if not data.startswith(RESULT_MAGIC):
+            try:
+                return cls.from_pickle(data)
+            except (UnpicklingError, EOFError, AttributeError, ImportError, IndexError, ValueError) as e:
+                raise ResultFormatError("Result is damaged") from e
+
+        try:
+            _, version, length = _RESULT_HEADER.unpack_from(data)
+        except struct.error as e:
+            raise ResultFormatError("Result is damaged") from e
+        if version > RESULT_VERSION:
+            raise ResultFormatError(f"Unsupported result format version {version}")
+
+        try:
+            payload = json.loads(data[_RESULT_HEADER.size : _RESULT_HEADER.size + length])
+            user = User(*payload["user"])
+            ran_at = datetime.fromisoformat(payload["ran_at"])
+            columns = payload["test_case_results"]
+            course_name = payload["course"]
+            assignment_name = payload["assignment"]
+        except (ValueError, KeyError, TypeError) as e:
+            raise ResultFormatError("Result is damaged") from e
+
+        rows = max((len(column) for column in columns.values()), default=0)
+        values = {
+            f.name: columns.get(f.name) or [f.default] * rows
+            for f in fields(TestCaseResult)
+            if f.name in columns or f.default is not MISSING
+        }
+        test_case_results = [TestCaseResult(**dict(zip(values, row))) for row in zip(*values.values())]
+
+        course = config.courses.get(course_name) or Configuration.Course(course_name)
+        assignment = course.assignments.get(assignment_name) or Configuration.Assignment(
+            assignment_name,
+            description="",
+            due_date=ran_at,
+            total_points=sum(tc.points for tc in test_case_results),
+            test=TestSpec("manual", ""),
+        )
+
+        return cls(user, ran_at, course, assignment, test_case_results, payload.get("timed_out", False))
+
+
+def load_results(
+    paths: Iterable[Path], config: Configuration, on_error: Callable[[Path, Exception], None] | None = None
+) -> Iterator[tuple[Path, RunnerResult]]:
+    """
+    Decode the stored results at each path, skipping paths that do not exist.
+
+    A result that cannot be read or decoded is skipped too, and given to `on_error` with why, so one damaged
+    result does not stop the rest from being read.
+    """
+
+    for path in paths:
+        try:
+            result = RunnerResult.decode(path.read_bytes(), config)
+        except FileNotFoundError:
+            continue
+        except (OSError, ResultFormatError) as e:
+            if on_error is not None:
+                on_error(path, e)
+            continue
+
+        yield path, result
@@ -11,6 +11,7 @@ from itertools import chain
 from pathlib import Path
 from typing import BinaryIO
 from typing import Iterable
+from xml.sax.saxutils import escape
 
 from pygments import highlight
 from pygments.formatters import BmpImageFormatter
@@ -36,6 +37,7 @@ from reportlab.platypus import SimpleDocTemplate
 from reportlab.platypus import Spacer
 
 from coursework.models import RunnerResult
+from coursework.models import TestCaseResult
 
 styles = StyleSheet1()
 styles.add(ParagraphStyle(name="Normal", fontName="Helvetica", fontSize=12, leading=12))
@@ -114,7 +116,7 @@ def make(result: RunnerResult, files: Iterable[Path] = None, out: BinaryIO = Non
 def _title_page(result: RunnerResult) -> list[Flowable]:
     """Create a title page for the report."""
 
-    success_points = sum(r.points for r in result.test_case_results if r.was_successful)
+    success_points = result.earned_points()
 
     return [
         Paragraph("Coursework Report", styles["Heading"]),
@@ -139,10 +141,15 @@ def _student_scores(result: RunnerResult) -> list[Flowable]:
         ListFlowable(
             [
                 ListItem(
-                    Paragraph(
-                        f"{test_case_result.name} ({test_case_result.points})",
-                        style=styles["PassedTest" if test_case_result.was_successful else "FailedTest"],
-                    ),
+                    [
+                        Paragraph(
+                            # Test names can hold anything, such as the arguments of @cases, so they are not markup.
+                            f"{escape(test_case_result.name)} "
+                            f"({test_case_result.earned_points()}/{test_case_result.points})",
+                            style=styles["PassedTest" if test_case_result.was_successful else "FailedTest"],
+                        ),
+                        *_test_output(test_case_result),
+                    ],
                     bulletColor="green" if test_case_result.was_successful else "red",
                 )
                 for test_case_result in result.test_case_results
@@ -152,6 +159,15 @@ def _student_scores(result: RunnerResult) -> list[Flowable]:
     ]
 
 
+def _test_output(test_case_result: TestCaseResult) -> list[Flowable]:
+    """Show what the student's code printed during the test, if anything."""
+
+    if not test_case_result.output:
+        return []
+
+    return [Spacer(1, 6), Preformatted(test_case_result.output, styles["Code"], maxLineLength=80), Spacer(1, 6)]
+
+
 def _code_page(file: Path, doc: SimpleDocTemplate) -> list[Flowable]:
     """Create code pages."""
 
@@ -161,7 +177,7 @@ def _code_page(file: Path, doc: SimpleDocTemplate) -> list[Flowable]:
         code = Preformatted(file.read_text(), styles["Code"], maxLineLength=80)
 
     return [
-        Paragraph(file.name, styles["Heading"]),
+        Paragraph(escape(file.name), styles["Heading"]),
         Spacer(1, 20),
         code,
         PageBreak(),
@@ -8,14 +8,25 @@ Test Runners
 
 from __future__ import annotations
 
+import io
+import logging
+import math
+import os
+import signal
 import subprocess
 import sys
+import threading
 from abc import ABC as AbstractBaseClass
 from abc import abstractmethod
+from contextlib import AbstractContextManager
+from contextlib import ExitStack
 from contextlib import contextmanager
+from contextlib import redirect_stderr
+from contextlib import redirect_stdout
 from dataclasses import dataclass
 from dataclasses import field
 from datetime import datetime
+from functools import wraps
 from os import chdir
 from os import environ
 from pathlib import Path
@@ -24,18 +35,37 @@ from shutil import chown
 from shutil import copyfile
 from tempfile import NamedTemporaryFile
 from tempfile import TemporaryDirectory
+from traceback import format_exc
+from typing import Callable
+from typing import Iterator
 from typing import Type
 from unittest import TestResult
 
 from rich.columns import Columns
 from rich.console import Console
+from rich.markup import escape
+from rich.panel import Panel
 from rich.rule import Rule
+from rich.text import Text
 
+from coursework import harness
+from coursework import metrics
+from coursework.buildcache import BuildCache
 from coursework.loaders import Configuration
 from coursework.loaders import User
 from coursework.models import RunnerResult
 from coursework.models import TestCaseResult
 from coursework.testing import Assignment
+from coursework.testing import module_fixtures
+
+logger = logging.getLogger(__name__)
+
+# How much of what a test prints is kept, from the start and from the end.
+OUTPUT_HEAD = 4 * 1024
+OUTPUT_TAIL = 4 * 1024
+
+# How long to keep reading the output of a test script after killing it.
+_KILL_GRACE = 5
 
 
 class RunnerNotFound(Exception):
@@ -55,6 +85,13 @@ class Runner(AbstractBaseClass):
     course: Configuration.Course
     assignment: Configuration.Assignment
     files: list[Path] = field(default_factory=list)
+    on_test_result: Callable[[TestCaseResult], None] | None = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every runner is timed and counted, however it runs the tests.
+        if "run" in cls.__dict__:
+            cls.run = _instrumented(cls.run)
 
     @abstractmethod
     def run(self, output_stream: Console) -> RunnerResult:
@@ -66,6 +103,7 @@ class Runner(AbstractBaseClass):
         Create a testing environment with all submitted files.
 
         The created environment is a flat-structure.
+        The files are always copied, since the student's code may change anything in the environment.
         """
 
         current_dir = Path.cwd()
@@ -88,6 +126,72 @@ class Runner(AbstractBaseClass):
                     if str(temp_dir) in sys.path:
                         sys.path.remove(str(temp_dir))
 
+    def build(self, output_stream: Console) -> tuple[bool, bool]:
+        """
+        Build the submitted files with the assignment's build command, if it has one.
+
+        Returns if the build succeeded, and if it failed by running out of time.
+        This must be called inside the testing environment. A build of the same files with the same command
+        is restored from the build cache, if there is one, instead of being run again.
+        """
+
+        if not self.assignment.build:
+            return True, False
+
+        testing_dir = Path.cwd()
+        with self.user.as_root():
+            # The cache only saves time, so a build is never held up by a cache that cannot be used.
+            try:
+                cache = BuildCache.from_config(self.config)
+                key = (
+                    cache.key(self.assignment.build, [testing_dir / file.name for file in self.files])
+                    if cache
+                    else None
+                )
+                if cache and cache.restore(key, testing_dir):
+                    output_stream.print("[bold blue]Using the cached build.[/]\n")
+                    return True, False
+            except OSError as e:
+                logger.warning("Not using the build cache: %s", e)
+                cache = None
+
+            output_stream.print("[bold blue]Building...[/]\n")
+            proc = subprocess.Popen(
+                self.assignment.build,
+                shell=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+            output, timed_out = _communicate(proc, self.assignment.timeout)
+            output_stream.print(output.decode(errors="replace"), markup=False, highlight=False)
+
+            if timed_out:
+                output_stream.print(f"[bold red]The build timed out after {self.assignment.timeout} seconds![/]\n")
+                return False, True
+
+            if proc.returncode != 0:
+                output_stream.print("[bold red]The build failed![/]\n")
+                return False, False
+
+            artifacts = {
+                path for pattern in self.assignment.artifacts for path in testing_dir.glob(pattern) if path.is_file()
+            }
+            # A build without artifacts has nothing to restore, so it is always run.
+            if cache and artifacts:
+                try:
+                    cache.store(key, testing_dir, sorted(artifacts))
+                except OSError as e:
+                    logger.warning("Not caching the build: %s", e)
+
+        return True, False
+
+    def report(self, result: TestCaseResult):
+        """Notify the listener, if there is one, that a test case has finished."""
+
+        if self.on_test_result is not None:
+            self.on_test_result(result)
+
     def display_results(self, output_stream: Console, earned_points: int, passed: int, failed: int):
         """Display a summarized results list to the console."""
 
@@ -108,6 +212,16 @@ class Runner(AbstractBaseClass):
         output_stream.print("\n")
 
 
+def _instrumented(run: Callable[[Runner, Console], RunnerResult]) -> Callable[[Runner, Console], RunnerResult]:
+    @wraps(run)
+    def wrapper(self: Runner, output_stream: Console) -> RunnerResult:
+        labels = {"course": self.course.name, "assignment": self.assignment.name, "runner": self.assignment.test.runner}
+        with metrics.GRADINGS_IN_PROGRESS.track_in_progress(**labels), metrics.RUNNER_DURATION.time(**labels):
+            return run(self, output_stream)
+
+    return wrapper
+
+
 class CmdRunner(Runner):
     def run(self, output_stream):
         with NamedTemporaryFile("ab+") as f:
@@ -115,18 +229,34 @@ class CmdRunner(Runner):
             passed = 0
             failed = 0
             script = str(Path(self.assignment.test.filename).absolute())
-            with self.testing_environment(), self.user.as_root():
-                proc = subprocess.Popen(
-                    script,
-                    shell=False,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    env=environ | {"COURSEWORK_RUNNER_OUTPUT": f.name},
+            # Like the script, the scoring spec is found before changing into the testing environment,
+            # where a relative path would find the student's files instead.
+            scoring = Path(self.assignment.scoring).absolute() if self.assignment.scoring else None
+            with self.testing_environment():
+                built, timed_out = self.build(output_stream)
+                if not built:
+                    output_stream.print(Rule(title=self.assignment.name))
+                    self.display_results(output_stream, 0, 0, 0)
+                    return RunnerResult(self.user, datetime.now(), self.course, self.assignment, [], timed_out)
+
+                with self.user.as_root():
+                    # The script leads a process group of its own, so everything it starts can be stopped with it.
+                    proc = subprocess.Popen(
+                        script,
+                        shell=False,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.STDOUT,
+                        env=environ | {"COURSEWORK_RUNNER_OUTPUT": f.name},
+                        start_new_session=True,
+                    )
+                    output, timed_out = _communicate(proc, self.assignment.timeout)
+                    output_stream.print(output.decode(errors="replace"), markup=False, highlight=False)
+
+                harness_results = (
+                    self._harness_results(output_stream, output, scoring) if self.assignment.results else []
                 )
-                output = proc.stdout.read()
-                output_stream.print(output)
-                proc.wait()
 
+            # Whatever was scored before a timeout is kept.
             contents = f.read()
 
             # SPLIT is an abitrary value.
@@ -137,24 +267,90 @@ class CmdRunner(Runner):
                 # We ignore the last value as its just an empty bytes string.
                 for line in contents.split(b"SPLIT")[:-1]
             ]
+            test_case_results.extend(harness_results)
 
         output_stream.print(Rule(title=self.assignment.name))
         for result in test_case_results:
+            self.report(result)
             output_stream.print(Rule())
-            output_stream.print(f"[bold blue]Running {result.name}...[/]\n")
+            output_stream.print(f"[bold blue]Running {escape(result.name)}...[/]\n")
             if result.was_successful:
                 output_stream.print("[bold green]Passed![/]\n")
-                earned_points += result.points
+                earned_points += result.earned_points()
                 passed += 1
             else:
                 output_stream.print("[bold red]Failed![/]\n")
                 if result.hint:
-                    output_stream.print(f"[bold blue]Hint:[/][bold]{result.hint}[/]\n")
+                    output_stream.print(f"[bold blue]Hint:[/][bold]{escape(result.hint)}[/]\n")
                 failed += 1
 
+        if timed_out:
+            output_stream.print(
+                f"[bold red]Timed out after {self.assignment.timeout} seconds. Any remaining tests were not run.[/]\n"
+            )
+
         self.display_results(output_stream, earned_points, passed, failed)
 
-        return RunnerResult(self.user, datetime.now(), self.course, self.assignment, test_case_results)
+        return RunnerResult(self.user, datetime.now(), self.course, self.assignment, test_case_results, timed_out)
+
+    def _harness_results(self, output_stream: Console, output: bytes, scoring: Path | None) -> list[TestCaseResult]:
+        """
+        Read the results the script reported as TAP on its output, or in a JUnit XML file.
+
+        This must be called inside the testing environment, which the JUnit XML file must be in.
+        Results that cannot be read are shown as an error, keeping those read before it.
+        """
+
+        test_case_results = []
+        try:
+            spec = harness.ScoringSpec.from_file(scoring) if scoring else harness.ScoringSpec()
+            if self.assignment.results == "tap":
+                cases = harness.parse_tap(output.decode(errors="replace").splitlines())
+            else:
+                name = self.assignment.results.removeprefix("junit:")
+                # The script could have linked the results to a file elsewhere, which the grader may be able to read.
+                path = (Path.cwd() / name).resolve()
+                if not path.is_relative_to(Path.cwd().resolve()):
+                    raise harness.HarnessError(f"Cannot read the JUnit results {name}: it is not in the submission")
+                cases = harness.parse_junit(path)
+
+            for name, passed in cases:
+                test_case_results.append(spec.score(name, passed))
+
+        except harness.HarnessError as e:
+            output_stream.print(Text(f"Error! {e}\n", style="bold red"))
+
+        return test_case_results
+
+
+def _communicate(proc: subprocess.Popen, timeout: float | None) -> tuple[bytes, bool]:
+    """
+    Read the process's output until it exits, yielding the output and whether it ran out of time.
+
+    A process out of time is killed along with the rest of its process group.
+    """
+
+    try:
+        output, _ = proc.communicate(timeout=timeout)
+        return output, False
+    except subprocess.TimeoutExpired:
+        pass
+
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+    # Reading carries on from where it stopped, and gives back everything read since the start.
+    try:
+        output, _ = proc.communicate(timeout=_KILL_GRACE)
+    except subprocess.TimeoutExpired as e:
+        # Something left the process group and still holds the output open. It is abandoned.
+        output = e.output or b""
+        proc.stdout.close()
+        proc.wait()
+
+    return output, True
 
 
 class PythonUnittestRunner(Runner):
@@ -168,51 +364,241 @@ class PythonUnittestRunner(Runner):
 
     def run(self, output_stream):
         test_case_results: list[TestCaseResult] = []
-        earned_points = passed = failed = 0
         with self.testing_environment():
             with self.user.as_root():
-                values = run_path(Path(self.assignment.test.filename).absolute()).values()
-            for value in values:
-                if isinstance(value, type) and issubclass(value, Assignment) and value in Assignment.__subclasses__():
-                    assessments = value.__assessments__
+                namespace = run_path(Path(self.assignment.test.filename).absolute())
+            assignments = [
+                value
+                for value in namespace.values()
+                if isinstance(value, type) and issubclass(value, Assignment) and value in Assignment.__subclasses__()
+            ]
 
+            # Fixtures run once per submission, and are shared by every assessment under them.
+            with self._fixtures(output_stream, module_fixtures(namespace), "the test module") as module_ready:
+                for value in assignments:
                     output_stream.print(Rule(title=self.assignment.name))
-                    for assessment in assessments:
-                        output_stream.print(Rule())
-                        output_stream.print(f"[bold blue]Running {assessment.name}...[/]\n")
-                        result = assessment.method.run(self._TestResult())
-
-                        if len(result.errors) > 0:
-                            output_stream.print("[bold red]Error![/]\n")
-                            failed += 1
-                            test_case_results.append(
-                                TestCaseResult(assessment.name, False, assessment.points, assessment.hint)
+                    with self._fixtures(output_stream, value.fixtures(), value.__name__) as ready:
+                        failed: set[str] = set()
+                        for assessment in value.__assessments__:
+                            unmet = [name for name in assessment.depends_on if name in failed]
+                            test_case_result = self._run_assessment(
+                                output_stream, assessment, module_ready and ready, unmet
                             )
+                            if test_case_result is None:
+                                continue
 
-                            for _, exc_info in result.errors:
-                                output_stream.print(f"{exc_info}\n")
+                            if not test_case_result.was_successful:
+                                failed.add(assessment.test_name)
+                            test_case_results.append(test_case_result)
+                            self.report(test_case_result)
 
-                        elif len(result.failures) > 0:
-                            output_stream.print("[bold red]Failed![/]\n")
-                            failed += 1
-                            test_case_results.append(
-                                TestCaseResult(assessment.name, False, assessment.points, assessment.hint)
-                            )
+        earned_points = sum(result.earned_points() for result in test_case_results)
+        passed = sum(1 for result in test_case_results if result.was_successful)
+        self.display_results(output_stream, earned_points, passed, len(test_case_results) - passed)
 
-                            for _, exc_info in result.failures:
-                                output_stream.print(f"{exc_info}\n")
+        return RunnerResult(self.user, datetime.now(), self.course, self.assignment, test_case_results)
 
-                        elif len(result.successes) > 0:
-                            output_stream.print("[bold green]Passed![/]\n")
-                            earned_points += assessment.points
-                            passed += 1
-                            test_case_results.append(
-                                TestCaseResult(assessment.name, True, assessment.points, assessment.hint)
-                            )
+    def _run_assessment(
+        self, output_stream: Console, assessment: Assignment._Assessment, ready: bool, unmet: list[str]
+    ) -> TestCaseResult | None:
+        """
+        Run one assessment, if it can be run, its fixtures were set up, and none of the tests it depends on failed.
 
-        self.display_results(output_stream, earned_points, passed, failed)
+        Skipped assessments have no result.
+        """
 
-        return RunnerResult(self.user, datetime.now(), self.course, self.assignment, test_case_results)
+        output_stream.print(Rule())
+        output_stream.print(f"[bold blue]Running {escape(assessment.name)}...[/]\n")
+
+        if not ready:
+            output_stream.print("[bold red]Error![/]\n")
+            output_stream.print("Setting up for this test failed.\n")
+            return TestCaseResult(assessment.name, False, assessment.points, assessment.hint)
+
+        if assessment.error:
+            output_stream.print("[bold red]Error![/]\n")
+            output_stream.print(f"{assessment.error}\n", markup=False)
+            return TestCaseResult(assessment.name, False, assessment.points, assessment.error)
+
+        if unmet:
+            message = f"Not run, because {', '.join(unmet)} failed."
+            output_stream.print("[bold red]Failed![/]\n")
+            output_stream.print(f"{message}\n")
+            return TestCaseResult(
+                assessment.name, False, assessment.points, " ".join(filter(None, (message, assessment.hint)))
+            )
+
+        # Whatever the student's code prints is kept with the test, rather than going to the real stdout.
+        captured = _BoundedOutput()
+        with _time_limit(assessment.timeout) as timed_out, redirect_stdout(captured), redirect_stderr(captured):
+            result = assessment.method.run(self._TestResult())
+        details = {"measurements": assessment.method.measurements or None, "output": captured.getvalue() or None}
+
+        if details["output"] is not None:
+            output_stream.print(Panel(Text(details["output"]), title="Output", title_align="left"))
+
+        if timed_out():
+            message = f"Stopped after running for longer than {assessment.timeout} seconds."
+            output_stream.print("[bold red]Timed out![/]\n")
+            output_stream.print(f"{message}\n")
+            return TestCaseResult(
+                assessment.name,
+                False,
+                assessment.points,
+                " ".join(filter(None, (message, assessment.hint))),
+                output=details["output"],
+            )
+
+        elif len(result.errors) > 0:
+            output_stream.print("[bold red]Error![/]\n")
+            for _, exc_info in result.errors:
+                output_stream.print(f"{escape(exc_info)}\n")
+            return TestCaseResult(assessment.name, False, assessment.points, assessment.hint, **details)
+
+        elif len(result.failures) > 0:
+            output_stream.print("[bold red]Failed![/]\n")
+            for _, exc_info in result.failures:
+                output_stream.print(f"{escape(exc_info)}\n")
+            return TestCaseResult(assessment.name, False, assessment.points, assessment.hint, **details)
+
+        elif len(result.successes) > 0:
+            output_stream.print("[bold green]Passed![/]\n")
+            if assessment.method.credit is None:
+                return TestCaseResult(assessment.name, True, assessment.points, assessment.hint, **details)
+
+            # Some tests, such as benchmarks, earn only part of their points.
+            # Half points round up, so a test worth 15 points at half credit earns 8.
+            partial_points = math.floor(assessment.points * assessment.method.credit + 0.5)
+            output_stream.print(f"Earned {partial_points}/{assessment.points} points.\n")
+            return TestCaseResult(
+                assessment.name, partial_points > 0, assessment.points, assessment.hint, partial_points, **details
+            )
+
+        return None
+
+    @contextmanager
+    def _fixtures(self, output_stream: Console, fixtures: AbstractContextManager, name: str) -> Iterator[bool]:
+        """
+        Hold the fixtures for the duration of the block, yielding whether they were set up.
+
+        Errors are shown rather than raised: failing to set up fails every assessment under the fixtures,
+        and failing to tear down costs nothing, since the assessments have already run.
+        """
+
+        stack = ExitStack()
+        try:
+            stack.enter_context(fixtures)
+        except Exception:
+            output_stream.print(f"[bold red]Error setting up {name}![/]\n")
+            output_stream.print(f"{escape(format_exc())}\n")
+            yield False
+            return
+
+        try:
+            yield True
+        finally:
+            try:
+                stack.close()
+            except Exception:
+                output_stream.print(f"[bold red]Error tearing down {name}![/]\n")
+                output_stream.print(f"{escape(format_exc())}\n")
+
+
+class _BoundedOutput(io.TextIOBase):
+    """
+    A text stream keeping only the first and last so many characters written to it.
+
+    Whatever is dropped from the middle is counted, and noted in its place.
+    """
+
+    def __init__(self, head: int = OUTPUT_HEAD, tail: int = OUTPUT_TAIL):
+        self.head_limit = head
+        self.tail_limit = tail
+        self.head = ""
+        self.tail = ""
+        self.dropped = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        taken = text[: self.head_limit - len(self.head)]
+        self.head += taken
+        self.tail += text[len(taken) :]
+
+        # Trimming only once the tail is twice its limit keeps writing many small pieces cheap.
+        if len(self.tail) > 2 * self.tail_limit:
+            self._trim()
+
+        return len(text)
+
+    def getvalue(self) -> str:
+        self._trim()
+        if self.dropped:
+            return f"{self.head}\n... {self.dropped} characters not shown ...\n{self.tail}"
+        return self.head + self.tail
+
+    def _trim(self):
+        if len(self.tail) > self.tail_limit:
+            self.dropped += len(self.tail) - self.tail_limit
+            self.tail = self.tail[-self.tail_limit :]
+
+
+class _TimedOut(BaseException):
+    """Raised into a test that ran out of time. It is not an Exception, so student code does not catch it."""
+
+
+# How long a test that ran out of time has to finish its tearDown and cleanups before it is interrupted again.
+_TIMEOUT_GRACE = 1.0
+# How many times a test is interrupted before giving up on it ending, and exiting instead.
+_TIMEOUT_ATTEMPTS = 5
+
+
+@contextmanager
+def _time_limit(seconds: float | None) -> Iterator[Callable[[], bool]]:
+    """
+    Interrupt the block if it runs for longer than the given number of seconds, yielding whether it was.
+
+    The test's tearDown and cleanups still run once it is interrupted, so it is given `_TIMEOUT_GRACE` seconds
+    before being interrupted again. Student code that catches BaseException in a loop is never stopped by
+    being interrupted, so after `_TIMEOUT_ATTEMPTS` interruptions the process exits instead.
+    Signals can only be handled on the main thread, so elsewhere there is no limit.
+    """
+
+    if seconds is None:
+        yield lambda: False
+        return
+
+    if threading.current_thread() is not threading.main_thread():
+        logger.warning("Not limiting a test to %s seconds, since it is not running on the main thread.", seconds)
+        yield lambda: False
+        return
+
+    interruptions = 0
+    stopped = False
+
+    def interrupt(signum, frame):
+        nonlocal interruptions
+        if stopped:
+            return
+
+        interruptions += 1
+        if interruptions > _TIMEOUT_ATTEMPTS:
+            # Standard output may be redirected into the test's captured output, which is never shown now.
+            os.write(2, f"A test kept running after being stopped {_TIMEOUT_ATTEMPTS} times.\n".encode())
+            os._exit(1)
+        raise _TimedOut()
+
+    previous = signal.signal(signal.SIGALRM, interrupt)
+    signal.setitimer(signal.ITIMER_REAL, seconds, _TIMEOUT_GRACE)
+    try:
+        yield lambda: interruptions > 0
+    except _TimedOut:
+        pass
+    finally:
+        stopped = True
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
 
 
 class ManualRunner(Runner):
@@ -0,0 +1,176 @@
+"""
+scheduler.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Grading Scheduler
+
+A host-wide limit on how many gradings run at once, shared by the student CLI and the web interface.
+The scheduler is a directory of lock files, so it needs no service of its own:
+every grading holds an exclusive lock on its ticket for as long as it waits or runs,
+and a ticket nobody holds a lock on belongs to a process that has exited.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+from typing import Iterator
+
+from coursework.loaders import Configuration
+
+
+class SchedulerFull(Exception):
+    """Raised if too many gradings are already waiting for a slot."""
+
+
+@dataclass(frozen=True, order=True)
+class _Ticket:
+    arrived_at: int
+    pid: int
+    user: str
+
+    @property
+    def name(self) -> str:
+        return f"{self.arrived_at}-{self.pid}-{self.user}"
+
+    @classmethod
+    def from_name(cls, name: str) -> _Ticket:
+        arrived_at, pid, user = name.split("-", 2)
+        return cls(int(arrived_at), int(pid), user)
+
+
+class Scheduler:
+    """
+    # Scheduler.
+
+    Admits at most `slots` gradings at once. Gradings waiting for a slot are admitted fairly:
+    students with fewer gradings running go first, then each student's oldest waiting grading in turn,
+    so one student submitting over and over cannot crowd out everyone else.
+    At most `max_waiting` gradings may wait, after which new ones are refused.
+
+    The layout is `scheduler.lock`, guarding every decision, and `waiting/` and `running/` holding tickets.
+    """
+
+    def __init__(self, path: str | Path, slots: int, max_waiting: int, poll_interval: float = 0.5):
+        self.path = Path(path)
+        self.slots = slots
+        self.max_waiting = max_waiting
+        self.poll_interval = poll_interval
+
+        self.waiting = self.path / "waiting"
+        self.running = self.path / "running"
+        for directory in (self.waiting, self.running):
+            directory.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config: Configuration) -> Scheduler | None:
+        """Open the scheduler defined by the configuration, if there is one."""
+
+        return cls(config.scheduler, config.grading_slots, config.max_waiting) if config.scheduler else None
+
+    @contextmanager
+    def slot(self, user: str, on_wait: Callable[[int], None] | None = None) -> Iterator[None]:
+        """
+        Wait for a grading slot, and hold it for the duration of the block.
+
+        While waiting, `on_wait` is called with how many gradings are ahead, whenever that changes.
+        """
+
+        ticket = _Ticket(time.time_ns(), os.getpid(), user)
+        ticket_fd = self._enqueue(ticket)
+        try:
+            position = None
+            while not self._try_admit(ticket):
+                ahead = self.position(ticket)
+                if on_wait is not None and ahead != position:
+                    on_wait(ahead)
+                position = ahead
+                time.sleep(self.poll_interval)
+
+            yield
+
+        finally:
+            (self.waiting / ticket.name).unlink(missing_ok=True)
+            (self.running / ticket.name).unlink(missing_ok=True)
+            os.close(ticket_fd)
+
+    def position(self, ticket: _Ticket) -> int:
+        """How many waiting gradings will be admitted before this one."""
+
+        with self._locked():
+            order = self._waiting_order()
+
+        return order.index(ticket) if ticket in order else 0
+
+    def _enqueue(self, ticket: _Ticket) -> int:
+        with self._locked():
+            if len(self._live(self.waiting)) >= self.max_waiting:
+                raise SchedulerFull(f"{self.max_waiting} gradings are already waiting. Please try again shortly.")
+
+            fd = os.open(self.waiting / ticket.name, os.O_RDONLY | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+
+        return fd
+
+    def _try_admit(self, ticket: _Ticket) -> bool:
+        with self._locked():
+            free = self.slots - len(self._live(self.running))
+            order = self._waiting_order()
+            if ticket not in order[: max(free, 0)]:
+                return False
+
+            # The ticket's lock is kept through the rename, so the slot stays held.
+            os.rename(self.waiting / ticket.name, self.running / ticket.name)
+            return True
+
+    def _waiting_order(self) -> list[_Ticket]:
+        running: dict[str, int] = {}
+        for ticket in self._live(self.running):
+            running[ticket.user] = running.get(ticket.user, 0) + 1
+
+        turns: dict[str, int] = {}
+        keys = {}
+        for ticket in sorted(self._live(self.waiting)):
+            keys[ticket] = (running.get(ticket.user, 0) + turns.get(ticket.user, 0), ticket)
+            turns[ticket.user] = turns.get(ticket.user, 0) + 1
+
+        return sorted(keys, key=keys.__getitem__)
+
+    def _live(self, directory: Path) -> list[_Ticket]:
+        """Get the tickets in the directory, removing those left behind by processes that have exited."""
+
+        tickets = []
+        for path in directory.iterdir():
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                tickets.append(_Ticket.from_name(path.name))
+            else:
+                try:
+                    path.unlink(missing_ok=True)
+                except PermissionError:
+                    pass
+            finally:
+                os.close(fd)
+
+        return tickets
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        fd = os.open(self.path / "scheduler.lock", os.O_RDONLY | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
@@ -0,0 +1,213 @@
+"""
+store.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Content-Addressed Submission Store
+
+Submitted files are stored once as blobs keyed by their sha256 digest.
+Each submission is recorded as a small JSON manifest mapping file names to digests,
+so past attempts are kept cheaply and resubmitting unchanged files writes nothing new.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from os import getpid
+from os import replace
+from os import utime
+from pathlib import Path
+from shutil import copyfile
+from shutil import copyfileobj
+from typing import BinaryIO
+from typing import Iterator
+
+from coursework.loaders import Configuration
+from coursework.models import RunnerResult
+
+# Blobs younger than this are never collected.
+# This protects blobs written by a submission that has not written its manifest yet.
+GC_GRACE_PERIOD = 60 * 60
+
+
+@dataclass(frozen=True)
+class Manifest:
+    """
+    # Manifest.
+
+    A single stored submission attempt.
+    """
+
+    path: Path
+    student: str
+    course: str
+    assignment: str
+    ran_at: datetime
+    score: int
+    result: str
+    files: dict[str, str]
+
+
+class BlobStore:
+    """
+    # BlobStore.
+
+    A content-addressed store of submitted files.
+    The layout is `blobs/<2 hex>/<digest>` and `manifests/<course>/<assignment>/<student>/<timestamp>.json`.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.blobs = self.root / "blobs"
+        self.manifests = self.root / "manifests"
+
+    @classmethod
+    def from_config(cls, config: Configuration) -> BlobStore | None:
+        """Open the store defined by the configuration, if there is one."""
+
+        return cls(config.store) if config.store else None
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blobs / digest[:2] / digest
+
+    def put(self, file: Path) -> str:
+        """Store the file, returning its digest. Files that are already stored are not written again."""
+
+        with file.open("rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()
+            if not self._touch(digest):
+                f.seek(0)
+                with self._writer(digest) as out:
+                    copyfileobj(f, out)
+
+        return digest
+
+    def put_bytes(self, data: bytes) -> str:
+        """Store the byte string, returning its digest."""
+
+        digest = hashlib.sha256(data).hexdigest()
+        if not self._touch(digest):
+            with self._writer(digest) as out:
+                out.write(data)
+
+        return digest
+
+    def _touch(self, digest: str) -> bool:
+        """Check if the blob exists, refreshing its modification time if it does."""
+
+        try:
+            # Touching the blob keeps it inside the grace period of a concurrent gc.
+            utime(self.blob_path(digest))
+            return True
+        except FileNotFoundError:
+            return False
+
+    @contextmanager
+    def _writer(self, digest: str) -> Iterator[BinaryIO]:
+        blob = self.blob_path(digest)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = blob.with_name(f".{digest}.{getpid()}")
+        with temp_path.open("wb") as out:
+            yield out
+
+        temp_path.chmod(0o444)
+        replace(temp_path, blob)
+
+    def checkout(self, digest: str, destination: Path) -> None:
+        """
+        Copy the blob to the destination.
+
+        Blobs are copied rather than hard linked, since a hard link would let a write to one submission's file
+        change the blob, and with it every other submission sharing it.
+        """
+
+        copyfile(self.blob_path(digest), destination)
+
+    def write_manifest(self, result: RunnerResult, files: dict[str, str]) -> Manifest:
+        """Record a submission attempt for the result, made up of the given files by digest."""
+
+        directory = self.manifests / result.course.name / result.assignment.name / result.user.name
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{result.ran_at.strftime('%Y%m%dT%H%M%S%f')}.json"
+
+        temp_path = path.with_name(f".{path.name}.{getpid()}")
+        temp_path.write_text(
+            json.dumps(
+                {
+                    "student": result.user.name,
+                    "course": result.course.name,
+                    "assignment": result.assignment.name,
+                    "ran_at": result.ran_at.isoformat(),
+                    "score": result.earned_points(),
+                    "result": self.put_bytes(result.encode()),
+                    "files": files,
+                }
+            )
+        )
+        replace(temp_path, path)
+
+        return self._read_manifest(path)
+
+    def restore(self, manifest: Manifest, destination: Path) -> None:
+        """Check out a stored attempt, including its `.runner-output`, into the destination directory."""
+
+        destination.mkdir(parents=True, exist_ok=True)
+        self.checkout(manifest.result, destination / ".runner-output")
+        for name, digest in manifest.files.items():
+            self.checkout(digest, destination / name)
+
+    def history(self, student: str, course: str, assignment: str) -> list[Manifest]:
+        """Get every stored attempt for the student's assignment, oldest first."""
+
+        directory = self.manifests / course / assignment / student
+        return [self._read_manifest(path) for path in sorted(directory.glob("*.json"))]
+
+    def gc(self, keep: int | None = None) -> tuple[int, int]:
+        """
+        Collect garbage from the store.
+
+        If `keep` is given, only the newest `keep` attempts of each submission are retained.
+        Afterwards every blob not referenced by a manifest is removed.
+        Returns the number of removed manifests and blobs.
+        """
+
+        removed_manifests = 0
+        if keep is not None:
+            for directory in {path.parent for path in self.manifests.glob("*/*/*/*.json")}:
+                paths = sorted(directory.glob("*.json"))
+                for path in paths[: max(len(paths) - keep, 0)]:
+                    path.unlink()
+                    removed_manifests += 1
+
+        referenced = set()
+        for path in self.manifests.glob("*/*/*/*.json"):
+            manifest = self._read_manifest(path)
+            referenced.add(manifest.result)
+            referenced.update(manifest.files.values())
+
+        removed_blobs = 0
+        cutoff = time.time() - GC_GRACE_PERIOD
+        for blob in self.blobs.glob("*/*"):
+            if blob.name not in referenced and not blob.name.startswith(".") and blob.stat().st_mtime < cutoff:
+                blob.unlink()
+                removed_blobs += 1
+
+        return removed_manifests, removed_blobs
+
+    def _read_manifest(self, path: Path) -> Manifest:
+        values = json.loads(path.read_text())
+        return Manifest(
+            path,
+            values["student"],
+            values["course"],
+            values["assignment"],
+            datetime.fromisoformat(values["ran_at"]),
+            values["score"],
+            values["result"],
+            values["files"],
+        )
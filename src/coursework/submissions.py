@@ -0,0 +1,236 @@
+"""
+submissions.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Saving Submissions
+
+Both the student CLI and the web interface save submissions through here,
+so the submission directory, the store, and the index stay in agreement.
+"""
+
+import fcntl
+import gzip
+import os
+import pwd
+import stat
+import threading
+import time
+from contextlib import contextmanager
+from os import rename
+from pathlib import Path
+from shutil import copy2
+from shutil import move as shutil_move
+from shutil import rmtree
+from tempfile import mkdtemp
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from uuid import uuid4
+
+from coursework import metrics
+from coursework.index import SubmissionIndex
+from coursework.loaders import Configuration
+from coursework.models import RunnerResult
+from coursework.store import BlobStore
+
+# The results as shown to the student while grading, kept so they can be shown again without grading again.
+RESULTS_PAGE = ".runner-output.html.gz"
+
+# Staging directories younger than this might still be written by a save, and are never removed.
+STAGING_GRACE_PERIOD = 60 * 60
+
+
+@metrics.SAVE_DURATION.time()
+def save(
+    config: Configuration,
+    result: RunnerResult,
+    save_path: Path,
+    files: list[Path],
+    progress: Callable[[list[Path]], Iterable[Path]] = iter,
+    move: bool = False,
+    results_page: str | None = None,
+) -> threading.Thread:
+    """
+    Save the result and submitted files into the submission directory.
+
+    The submission is written to a sibling staging directory and then swapped in,
+    so a previous submission is only replaced once the new one is complete.
+    If a store is configured, files are stored there and copied into the submission directory.
+    If an index is configured, the submission is recorded in it.
+    `progress` wraps the iteration over files, for example with `rich.progress.track`.
+    With `move`, files that are not stored are moved instead of copied, which avoids a copy
+    when the caller is done with them, such as an upload that has already been graded.
+    `results_page` is the rendered HTML of the grading output, which is kept compressed next to the result.
+    The thread removing the previous submission is returned, as from `swap_in`.
+    """
+
+    save_path.parent.mkdir(parents=True, exist_ok=True)
+    staging_path = Path(mkdtemp(prefix=f".{save_path.name}.staging-", dir=save_path.parent))
+    # mkdtemp only lets its owner in, but the submission directory should be made like any other directory.
+    staging_path.chmod(save_path.parent.stat().st_mode & 0o777)
+    result.to_file(staging_path / ".runner-output")
+    if results_page is not None:
+        with gzip.open(staging_path / RESULTS_PAGE, "wt", encoding="utf-8") as f:
+            f.write(results_page)
+
+    store = BlobStore.from_config(config)
+    digests: dict[str, str] = {}
+
+    for file in progress(files):
+        if store:
+            digests[file.name] = store.put(file)
+            store.checkout(digests[file.name], staging_path / file.name)
+        elif move:
+            shutil_move(file, staging_path / file.name)
+        else:
+            # We use copy2 instead of copy since copy2 is supposed to perserve file metadata
+            # https://docs.python.org/3/library/shutil.html#shutil.copy2
+            copy2(file.absolute(), staging_path / file.name)
+
+    cleanup = swap_in(staging_path, save_path)
+
+    if store:
+        store.write_manifest(result, digests)
+
+    if index := SubmissionIndex.from_config(config):
+        index.record(result, save_path, [save_path / file.name for file in files])
+
+    return cleanup
+
+
+def submitted(config: Configuration, student: str, course: Configuration.Course) -> set[str]:
+    """Get the names of the course's assignments the student has submitted."""
+
+    if index := SubmissionIndex.from_config(config):
+        return index.submitted(student, course.name)
+
+    return {
+        assignment
+        for assignment in course.assignments
+        if Path(config.submission.format(student=student, course=course.name, assignment=assignment))
+        .absolute()
+        .exists()
+    }
+
+
+def read_results_page(config: Configuration, student: str, course: str, assignment: str) -> str | None:
+    """
+    Get the rendered results of the student's current submission, if they were kept and can be read.
+
+    This is called as root, so the page is only read if it is a regular file owned by the student
+    (or by this process, which saves the web's submissions), and never through a symlink.
+    Every directory from the student's own down to the submission is opened one at a time for the same reason,
+    since the student could have made any of them a symlink to another student's.
+    """
+
+    try:
+        uid = pwd.getpwnam(student).pw_uid
+        fd = _open_submission(config, student, course, assignment)
+    except (KeyError, OSError):
+        return None
+
+    with open(fd, "rb") as raw:
+        status = os.fstat(raw.fileno())
+        if not stat.S_ISREG(status.st_mode) or status.st_uid not in (uid, os.geteuid()):
+            return None
+
+        try:
+            with gzip.open(raw, "rt", encoding="utf-8") as f:
+                return f.read()
+        except (OSError, EOFError, UnicodeDecodeError):
+            # BadGzipFile is an OSError.
+            return None
+
+
+def _open_submission(config: Configuration, student: str, course: str, assignment: str) -> int:
+    # The directories before the first one named after the student, course, or assignment are the administrator's.
+    template = Path(config.submission).absolute().parts
+    first = next((i for i, part in enumerate(template) if "{" in part), len(template) - 1)
+    parts = [part.format(student=student, course=course, assignment=assignment) for part in template]
+
+    fd = os.open(Path(*parts[:first]), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        for part in parts[first:]:
+            parent_fd, fd = fd, os.open(part, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW, dir_fd=fd)
+            os.close(parent_fd)
+
+        # Without O_NONBLOCK, opening a FIFO would wait for a writer.
+        return os.open(RESULTS_PAGE, os.O_RDONLY | os.O_NOFOLLOW | os.O_NONBLOCK, dir_fd=fd)
+    finally:
+        os.close(fd)
+
+
+def swap_in(staging_path: Path, save_path: Path) -> threading.Thread:
+    """
+    Replace the directory at save_path with the one at staging_path.
+
+    Both renames are on the same filesystem, so neither depends on the size of the submission.
+    If the process dies between them, the previous submission is left at `.<name>.old-*`,
+    and is put back before the next swap.
+    Swaps of the same submission directory take turns, holding its lock file, `.<name>.lock`.
+    The previous submission, and anything left over by earlier crashes, is removed in a background thread,
+    which is returned. The process waits for it before exiting, so nothing is left behind.
+    """
+
+    with _locked(save_path):
+        _recover(save_path)
+        if save_path.exists():
+            # Old directories are named by when they were moved aside, so the newest can be found by name.
+            rename(save_path, save_path.with_name(f".{save_path.name}.old-{time.time_ns():020d}-{uuid4().hex}"))
+        rename(staging_path, save_path)
+
+    cleanup = threading.Thread(target=_remove_old, args=(save_path,))
+    cleanup.start()
+    return cleanup
+
+
+def recover(save_path: Path) -> bool:
+    """Put the newest previous submission back if a swap died before moving its replacement in."""
+
+    with _locked(save_path):
+        return _recover(save_path)
+
+
+def _recover(save_path: Path) -> bool:
+    if save_path.exists():
+        return False
+
+    old_paths = sorted(save_path.parent.glob(f".{save_path.name}.old-*"))
+    if not old_paths:
+        return False
+
+    rename(old_paths[-1], save_path)
+    return True
+
+
+@contextmanager
+def _locked(save_path: Path) -> Iterator[None]:
+    with open(save_path.with_name(f".{save_path.name}.lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def _remove_old(save_path: Path):
+    # Old directories are moved to the trash while holding the lock, so none is removed while being recovered,
+    # but removing them, which can take a while, does not hold up other swaps.
+    with _locked(save_path):
+        # Without a current submission, the old ones are all that is left, so they are kept to be recovered.
+        if not save_path.exists():
+            return
+
+        for old_path in save_path.parent.glob(f".{save_path.name}.old-*"):
+            rename(old_path, save_path.with_name(f".{save_path.name}.trash-{uuid4().hex}"))
+
+    # Trash is never recovered, so any left behind by a crash is removed too.
+    for trash_path in save_path.parent.glob(f".{save_path.name}.trash-*"):
+        rmtree(trash_path, ignore_errors=True)
+
+    # Staging directories are only left behind by a crash, but one still being written is young.
+    cutoff = time.time() - STAGING_GRACE_PERIOD
+    for staging_path in save_path.parent.glob(f".{save_path.name}.staging-*"):
+        try:
+            if staging_path.stat().st_mtime < cutoff:
+                rmtree(staging_path, ignore_errors=True)
+        except FileNotFoundError:
+            continue
@@ -11,12 +11,23 @@ This is used by the "py:" runner of coursework.
 
 from __future__ import annotations
 
+import copy
 import functools
+import gc
+import statistics
+import time
+import tracemalloc
 import typing
+from contextlib import contextmanager
 from dataclasses import dataclass
+from dataclasses import replace
 from unittest import TestCase
+from unittest import doModuleCleanups
 from unittest.util import three_way_cmp
 
+# Pairs of (the largest ratio of the student's time to the reference's, the share of the points earned).
+DEFAULT_SPEED_SCALE = ((1.25, 1.0), (2.0, 0.75), (4.0, 0.5), (8.0, 0.25))
+
 
 class Assignment(TestCase):
     """
@@ -33,22 +44,178 @@ class Assignment(TestCase):
         """
 
         name: str
-        method: TestCase
+        assignment: type[Assignment]
+        # The name of the test method, shared by every case of a method with @cases.
+        test_name: str
         points: int
         hint: str = ""
+        timeout: float | None = None
+        # The names of the test methods that must pass for this one to be worth running.
+        depends_on: tuple[str, ...] = ()
+        # The positional and keyword arguments of this case, for a method with @cases.
+        case: tuple[tuple, dict] | None = None
+        # Why the assessment cannot be run at all, such as depending on a test that does not exist.
+        error: str | None = None
+
+        @functools.cached_property
+        def method(self) -> Assignment:
+            """The test case to run, only created when it is first needed."""
+
+            return self.assignment(self.test_name, self.case)
+
+    def __init__(self, methodName: str = "runTest", case: tuple[tuple, dict] | None = None):
+        super().__init__(methodName)
+        # What the test measured, and the share of its points it earned if not all of them, for the runner to record.
+        self.measurements: dict[str, typing.Any] = {}
+        self.credit: float | None = None
+
+        if case is not None:
+            args, kwargs = case
+            setattr(self, methodName, functools.partial(getattr(self, methodName), *args, **kwargs))
 
     def __init_subclass__(cls):
-        cls.__assessments__ = [
+        assessments = [
             cls._Assessment(
-                name=getattr(func, "__testname__", name),
-                method=cls(name),
+                name=case_name,
+                assignment=cls,
+                test_name=name,
                 points=func.__points__,
                 hint=getattr(func, "__hint__", ""),
+                timeout=getattr(func, "__timeout__", None),
+                depends_on=getattr(func, "__depends_on__", ()),
+                case=case,
             )
             for name in dir(cls)
             if name.startswith("test_") and callable(func := getattr(cls, name, None)) and hasattr(func, "__points__")
+            for case_name, case in _expand(getattr(func, "__testname__", name), getattr(func, "__cases__", None))
         ]
-        cls.__assessments__.sort(key=lambda a: functools.cmp_to_key(three_way_cmp)(a.name))
+        assessments.sort(key=lambda a: functools.cmp_to_key(three_way_cmp)(a.name))
+
+        by_test: dict[str, list[Assignment._Assessment]] = {}
+        for assessment in assessments:
+            by_test.setdefault(assessment.test_name, []).append(assessment)
+        cls.__assessments__ = _in_dependency_order(by_test)
+
+    @contextmanager
+    def assertMaxMemory(self, budget: int) -> typing.Iterator[None]:
+        """
+        Fail if the block allocates more than `budget` bytes at its peak, recording the peak either way.
+
+        Allocations are only traced inside the block, so tests that never use this pay nothing for it.
+        """
+
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            if not was_tracing:
+                tracemalloc.stop()
+            peak = max(peak - baseline, 0)
+            self.measurements["peak_memory"] = max(peak, self.measurements.get("peak_memory", 0))
+
+        if peak > budget:
+            self.fail(f"Allocated {peak} bytes at its peak, over the budget of {budget} bytes.")
+
+    @classmethod
+    @contextmanager
+    def fixtures(cls) -> typing.Iterator[None]:
+        """
+        Set up the class once for all of its assessments, and tear it down after the last one.
+
+        Assessments are run one at a time rather than as a suite, so this does what the suite would:
+        `setUpClass` before, `tearDownClass` after, and the class cleanups either way.
+        """
+
+        try:
+            cls.setUpClass()
+        except Exception:
+            cls.doClassCleanups()
+            raise
+
+        try:
+            yield
+        finally:
+            try:
+                cls.tearDownClass()
+            finally:
+                cls.doClassCleanups()
+
+
+@contextmanager
+def module_fixtures(namespace: dict[str, typing.Any]) -> typing.Iterator[None]:
+    """Run the test file's `setUpModule` before its assignments, and its `tearDownModule` after them."""
+
+    try:
+        if callable(set_up := namespace.get("setUpModule")):
+            set_up()
+    except Exception:
+        doModuleCleanups()
+        raise
+
+    try:
+        yield
+    finally:
+        try:
+            if callable(tear_down := namespace.get("tearDownModule")):
+                tear_down()
+        finally:
+            doModuleCleanups()
+
+
+def _expand(name: str, cases: tuple | None) -> list[tuple[str, tuple[tuple, dict] | None]]:
+    """Get the name and arguments of each case of a test, or of the test itself if it has no cases."""
+
+    if cases is None:
+        return [(name, None)]
+
+    expanded = []
+    for row in cases:
+        args, kwargs = ((), row) if isinstance(row, dict) else (tuple(row), {})
+        arguments = ", ".join([*map(repr, args), *(f"{key}={value!r}" for key, value in kwargs.items())])
+        expanded.append((f"{name} ({arguments})", (args, kwargs)))
+
+    return expanded
+
+
+def _in_dependency_order(by_test: dict[str, list[Assignment._Assessment]]) -> list[Assignment._Assessment]:
+    """
+    Order the assessments so each test comes after the tests it depends on, and otherwise in the given order.
+
+    A test depending on one that does not exist, or on itself, is given an error instead of failing the import,
+    so the rest of the assignment can still be graded.
+    """
+
+    ordered: dict[str, list[Assignment._Assessment]] = {}
+    visiting: set[str] = set()
+
+    def visit(name: str):
+        if name in ordered:
+            return
+
+        visiting.add(name)
+        error = None
+        for dependency in by_test[name][0].depends_on:
+            if dependency not in by_test:
+                error = f"{name} depends on {dependency}, which is not an assessment."
+            elif dependency == name:
+                error = f"{name} depends on itself."
+            elif dependency in visiting:
+                error = f"{name} depends on {dependency}, which depends on {name} in turn."
+            else:
+                visit(dependency)
+        visiting.remove(name)
+        ordered[name] = [replace(assessment, error=error) for assessment in by_test[name]] if error else by_test[name]
+
+    for name in by_test:
+        visit(name)
+
+    return [assessment for assessments in ordered.values() for assessment in assessments]
 
 
 def points(value: int):
@@ -82,3 +249,131 @@ def hint(value: str):
         return func
 
     return inner
+
+
+def timeout(seconds: float):
+    """Fail the test, and stop it, if it runs for longer than this many seconds."""
+
+    def inner(func: typing.Callable):
+        func.__timeout__ = seconds
+
+        return func
+
+    return inner
+
+
+def depends_on(*names: str):
+    """Fail the test without running it if any of these tests, by method name, failed."""
+
+    def inner(func: typing.Callable):
+        func.__depends_on__ = names
+
+        return func
+
+    return inner
+
+
+def cases(*rows: tuple | dict):
+    """
+    Expand the test into one assessment per row, each worth the test's points.
+
+    A row is a tuple of positional arguments or a dict of keyword arguments, which the test is called with.
+    Each assessment is named after the test and its arguments.
+    """
+
+    def inner(func: typing.Callable):
+        func.__cases__ = rows
+
+        return func
+
+    return inner
+
+
+def memory_budget(budget: int):
+    """Fail the test if it allocates more than this many bytes at its peak."""
+
+    def inner(func: typing.Callable):
+        @functools.wraps(func)
+        def wrapper(self: Assignment, *args, **kwargs):
+            with self.assertMaxMemory(budget):
+                return func(self, *args, **kwargs)
+
+        return wrapper
+
+    return inner
+
+
+def benchmark(
+    reference: typing.Callable,
+    inputs: typing.Iterable[tuple],
+    warmup: int = 1,
+    repeat: int = 5,
+    number: int = 1,
+    statistic: typing.Callable[[list[float]], float] = statistics.median,
+    scale: typing.Sequence[tuple[float, float]] = DEFAULT_SPEED_SCALE,
+    check: bool = True,
+):
+    """
+    Award the test's points by how fast the student's code is, compared to a reference implementation.
+
+    The test returns the student's callable. It and the reference are both called with each input,
+    a tuple of arguments, `warmup` times and then `repeat` times, `number` calls to each timing.
+    The timings for each input are reduced with `statistic`, and the student's total time over the reference's
+    is looked up in `scale`: pairs of (the largest ratio, the share of the points earned), in increasing order.
+    Slower than the end of the scale earns nothing. Partial points are rounded to the nearest point, halves up.
+    If `check` is set, a different answer than the reference's fails.
+    """
+
+    inputs = list(inputs)
+
+    def inner(func: typing.Callable):
+        @functools.wraps(func)
+        def wrapper(self: Assignment, *args, **kwargs):
+            student = func(self, *args, **kwargs)
+            student_seconds = []
+            reference_seconds = []
+
+            for arguments in inputs:
+                if check:
+                    self.assertEqual(
+                        student(*copy.deepcopy(arguments)),
+                        reference(*copy.deepcopy(arguments)),
+                        f"Wrong answer for {arguments!r}.",
+                    )
+
+                for _ in range(warmup):
+                    _time(student, arguments, number)
+                    _time(reference, arguments, number)
+
+                # Taking turns keeps the machine getting busier or quieter from favouring either one.
+                timings = [
+                    (_time(student, arguments, number), _time(reference, arguments, number)) for _ in range(repeat)
+                ]
+                student_seconds.append(statistic([timing for timing, _ in timings]))
+                reference_seconds.append(statistic([timing for _, timing in timings]))
+
+            ratio = sum(student_seconds) / max(sum(reference_seconds), 1e-9)
+            self.measurements.update(
+                student_seconds=student_seconds, reference_seconds=reference_seconds, speed_ratio=ratio
+            )
+            self.credit = next((share for largest, share in scale if ratio <= largest), 0.0)
+
+        return wrapper
+
+    return inner
+
+
+def _time(func: typing.Callable, args: tuple, number: int) -> float:
+    """Time calling the function `number` times, each with its own copy of the arguments, in seconds per call."""
+
+    calls = [copy.deepcopy(args) for _ in range(number)]
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for call in calls:
+            func(*call)
+        return (time.perf_counter() - start) / number
+    finally:
+        if gc_was_enabled:
+            gc.enable()
@@ -14,6 +14,20 @@ def bootstrap_app():
     app = flask.Flask(__name__)
     login_manager = flask_login.LoginManager()
 
+    app.config["GRADING_SPOOL"] = "/var/spool/coursework"
+    app.config["GRADING_UPLOADS"] = "/var/spool/coursework/uploads"
+    app.config["GRADER_SOCKET"] = "/run/coursework/grader.sock"
+    app.config["GRADER_SOCKET_GROUP"] = None
+    app.config["GRADING_MAX_FILE_SIZE"] = 8 * 1024 * 1024
+    app.config["MAX_CONTENT_LENGTH"] = 32 * 1024 * 1024
+    app.config["GRADING_EVENTS_POLL_INTERVAL"] = 0.25
+    app.config["GRADING_STATUS_TTL"] = 60
+    app.config["GRADING_JOB_RETENTION"] = 7 * 24 * 60 * 60
+    app.config["GRADING_JOB_TIMEOUT"] = 30 * 60
+    app.config["GRADING_METRICS"] = "/var/spool/coursework/metrics"
+    app.config["WEB_METRICS"] = "/var/spool/coursework/web-metrics"
+    app.config["SAML_METADATA_CACHE"] = "/var/cache/coursework/idp-metadata.json"
+    app.config["SAML_METADATA_TTL"] = 60 * 60
     app.config.from_prefixed_env()
     with open(environ["COURSEWORK_CONFIG"], "rb") as f:
         app.config["coursework_config"] = loaders.Configuration.from_toml(f)
@@ -21,7 +35,10 @@ def bootstrap_app():
     print(app.config)
 
     from coursework.web import auth
+    from coursework.web import monitoring
     from coursework.web import submission
+    from coursework.web import uploads
+    from coursework.web import worker
 
     login_manager.init_app(app)
     login_manager.login_view = "auth.cune_saml_login"
@@ -37,8 +54,11 @@ def bootstrap_app():
 
         return auth.User(name=user_id, role="student")
 
+    app.request_class = uploads.UploadRequest
     app.register_blueprint(auth.bp)
     app.register_blueprint(submission.bp)
+    app.register_blueprint(monitoring.bp)
+    app.cli.add_command(worker.grade_worker_command)
 
     if app.config["DEBUG"]:
 
@@ -9,7 +9,14 @@ Description: Authentication Setup
 from __future__ import annotations
 
 import contextlib
+import copy
 import http
+import json
+import logging
+import os
+import pathlib
+import threading
+import time
 import typing as t
 
 import flask
@@ -29,6 +36,8 @@ if t.TYPE_CHECKING:
 
 bp = flask.Blueprint("auth", __name__, url_prefix="/accounts")
 
+logger = logging.getLogger(__name__)
+
 ### Classes ###
 
 
@@ -42,6 +51,138 @@ class User(loaders.User, flask_login.UserMixin):
         return loaders.User(name=self.name, role=self.role)
 
 
+class IdPMetadataUnavailable(Exception):
+    """Raised if there is no copy of the IdP metadata, and fetching it failed too recently to try again."""
+
+
+class IdPMetadataCache:
+    """
+    Cache of parsed IdP metadata, kept in process and (optionally) on disk.
+
+    Metadata younger than `ttl` seconds is used as is. Older metadata is still used,
+    while a background thread fetches a fresh copy. If fetching fails, the last good copy
+    is kept, and fetching is not tried again for `retry` seconds.
+    Only when there is no copy at all does a request wait on the IdP, and then concurrent requests
+    share a single fetch.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        path: pathlib.Path | None = None,
+        ttl: float = 60 * 60,
+        timeout: float = 60 * 4,
+        retry: float = 60,
+    ):
+        self.url = url
+        self.path = path
+        self.ttl = ttl
+        self.timeout = timeout
+        self.retry = retry
+        # Guards the fields below, and is never held while talking to the IdP.
+        self._lock = threading.Lock()
+        # Held for the whole of a fetch made without a copy.
+        self._fetch_lock = threading.Lock()
+        self._refreshing = False
+        self._retry_at = 0.0
+        self._entry: dict | None = None
+
+    def get(self) -> dict:
+        """Get the parsed IdP metadata."""
+
+        with self._lock:
+            if self._entry is None:
+                self._entry = self._read()
+
+            entry = self._entry
+            if (
+                entry is not None
+                and time.time() - entry["fetched_at"] >= self.ttl
+                and time.time() >= self._retry_at
+                and not self._refreshing
+            ):
+                self._refreshing = True
+                threading.Thread(target=self._refresh, daemon=True).start()
+
+        if entry is None:
+            entry = self._fetch_first()
+
+        return copy.deepcopy(entry["metadata"])
+
+    def _fetch_first(self) -> dict:
+        with self._fetch_lock:
+            with self._lock:
+                # Another request fetched it while this one waited.
+                if self._entry is not None:
+                    return self._entry
+                if time.time() < self._retry_at:
+                    raise IdPMetadataUnavailable(f"Fetching IdP metadata from {self.url} failed, try again later.")
+
+            try:
+                entry = self._fetch()
+            except Exception:
+                with self._lock:
+                    self._retry_at = time.time() + self.retry
+                raise
+
+            with self._lock:
+                self._entry = entry
+            return entry
+
+    def _refresh(self):
+        try:
+            entry = self._fetch()
+        except Exception:
+            logger.exception(
+                "Failed to refresh IdP metadata from %s, keeping the last good copy and retrying in %s seconds.",
+                self.url,
+                self.retry,
+            )
+            entry = None
+
+        with self._lock:
+            if entry is not None:
+                self._entry = entry
+            else:
+                self._retry_at = time.time() + self.retry
+            self._refreshing = False
+
+    def _fetch(self) -> dict:
+        metadata = idp_metadata_parser.OneLogin_Saml2_IdPMetadataParser.parse_remote(self.url, timeout=self.timeout)
+        entry = {"url": self.url, "fetched_at": time.time(), "metadata": metadata}
+        self._write(entry)
+        return entry
+
+    def _read(self) -> dict | None:
+        if self.path is None:
+            return None
+
+        try:
+            entry = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return None
+
+        # A copy of another IdP's metadata is no copy at all.
+        return entry if entry.get("url") == self.url else None
+
+    def _write(self, entry: dict):
+        if self.path is None:
+            return
+
+        # The disk copy only speeds up cold starts, so failing to write it is not an error.
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}")
+            temp_path.write_text(json.dumps(entry))
+            os.replace(temp_path, self.path)
+        except OSError:
+            logger.warning("Failed to write the IdP metadata cache to %s.", self.path)
+
+
+_idp_metadata_caches: dict[str, IdPMetadataCache] = {}
+_idp_metadata_caches_lock = threading.Lock()
+
+
 ### Forms ###
 
 
@@ -69,6 +210,22 @@ class SAMLMixin:
         """Get the idP Metadata Url."""
         return flask.current_app.config["METADATA_URL"]
 
+    @property
+    def idp_metadata(self) -> IdPMetadataCache:
+        """Get the process-wide cache of the idP Metadata."""
+
+        with _idp_metadata_caches_lock:
+            if self.metadata_url not in _idp_metadata_caches:
+                cache_path = flask.current_app.config["SAML_METADATA_CACHE"]
+                _idp_metadata_caches[self.metadata_url] = IdPMetadataCache(
+                    self.metadata_url,
+                    path=pathlib.Path(cache_path) if cache_path else None,
+                    ttl=flask.current_app.config["SAML_METADATA_TTL"],
+                    timeout=self.timeout,
+                )
+
+            return _idp_metadata_caches[self.metadata_url]
+
     def _prepare_request(self):
         """Prepare the saml related request."""
         return {
@@ -82,9 +239,7 @@ class SAMLMixin:
     def _build_saml_config(self):
         """Build the SAML configuration."""
 
-        idp_data = idp_metadata_parser.OneLogin_Saml2_IdPMetadataParser.parse_remote(
-            self.metadata_url, timeout=self.timeout
-        )
+        idp_data = self.idp_metadata.get()
 
         return {
             "debug": flask.current_app.config["DEBUG"] == 1,
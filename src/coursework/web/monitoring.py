@@ -0,0 +1,53 @@
+"""
+Project:     Coursework
+Name:        src/coursework/web/monitoring.py
+Author:      Ian Kollipara <ian.kollipara@cune.edu>
+Date:        2026-10-19
+Description: Metrics Endpoint
+"""
+
+from __future__ import annotations
+
+import time
+
+import flask
+
+from coursework import metrics
+
+bp = flask.Blueprint("monitoring", __name__, url_prefix="")
+
+# How often each web process writes a snapshot of its metrics, in seconds.
+_SNAPSHOT_INTERVAL = 5
+
+
+@bp.record_once
+def configure_snapshots(state: flask.blueprints.BlueprintSetupState):
+    # There may be several web processes, so each one writes its metrics for whichever is scraped.
+    metrics.configure(state.app.config["WEB_METRICS"])
+
+
+@bp.before_app_request
+def start_timer():
+    flask.g.request_started_at = time.perf_counter()
+
+
+@bp.after_app_request
+def observe_request(response: flask.Response):
+    if "request_started_at" in flask.g:
+        metrics.REQUEST_DURATION.observe(
+            time.perf_counter() - flask.g.request_started_at,
+            endpoint=flask.request.endpoint or "unknown",
+            method=flask.request.method,
+        )
+        metrics.write_snapshot(every=_SNAPSHOT_INTERVAL)
+    return response
+
+
+@bp.get("/metrics")
+def prometheus_metrics():
+    """Metrics of every web process and of the grading helper, in the Prometheus text format."""
+
+    return flask.Response(
+        metrics.collect(flask.current_app.config["GRADING_METRICS"], flask.current_app.config["WEB_METRICS"]),
+        mimetype="text/plain; version=0.0.4",
+    )
@@ -8,21 +8,27 @@ Description: Coursework Submission Views
 
 from __future__ import annotations
 
+import http
+import json
 import pathlib
 import shutil
 import tempfile
+import time
 import typing as t
 
 import flask
 import flask_login
 import flask_wtf
-import rich.console
 import wtforms
 from flask import views
 from flask_wtf import file as flask_file
 from wtforms import validators as v
 
-from coursework import runner
+from coursework import archives
+from coursework import jobs
+from coursework import metrics
+from coursework.web import uploads
+from coursework.web import worker
 
 if t.TYPE_CHECKING:
     from werkzeug.datastructures import FileStorage
@@ -39,7 +45,9 @@ class AssignmentSubmissionForm(flask_wtf.FlaskForm):
     """Form used for submitting an assignment."""
 
     files = flask_file.MultipleFileField(
-        label="Submission File", validators=[flask_file.FileRequired("A file must be submitted.")]
+        label="Submission File",
+        description="Choose every file, or a single zip or tar archive of them.",
+        validators=[flask_file.FileRequired("A file must be submitted.")],
     )
 
 
@@ -54,7 +62,7 @@ def courses():
 
     user_courses = [course for course in config.courses.values() if user.name in course.students]
 
-    return flask.render_template("submission/courses.html", courses=user_courses)
+    return _conditional(flask.render_template("submission/courses.html", courses=user_courses))
 
 
 @bp.get("/<string:course_name>/")
@@ -72,14 +80,14 @@ def course(course_name: str):
         flask.flash(f"You are not a member of {course_name}!")
         return flask.redirect(flask.url_for("submission.courses"))
 
+    submitted = _grader().submitted(user.name, course_.name)
+
     def already_submitted(assignment: Configuration.Assignment):
-        return (
-            pathlib.Path(config.submission.format(student=user.name, course=course_.name, assignment=assignment.name))
-            .absolute()
-            .exists()
-        )
+        return assignment.name in submitted
 
-    return flask.render_template("submission/course.html", course=course_, already_submitted=already_submitted)
+    return _conditional(
+        flask.render_template("submission/course.html", course=course_, already_submitted=already_submitted)
+    )
 
 
 @bp.get("/<string:course_name>/<string:assignment_name>")
@@ -104,16 +112,51 @@ def course_assignment(course_name: str, assignment_name: str):
     assignment = course_.assignments[assignment_name]
     form = AssignmentSubmissionForm()
 
-    save_path = pathlib.Path(
-        config.submission.format(student=user.name, course=course_.name, assignment=assignment.name)
-    ).absolute()
+    already_submitted = assignment.name in _grader().submitted(user.name, course_.name)
 
     return flask.render_template(
         "submission/course_assignment.html",
         assignment=assignment,
         course=course_,
         form=form,
-        already_submitted=save_path.exists(),
+        already_submitted=already_submitted,
+    )
+
+
+@bp.get("/<string:course_name>/<string:assignment_name>/results/")
+@flask_login.login_required
+def assignment_results(course_name: str, assignment_name: str):
+    """Show the results of the student's current submission, as they were when it was graded."""
+
+    config: Configuration = flask.current_app.config["coursework_config"]
+    user: User = flask_login.current_user
+    course_ = config.courses.get(course_name, None)
+
+    if not course_:
+        flask.flash(f"Course {course_name} does not exist!")
+        return flask.redirect(flask.url_for("submission.courses"))
+
+    if user.name not in course_.students:
+        flask.flash(f"You are not a member of {course_name}!")
+        return flask.redirect(flask.url_for("submission.courses"))
+
+    if assignment_name not in course_.assignments:
+        flask.flash(f"{assignment_name} is not a real assignment!")
+        return flask.redirect(flask.url_for("submission.course", course_name=course_name))
+
+    assignment = course_.assignments[assignment_name]
+    results_page = _grader().results_page(user.name, course_.name, assignment.name)
+
+    if results_page is None:
+        flask.flash(f"There are no saved results for {assignment_name}.")
+        return flask.redirect(
+            flask.url_for("submission.course_assignment", course_name=course_name, assignment_name=assignment_name)
+        )
+
+    return _conditional(
+        flask.render_template(
+            "submission/past_results.html", course=course_, assignment=assignment, results_page=results_page
+        )
     )
 
 
@@ -140,41 +183,142 @@ def assignment_submit(course_name: str, assignment_name: str):
     form = AssignmentSubmissionForm()
 
     if form.validate_on_submit():
-        save_path = pathlib.Path(
-            config.submission.format(student=user.name, course=course_.name, assignment=assignment.name)
-        ).absolute()
-        with user.as_root():
-            if save_path.exists():
-                shutil.rmtree(save_path)
-
+        request: uploads.UploadRequest = flask.request
         files: list[FileStorage] = form.files.data
-        filepaths = []
-        console = rich.console.Console(record=True)
-        with user.as_root():
-            with tempfile.TemporaryDirectory() as d:
-                temp_dir = pathlib.Path(d)
-                for file in files:
-                    temp_path = temp_dir / file.filename
-                    temp_path.parent.mkdir(parents=True, exist_ok=True)
-                    file.save(temp_path)
-                    filepaths.append(temp_path)
-
-                runner_ = runner.get_runner_by_name(assignment.test.runner)
-                result = runner_(user.to_core(), config, course_, assignment, filepaths).run(console)
-
-                save_path.mkdir(parents=True, exist_ok=True)
-                result.to_pickle((save_path / ".runner-output"))
-
-                for file in filepaths:
-                    shutil.copy2(file.absolute(), save_path / file.name)
-
-        return flask.render_template(
-            "submission/results.html",
-            output=console.export_html(),
-            course_name=course_name,
-            result=result,
-            assignment_name=assignment_name,
-        )
+        for file in files:
+            file.close()
+
+        # The files were streamed into the upload directory as the web user, and the grading helper takes it over.
+        upload_path = request.upload_path
+        metrics.UPLOAD_SIZE.observe(sum(path.stat().st_size for path in upload_path.iterdir()))
+        if len(files) == 1 and archives.is_archive(files[0].filename):
+            try:
+                upload_path = _extract(request.upload_path / pathlib.PurePath(files[0].filename).name)
+            except archives.ArchiveError as e:
+                flask.flash(str(e))
+                return flask.redirect(
+                    flask.url_for(
+                        "submission.course_assignment", course_name=course_name, assignment_name=assignment_name
+                    )
+                )
+
+        try:
+            job_ = _grader().submit(upload_path, user.name, course_.name, assignment.name)
+        except BaseException:
+            # The request's own upload directory is removed when the request ends, but an extracted one is not.
+            if upload_path != request.upload_path:
+                shutil.rmtree(upload_path, ignore_errors=True)
+            raise
+
+        return flask.redirect(flask.url_for("submission.job", job_id=job_.id))
 
     print(form.errors)
     return flask.redirect("submission.course_assignment", course_name=course_name, assignment_name=assignment_name)
+
+
+@bp.get("/jobs/<string:job_id>/")
+@flask_login.login_required
+def job(job_id: str):
+    return flask.render_template("submission/results.html", job=_get_job(job_id))
+
+
+@bp.get("/jobs/<string:job_id>/events")
+@flask_login.login_required
+def job_events(job_id: str):
+    """Stream the job's output and test results as Server-Sent Events, until grading is over."""
+
+    job_ = _get_job(job_id)
+    grader = _grader()
+    poll_interval = flask.current_app.config["GRADING_EVENTS_POLL_INTERVAL"]
+
+    # Browsers send the id of the last event they saw when they reconnect.
+    offset = flask.request.headers.get("Last-Event-ID", 0, type=int)
+
+    def stream():
+        nonlocal offset
+        position = None
+
+        while True:
+            events = grader.events(job_.id, offset)
+            for event in events:
+                offset = event.offset
+                yield f"id: {event.offset}\nevent: {event.event}\ndata: {json.dumps(event.data)}\n\n"
+                if event.event in ("done", "failed"):
+                    return
+
+            if not events:
+                current = grader.job(job_.id)
+                if current.status == "queued" and grader.position(job_.id) != position:
+                    position = grader.position(job_.id)
+                    yield f"event: status\ndata: {json.dumps({'status': 'queued', 'position': position})}\n\n"
+                elif current.is_done and not grader.events(job_.id, offset):
+                    # The job is over, but its event log is gone. There is nothing left to stream.
+                    yield f"event: {current.status}\ndata: {{}}\n\n"
+                    return
+                time.sleep(poll_interval)
+
+    return flask.Response(
+        flask.stream_with_context(stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@bp.get("/jobs/<string:job_id>/status")
+@flask_login.login_required
+def job_status(job_id: str):
+    job_ = _get_job(job_id)
+
+    return {
+        "status": job_.status,
+        "position": _grader().position(job_.id) if job_.status == "queued" else 0,
+    }
+
+
+def _get_job(job_id: str) -> jobs.Job:
+    """Get the job, making sure it belongs to the current user."""
+
+    user: User = flask_login.current_user
+
+    try:
+        job_ = _grader().job(job_id)
+    except jobs.JobNotFound:
+        flask.abort(http.HTTPStatus.NOT_FOUND)
+
+    if job_.student != user.name:
+        flask.abort(http.HTTPStatus.NOT_FOUND)
+
+    return job_
+
+
+def _conditional(page: str) -> flask.Response:
+    """
+    Answer with the page, or with 304 Not Modified if the browser already has it.
+
+    The ETag is a hash of the rendered page, so it changes with anything shown on it.
+    Browsers must still revalidate every time, and shared caches must not keep the page at all.
+    """
+
+    response = flask.make_response(page)
+    response.add_etag()
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add("Cookie")
+    return response.make_conditional(flask.request)
+
+
+def _extract(archive: pathlib.Path) -> pathlib.Path:
+    """Extract an uploaded archive into an upload directory of its own."""
+
+    upload_path = pathlib.Path(tempfile.mkdtemp(dir=archive.parent.parent))
+    try:
+        archives.extract(archive, upload_path)
+    except archives.ArchiveError:
+        shutil.rmtree(upload_path)
+        raise
+
+    return upload_path
+
+
+def _grader() -> worker.GraderClient:
+    return worker.GraderClient(flask.current_app.config["GRADER_SOCKET"])
@@ -0,0 +1,81 @@
+"""
+Project:     Coursework
+Name:        src/coursework/web/uploads.py
+Author:      Ian Kollipara <ian.kollipara@cune.edu>
+Date:        2026-10-19
+Description: Streamed Uploads
+
+Uploaded files are streamed straight into an upload directory while the request is parsed,
+so they are never held in memory or written to a temporary file first.
+That directory is handed to the grading helper as is.
+"""
+
+from __future__ import annotations
+
+import io
+import pathlib
+import shutil
+import tempfile
+import typing as t
+
+import flask
+from werkzeug import exceptions
+
+
+class _LimitedFile(io.FileIO):
+    """A file refusing to grow past a size limit."""
+
+    def __init__(self, path: pathlib.Path, limit: int | None):
+        super().__init__(path, "x+")
+        self.limit = limit
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.size += len(data)
+        if self.limit is not None and self.size > self.limit:
+            raise exceptions.RequestEntityTooLarge(f"Each file may be at most {self.limit} bytes.")
+        return super().write(data)
+
+
+class UploadRequest(flask.Request):
+    """
+    # UploadRequest.
+
+    A request writing each uploaded file into its own upload directory, under `GRADING_UPLOADS`.
+    `GRADING_MAX_FILE_SIZE` limits each file, and `MAX_CONTENT_LENGTH` the request as a whole.
+    Both are checked while streaming.
+    """
+
+    upload_path: pathlib.Path | None = None
+
+    def _get_file_stream(
+        self,
+        total_content_length: int | None,
+        content_type: str | None,
+        filename: str | None = None,
+        content_length: int | None = None,
+    ) -> t.IO[bytes]:
+        # A file field left empty is still sent, without a file name.
+        if not filename:
+            return io.BytesIO()
+
+        # Only the base name is kept, so a crafted filename cannot escape the upload directory.
+        name = pathlib.PurePath(filename).name
+        if name in ("", ".", ".."):
+            raise exceptions.BadRequest(f"{filename} is not a valid file name.")
+
+        if self.upload_path is None:
+            uploads = pathlib.Path(flask.current_app.config["GRADING_UPLOADS"])
+            uploads.mkdir(parents=True, exist_ok=True)
+            self.upload_path = pathlib.Path(tempfile.mkdtemp(dir=uploads))
+
+        try:
+            return _LimitedFile(self.upload_path / name, flask.current_app.config["GRADING_MAX_FILE_SIZE"])
+        except FileExistsError:
+            raise exceptions.BadRequest(f"{name} was uploaded more than once.") from None
+
+    def close(self) -> None:
+        super().close()
+        # Once handed to the grading helper the directory is gone, otherwise the upload was rejected.
+        if self.upload_path is not None:
+            shutil.rmtree(self.upload_path, ignore_errors=True)
@@ -0,0 +1,461 @@
+"""
+Project:     Coursework
+Name:        src/coursework/web/worker.py
+Author:      Ian Kollipara <ian.kollipara@cune.edu>
+Date:        2026-10-19
+Description: Privileged Grading Helper
+
+The grading helper is the only privileged part of the web interface.
+It runs a pool of grading workers, and serves the web app over a local Unix socket.
+The web app itself never changes its effective user, so it can serve requests from many threads.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import io
+import json
+import multiprocessing
+import os
+import pathlib
+import shutil
+import socket
+import socketserver
+import stat
+import threading
+import time
+import traceback
+import typing as t
+
+import click
+import flask
+import rich.console
+from flask import cli
+
+from coursework import jobs
+from coursework import loaders
+from coursework import metrics
+from coursework import models
+from coursework import runner
+from coursework import scheduler
+from coursework import submissions
+
+if t.TYPE_CHECKING:
+    from multiprocessing.synchronize import Event
+
+    from coursework.loaders import Configuration
+
+
+# How often workers delete expired jobs, in seconds.
+_PRUNE_INTERVAL = 60 * 60
+
+# How often grading output is published while a job is graded, in seconds.
+_OUTPUT_INTERVAL = 0.25
+
+
+class GraderError(Exception):
+    """Raised if the grading helper cannot complete a request."""
+
+
+### Grading ###
+
+
+class _OutputEvents(io.TextIOBase):
+    """
+    A file for a recording console, publishing what is written to it as HTML output events.
+
+    Rich records what it renders before writing it to the file, so an export
+    (which clears the record) holds exactly the output rendered since the last one.
+    Exporting renders HTML, so writes are batched into at most one export per `_OUTPUT_INTERVAL` seconds,
+    and `export` must be called once grading ends to publish the rest.
+    Everything published is also kept, to be saved as the results page.
+    """
+
+    def __init__(self, queue: jobs.JobQueue, job_id: str):
+        self.queue = queue
+        self.job_id = job_id
+        self.console: rich.console.Console | None = None
+        self.html: list[str] = []
+        self.exported_at = time.monotonic()
+
+    def writable(self):
+        return True
+
+    def write(self, text: str) -> int:
+        if time.monotonic() - self.exported_at >= _OUTPUT_INTERVAL:
+            self.export()
+        return len(text)
+
+    def export(self) -> None:
+        """Publish the output written since the last export."""
+
+        self.exported_at = time.monotonic()
+        html = self.console.export_html(clear=True, inline_styles=True, code_format="{code}")
+        if html:
+            self.html.append(html)
+            self.queue.publish(self.job_id, "output", html)
+
+
+def grade(queue: jobs.JobQueue, job: jobs.Job, config: Configuration):
+    """Grade a single claimed job and save the submission, publishing its progress as events."""
+
+    course_ = config.courses[job.course]
+    assignment = course_.assignments[job.assignment]
+    user = loaders.User(name=job.student, role="student")
+    files_path = queue.files_path(job.id)
+
+    save_path = pathlib.Path(
+        config.submission.format(student=user.name, course=course_.name, assignment=assignment.name)
+    ).absolute()
+
+    def publish_result(result: models.TestCaseResult):
+        queue.publish(job.id, "test", dataclasses.asdict(result))
+
+    metrics.QUEUE_WAIT.observe(job.started_at - job.enqueued_at)
+    output = _OutputEvents(queue, job.id)
+    console = output.console = rich.console.Console(record=True, file=output, width=100)
+
+    def publish_position(ahead: int):
+        queue.publish(job.id, "status", {"status": "waiting", "position": ahead})
+
+    try:
+        with contextlib.ExitStack() as stack:
+            # Gradings from the command line share the host with the web, so both wait their turn.
+            if grading_scheduler := scheduler.Scheduler.from_config(config):
+                try:
+                    stack.enter_context(grading_scheduler.slot(user.name, on_wait=publish_position))
+                except scheduler.SchedulerFull as e:
+                    # The student is told why, since submitting again shortly is all it takes.
+                    queue.fail(job.id, str(e))
+                    queue.publish(job.id, "failed", {"message": str(e)})
+                    return
+            queue.publish(job.id, "status", {"status": "running"})
+
+            with user.as_root():
+                files = sorted(files_path.iterdir())
+                runner_ = runner.get_runner_by_name(assignment.test.runner)
+                # The runner grades a copy of the upload, so the files moved into the submission
+                # are the ones submitted, whatever the student's code does while it runs.
+                result = runner_(user, config, course_, assignment, files, on_test_result=publish_result).run(console)
+                output.export()
+                submissions.save(config, result, save_path, files, move=True, results_page="".join(output.html))
+    finally:
+        # Whatever was printed before an error is still shown.
+        output.export()
+        shutil.rmtree(files_path, ignore_errors=True)
+
+    with metrics.RESULT_ENCODE_DURATION.time():
+        encoded = result.encode()
+    queue.finish(job.id, encoded)
+    queue.publish(job.id, "done", {"earned_points": result.earned_points(), "total_points": assignment.total_points})
+
+
+def _grade_in_child(spool: str, job: jobs.Job, config: Configuration):
+    # The worker's own metrics are already in its snapshot, so the child only reports its grading.
+    metrics.reset()
+    queue = jobs.JobQueue(spool)
+    try:
+        grade(queue, job, config)
+    except Exception:
+        queue.fail(job.id, traceback.format_exc())
+        queue.publish(job.id, "failed", {})
+    finally:
+        metrics.write_snapshot()
+
+
+def work(spool: str, config: Configuration, poll_interval: float, wakeup: Event, retention: float, deadline: float):
+    """
+    Claim and grade jobs forever.
+
+    Every job is graded in a freshly forked child. Grading changes the working directory,
+    effective user, `sys.path`, and `sys.modules` of the process, so none of that may leak
+    from one submission into the next.
+    A child still grading after `deadline` seconds is killed, so no job holds on to a worker for good.
+    Once every `_PRUNE_INTERVAL`, jobs that finished more than `retention` seconds ago are deleted.
+    """
+
+    queue = jobs.JobQueue(spool)
+    pruned_at = time.monotonic()
+    while True:
+        if time.monotonic() - pruned_at >= _PRUNE_INTERVAL:
+            queue.prune(retention)
+            pruned_at = time.monotonic()
+
+        job = queue.claim()
+        if job is None:
+            wakeup.wait(poll_interval)
+            wakeup.clear()
+            continue
+
+        _grade_job(queue, spool, job, config, deadline)
+
+
+def _grade_job(queue: jobs.JobQueue, spool: str, job: jobs.Job, config: Configuration, deadline: float | None):
+    child = multiprocessing.get_context("fork").Process(target=_grade_in_child, args=(spool, job, config))
+    child.start()
+    child.join(deadline)
+    timed_out = child.is_alive()
+    if timed_out:
+        child.kill()
+        child.join()
+    metrics.fold(child.pid)
+    # The child removes the upload itself, unless it was killed or exited before it could.
+    shutil.rmtree(queue.files_path(job.id), ignore_errors=True)
+
+    if queue.get(job.id).is_done:
+        return
+
+    if timed_out:
+        message = f"Grading was stopped after running for longer than {deadline} seconds."
+        queue.fail(job.id, message)
+        queue.publish(job.id, "failed", {"message": message})
+    else:
+        # The child died without reporting anything, for example because student code called os._exit.
+        queue.fail(job.id, f"Grading exited with code {child.exitcode}")
+        queue.publish(job.id, "failed", {})
+
+
+### Socket Protocol ###
+
+
+class _GraderHandler(socketserver.StreamRequestHandler):
+    """Handles one request: a line of JSON in, a line of JSON out."""
+
+    server: GraderServer
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            operation = self.server.operations[request.pop("op")]
+            response = {"result": operation(**request)}
+        except jobs.JobNotFound as e:
+            response = {"error": "JobNotFound", "message": str(e)}
+        except Exception as e:
+            response = {"error": type(e).__name__, "message": str(e)}
+
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class _StatusCache:
+    """
+    Which assignments each student has submitted, per course.
+
+    Looking this up walks submission directories (usually on NFS) or the index,
+    so the answer is kept until the student submits or one of their jobs finishes grading.
+    Submissions made outside the web interface are picked up once an entry is older than `ttl` seconds.
+    """
+
+    def __init__(self, queue: jobs.JobQueue, ttl: float):
+        self.queue = queue
+        self.ttl = ttl
+        self.entries: dict[tuple[str, str], tuple[float | None, float, set[str]]] = {}
+        self.lock = threading.Lock()
+
+    def get(self, student: str, course: str, lookup: t.Callable[[], set[str]]) -> set[str]:
+        key = (student, course)
+        # The job queue is local, so checking it is far cheaper than the lookup.
+        last_finished = self.queue.last_finished(student, course)
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None and entry[0] == last_finished and time.monotonic() < entry[1]:
+            return entry[2]
+
+        submitted = lookup()
+        with self.lock:
+            self.entries[key] = (last_finished, time.monotonic() + self.ttl, submitted)
+        return submitted
+
+    def invalidate(self, student: str, course: str) -> None:
+        with self.lock:
+            self.entries.pop((student, course), None)
+
+
+class GraderServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    # GraderServer.
+
+    Serves the web app's privileged requests: enqueuing uploaded submissions,
+    reading job state and events, and looking up submission status.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        path: str,
+        config: Configuration,
+        spool: str,
+        uploads: str,
+        wakeup: Event | None = None,
+        status_ttl: float = 60,
+    ):
+        self.config = config
+        self.queue = jobs.JobQueue(spool)
+        self.uploads = pathlib.Path(uploads).resolve()
+        self.wakeup = wakeup
+        self.status = _StatusCache(self.queue, status_ttl)
+        self.operations = {
+            "submit": self.submit,
+            "job": self.job,
+            "events": self.events,
+            "position": self.queue.position,
+            "submitted": self.submitted,
+            "results_page": self.results_page,
+        }
+
+        pathlib.Path(path).unlink(missing_ok=True)
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(path, _GraderHandler)
+        # Only the owner and group of the socket (the web app) may talk to the helper.
+        os.chmod(path, 0o660)
+
+    def submit(self, upload: str, student: str, course: str, assignment: str) -> dict:
+        upload_path = pathlib.Path(upload).resolve()
+        if upload_path.parent != self.uploads:
+            raise GraderError(f"{upload} is not an upload directory")
+        if assignment not in self.config.courses[course].assignments:
+            raise GraderError(f"{assignment} is not a part of {course}")
+
+        job_id = self.queue.create()
+        files_path = self.queue.files_path(job_id)
+        for file in upload_path.iterdir():
+            shutil.move(file, files_path / file.name)
+        upload_path.rmdir()
+
+        # The files are graded as root, so a web app that was taken over must not be able to slip in a symlink
+        # to anything else. They are checked once moved, where the web app can no longer change them.
+        for file in files_path.iterdir():
+            if not stat.S_ISREG(file.lstat().st_mode):
+                shutil.rmtree(files_path)
+                raise GraderError(f"{file.name} is not a regular file")
+
+        job = self.queue.enqueue(job_id, student, course, assignment)
+        self.status.invalidate(student, course)
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+        return _job_to_json(job)
+
+    def job(self, job_id: str) -> dict:
+        return _job_to_json(self.queue.get(job_id))
+
+    def events(self, job_id: str, offset: int) -> list:
+        return self.queue.events(job_id, offset)
+
+    def submitted(self, student: str, course: str) -> list[str]:
+        course_ = self.config.courses[course]
+        return sorted(self.status.get(student, course, lambda: submissions.submitted(self.config, student, course_)))
+
+    def results_page(self, student: str, course: str, assignment: str) -> str | None:
+        return submissions.read_results_page(self.config, student, course, assignment)
+
+
+def _job_to_json(job: jobs.Job) -> dict:
+    # The encoded result is only needed by the helper itself.
+    return dataclasses.asdict(job) | {"result": None}
+
+
+class GraderClient:
+    """
+    # GraderClient.
+
+    The web app's side of the grading helper socket.
+    """
+
+    def __init__(self, path: str, timeout: float = 30):
+        self.path = path
+        self.timeout = timeout
+
+    def _call(self, op: str, **params):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.settimeout(self.timeout)
+                connection.connect(self.path)
+                with connection.makefile("rwb") as f:
+                    f.write(json.dumps({"op": op, **params}).encode() + b"\n")
+                    f.flush()
+                    response = json.loads(f.readline())
+        except (OSError, ValueError) as e:
+            raise GraderError(f"Could not reach the grading helper at {self.path}") from e
+
+        if response.get("error") == "JobNotFound":
+            raise jobs.JobNotFound(response["message"])
+        if "error" in response:
+            raise GraderError(f"{response['error']}: {response['message']}")
+
+        return response["result"]
+
+    def submit(self, upload: pathlib.Path, student: str, course: str, assignment: str) -> jobs.Job:
+        """Hand the files in the upload directory over for grading."""
+
+        return jobs.Job(
+            **self._call("submit", upload=str(upload), student=student, course=course, assignment=assignment)
+        )
+
+    def job(self, job_id: str) -> jobs.Job:
+        return jobs.Job(**self._call("job", job_id=job_id))
+
+    def events(self, job_id: str, offset: int = 0) -> list[jobs.Event]:
+        return [jobs.Event(*event) for event in self._call("events", job_id=job_id, offset=offset)]
+
+    def position(self, job_id: str) -> int:
+        return self._call("position", job_id=job_id)
+
+    def submitted(self, student: str, course: str) -> set[str]:
+        return set(self._call("submitted", student=student, course=course))
+
+    def results_page(self, student: str, course: str, assignment: str) -> str | None:
+        """Get the rendered results of the student's current submission, if they were kept."""
+
+        return self._call("results_page", student=student, course=course, assignment=assignment)
+
+
+### Command ###
+
+
+@click.command("grade-worker")
+@click.option("--processes", type=click.IntRange(min=1), default=1, help="How many jobs to grade at once.")
+@click.option("--poll-interval", type=click.FloatRange(min=0), default=5, help="Seconds between checks when idle.")
+@cli.with_appcontext
+def grade_worker_command(processes: int, poll_interval: float):
+    """Run the grading helper: a pool of grading workers and the socket the web app talks to."""
+
+    app = flask.current_app
+    spool = app.config["GRADING_SPOOL"]
+    config = app.config["coursework_config"]
+
+    metrics.configure(app.config["GRADING_METRICS"])
+
+    retention = app.config["GRADING_JOB_RETENTION"]
+    deadline = app.config["GRADING_JOB_TIMEOUT"]
+    queue = jobs.JobQueue(spool)
+    # Jobs left running by a previous pool will never finish, so they are graded again.
+    queue.recover()
+    queue.prune(retention)
+
+    context = multiprocessing.get_context("fork")
+    wakeup = context.Event()
+    # Workers fork a child per job, which multiprocessing does not allow daemonic processes to do.
+    workers = [
+        context.Process(target=work, args=(spool, config, poll_interval, wakeup, retention, deadline))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    server = GraderServer(
+        app.config["GRADER_SOCKET"],
+        config,
+        spool,
+        app.config["GRADING_UPLOADS"],
+        wakeup,
+        status_ttl=app.config["GRADING_STATUS_TTL"],
+    )
+    if app.config["GRADER_SOCKET_GROUP"]:
+        shutil.chown(app.config["GRADER_SOCKET"], group=app.config["GRADER_SOCKET_GROUP"])
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+
+    for worker in workers:
+        worker.join()
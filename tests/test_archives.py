@@ -0,0 +1,96 @@
+"""
+test_archives.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Test coursework.archives
+"""
+
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from coursework import archives
+
+
+class TestExtract(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(self.enterContext(TemporaryDirectory()))
+        self.destination = self.temp_dir / "out"
+        self.destination.mkdir()
+
+    def zip(self, entries: dict[str, bytes]) -> Path:
+        archive = self.temp_dir / "submission.zip"
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, data in entries.items():
+                zf.writestr(name, data)
+        return archive
+
+    def test_is_archive(self):
+        self.assertTrue(archives.is_archive("project.tar.gz"))
+        self.assertTrue(archives.is_archive("project.ZIP"))
+        self.assertFalse(archives.is_archive("main.py"))
+
+    def test_extract__zip_is_flattened(self):
+        archive = self.zip({"project/src/main.py": b"print(1)", "project/README": b"", "__MACOSX/._main.py": b""})
+
+        files = archives.extract(archive, self.destination)
+
+        self.assertEqual(sorted(file.name for file in files), ["README", "main.py"])
+        self.assertEqual((self.destination / "main.py").read_bytes(), b"print(1)")
+
+    def test_extract__tar(self):
+        archive = self.temp_dir / "submission.tar.gz"
+        with tarfile.open(archive, "w:gz") as tf:
+            info = tarfile.TarInfo("project/main.py")
+            info.size = 8
+            tf.addfile(info, io.BytesIO(b"print(1)"))
+            link = tarfile.TarInfo("project/link.py")
+            link.type = tarfile.SYMTYPE
+            link.linkname = "/etc/passwd"
+            tf.addfile(link)
+
+        with self.assertRaisesRegex(archives.ArchiveError, "not a regular file"):
+            archives.extract(archive, self.destination)
+        self.assertEqual((self.destination / "main.py").read_bytes(), b"print(1)")
+
+    def test_extract__traversal(self):
+        with self.assertRaisesRegex(archives.ArchiveError, "outside"):
+            archives.extract(self.zip({"../evil.py": b""}), self.destination)
+
+    def test_extract__duplicate_names(self):
+        with self.assertRaisesRegex(archives.ArchiveError, "more than once"):
+            archives.extract(self.zip({"a/main.py": b"", "b/main.py": b""}), self.destination)
+
+    def test_extract__limits(self):
+        archive = self.zip({"bomb.txt": b"0" * 10_000, "a/b/c/d.txt": b"", "e.txt": b""})
+
+        for limit, message in [
+            ({"max_size": 1000}, "larger than"),
+            ({"max_depth": 3}, "deep"),
+            ({"max_entries": 2}, "entries"),
+        ]:
+            with self.subTest(limit=limit), TemporaryDirectory() as destination:
+                with self.assertRaisesRegex(archives.ArchiveError, message):
+                    archives.extract(archive, Path(destination), **limit)
+
+    def test_extract__encrypted(self):
+        data = bytearray(self.zip({"main.py": b"print(1)"}).read_bytes())
+        # Mark the entry as encrypted in both of its headers, as a password protected zip file would.
+        for signature, offset in ((b"PK\x03\x04", 6), (b"PK\x01\x02", 8)):
+            data[data.index(signature) + offset] |= 0x1
+        archive = self.temp_dir / "encrypted.zip"
+        archive.write_bytes(data)
+
+        with self.assertRaisesRegex(archives.ArchiveError, "cannot be extracted"):
+            archives.extract(archive, self.destination)
+
+    def test_extract__not_an_archive(self):
+        archive = self.temp_dir / "submission.zip"
+        archive.write_text("not really")
+
+        with self.assertRaises(archives.ArchiveError):
+            archives.extract(archive, self.destination)
@@ -0,0 +1,89 @@
+"""
+test_buildcache.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Test coursework.buildcache
+"""
+
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from coursework import buildcache
+
+
+class TestBuildCache(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(self.enterContext(TemporaryDirectory()))
+        self.cache = buildcache.BuildCache(self.temp_dir / "cache", 1024)
+        self.sources = self.temp_dir / "sources"
+        self.sources.mkdir()
+        (self.sources / "main.c").write_text("int main() { return 0; }")
+
+    def test_key(self):
+        key = self.cache.key("cc main.c", [self.sources / "main.c"])
+
+        self.assertEqual(key, self.cache.key("cc main.c", [self.sources / "main.c"]))
+        self.assertNotEqual(key, self.cache.key("cc -O2 main.c", [self.sources / "main.c"]))
+
+        (self.sources / "main.c").write_text("int main() { return 1; }")
+        self.assertNotEqual(key, self.cache.key("cc main.c", [self.sources / "main.c"]))
+
+    def test_store_and_restore(self):
+        (self.sources / "build").mkdir()
+        (self.sources / "build" / "a.out").write_bytes(b"binary")
+        key = self.cache.key("cc main.c", [self.sources / "main.c"])
+        destination = self.temp_dir / "destination"
+        destination.mkdir()
+
+        self.assertFalse(self.cache.restore(key, destination))
+        self.cache.store(key, self.sources, [self.sources / "build" / "a.out"])
+
+        self.assertTrue(self.cache.restore(key, destination))
+        self.assertEqual((destination / "build" / "a.out").read_bytes(), b"binary")
+
+    def test_evict(self):
+        for name, mtime in (("old", 1000), ("used", 2000), ("new", 3000)):
+            artifact = self.sources / name
+            artifact.write_bytes(b"x" * 400)
+            self.cache.store(name, self.sources, [artifact])
+            os.utime(self.cache.path / name, (mtime, mtime))
+
+        # Restoring a build makes it the most recently used.
+        self.cache.restore("used", self.temp_dir)
+        self.cache.evict()
+
+        self.assertEqual(
+            sorted(path.name for path in self.cache.path.iterdir() if path.name != ".size"), ["new", "used"]
+        )
+
+    def test_evict__under_recorded_size(self):
+        artifact = self.sources / "big"
+        artifact.write_bytes(b"x" * 2048)
+        self.cache.store("big", self.sources, [artifact])
+        self.assertFalse((self.cache.path / "big").exists())
+
+        # A size under the budget is trusted, without walking the cache.
+        (self.cache.path / "big").mkdir()
+        (self.cache.path / "big" / "big").write_bytes(b"x" * 2048)
+        self.assertEqual(self.cache.evict(), 0)
+
+    def test_restore__missing_leaves_nothing(self):
+        destination = self.temp_dir / "destination"
+        destination.mkdir()
+
+        self.assertFalse(self.cache.restore("missing", destination))
+        self.assertEqual(list(destination.iterdir()), [])
+
+    def test_restore__empty_build(self):
+        (self.cache.path / "empty").mkdir()
+        destination = self.temp_dir / "destination"
+        destination.mkdir()
+
+        self.cache.store("nothing", self.sources, [])
+
+        self.assertFalse((self.cache.path / "nothing").exists())
+        self.assertFalse(self.cache.restore("empty", destination))
+        self.assertEqual(list(destination.iterdir()), [])
@@ -114,3 +114,44 @@ class TestInstructorCli(TestCase):
             str(self.temp_dir / "collection" / "ian" / "cs141" / "assignment1" / "ian.pdf"),
             [str(file) for file in self.temp_dir.rglob("*")],
         )
+
+    def test_gradebook(self):
+        self.runner.invoke(
+            student_cli,
+            ["submit", "cs141", "assignment1", str(self.temp_dir / "example.txt")],
+            env={"COURSEWORK_CONFIG": self.config__ok},
+        )
+        result = self.runner.invoke(cli, ["gradebook", "cs141"], env={"COURSEWORK_CONFIG": self.config__ok})
+
+        self.assertIn("15/15", result.output)
+        self.assertIn("Missing", result.output)
+
+    def test_gradebook__damaged(self):
+        self.runner.invoke(
+            student_cli,
+            ["submit", "cs141", "assignment1", str(self.temp_dir / "example.txt")],
+            env={"COURSEWORK_CONFIG": self.config__ok},
+        )
+        damaged_path = self.temp_dir / "not_real" / "cs141" / "assignment1"
+        damaged_path.mkdir(parents=True)
+        (damaged_path / ".runner-output").write_bytes(b"not a result")
+
+        result = self.runner.invoke(cli, ["gradebook", "cs141"], env={"COURSEWORK_CONFIG": self.config__ok})
+
+        self.assertIn("15/15", result.output)
+        self.assertIn("Skipping", result.output)
+
+    def test_gradebook__index(self):
+        config = self.temp_dir / "coursework_index.toml"
+        config.write_text(
+            self.config_buffer__ok.replace("[coursework]", f'[coursework]\nindex = "{self.temp_dir / "index.db"}"')
+        )
+        self.runner.invoke(
+            student_cli,
+            ["submit", "cs141", "assignment1", str(self.temp_dir / "example.txt")],
+            env={"COURSEWORK_CONFIG": str(config)},
+        )
+        result = self.runner.invoke(cli, ["gradebook", "cs141"], env={"COURSEWORK_CONFIG": str(config)})
+
+        self.assertIn("15/15", result.output)
+        self.assertIn("Missing", result.output)
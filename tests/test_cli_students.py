@@ -6,6 +6,7 @@ Ian Kollipara <ian.kollipara@cune.edu>
 test coursework.cli.students
 """
 
+import zipfile
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from unittest import TestCase
@@ -94,6 +95,37 @@ class TestStudentCli(TestCase):
             [str(file) for file in self.temp_dir.rglob("*")],
         )
 
+    def test_submit__archive(self):
+        archive = self.temp_dir / "project.zip"
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("project/main.py", "print('hello')")
+            zf.writestr("project/util.py", "")
+
+        result = self.runner.invoke(
+            cli, ["submit", "cs141", "assignment1", str(archive)], env={"COURSEWORK_CONFIG": self.config}
+        )
+
+        self.assertIn("assignment1 was successfully submitted!", result.output)
+        self.assertEqual(
+            sorted(path.name for path in (self.temp_dir / "ian" / "cs141" / "assignment1").iterdir()),
+            [".runner-output", ".runner-output.html.gz", "main.py", "util.py"],
+        )
+
+    def test_submit__scheduler(self):
+        config = self.temp_dir / "coursework_scheduler.toml"
+        config.write_text(
+            self.config_buffer.replace("[coursework]", f'[coursework]\nscheduler = "{self.temp_dir / "scheduler"}"')
+        )
+
+        result = self.runner.invoke(
+            cli,
+            ["submit", "cs141", "assignment1", str(self.temp_dir / "example.txt")],
+            env={"COURSEWORK_CONFIG": str(config)},
+        )
+
+        self.assertIn("assignment1 was successfully submitted!", result.output)
+        self.assertEqual(list((self.temp_dir / "scheduler" / "running").iterdir()), [])
+
     def test_submit_with_existing_submission__no(self):
         self.runner.invoke(
             cli,
@@ -133,3 +165,21 @@ class TestStudentCli(TestCase):
             str(self.temp_dir / "ian" / "cs141" / "assignment1" / "example.txt"),
             [str(file) for file in self.temp_dir.rglob("*")],
         )
+
+    def test_submit__store(self):
+        config = self.temp_dir / "coursework_store.toml"
+        config.write_text(
+            self.config_buffer.replace("[coursework]", f'[coursework]\nstore = "{self.temp_dir / "store"}"')
+        )
+
+        for _ in range(2):
+            result = self.runner.invoke(
+                cli,
+                ["submit", "cs141", "assignment1", str(self.temp_dir / "example.txt")],
+                env={"COURSEWORK_CONFIG": str(config)},
+                input="y",
+            )
+
+        self.assertIn("assignment1 was successfully submitted!", result.output)
+        self.assertTrue((self.temp_dir / "ian" / "cs141" / "assignment1" / "example.txt").exists())
+        self.assertEqual(len(list((self.temp_dir / "store" / "manifests").rglob("*.json"))), 2)
@@ -0,0 +1,110 @@
+"""
+test_harness.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Test coursework.harness
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from coursework import harness
+
+
+class TestParseTap(TestCase):
+    def test_parse_tap(self):
+        lines = [
+            "TAP version 13",
+            "1..6",
+            "ok 1 - adds numbers",
+            "not ok 2 - subtracts numbers",
+            "  ---",
+            "  message: expected 1",
+            "  ...",
+            "ok 3 # SKIP no network",
+            "not ok 4 - divides # TODO not written yet",
+            "ok 5",
+            "# a diagnostic",
+            "Bail out! Out of memory",
+            "ok 6 - never reached",
+        ]
+
+        self.assertEqual(
+            list(harness.parse_tap(lines)),
+            [("adds numbers", True), ("subtracts numbers", False), ("test 5", True)],
+        )
+
+
+class TestParseJunit(TestCase):
+    def setUp(self):
+        self.path = Path(self.enterContext(TemporaryDirectory())) / "results.xml"
+
+    def test_parse_junit(self):
+        self.path.write_text(
+            "\n".join(
+                [
+                    '<?xml version="1.0"?>',
+                    "<testsuites><testsuite>",
+                    '<testcase classname="tests.Parser" name="test_empty"/>',
+                    '<testcase classname="tests.Parser" name="test_nested"><failure message="no"/></testcase>',
+                    '<testcase name="test_io"><error message="boom"/></testcase>',
+                    '<testcase name="test_later"><skipped/></testcase>',
+                    "</testsuite></testsuites>",
+                ]
+            )
+        )
+
+        self.assertEqual(
+            list(harness.parse_junit(self.path)),
+            [("tests.Parser.test_empty", True), ("tests.Parser.test_nested", False), ("test_io", False)],
+        )
+
+    def test_parse_junit__damaged(self):
+        self.path.write_text('<testsuite><testcase name="test_first"/><testcase name="test_sec')
+        cases = []
+
+        with self.assertRaises(harness.HarnessError):
+            for case in harness.parse_junit(self.path):
+                cases.append(case)
+
+        self.assertEqual(cases, [("test_first", True)])
+
+    def test_parse_junit__symlink(self):
+        target = self.path.with_name("target.xml")
+        target.write_text('<testsuite><testcase name="test_first"/></testsuite>')
+        self.path.symlink_to(target)
+
+        with self.assertRaises(harness.HarnessError):
+            list(harness.parse_junit(self.path))
+
+
+class TestScoringSpec(TestCase):
+    def test_score(self):
+        path = Path(self.enterContext(TemporaryDirectory())) / "scoring.toml"
+        path.write_text(
+            "\n".join(
+                [
+                    "points = 2",
+                    "[[cases]]",
+                    'match = "tests.Parser.*"',
+                    "points = 5",
+                    'hint = "Check the parser."',
+                    "[[cases]]",
+                    'match = "*"',
+                    'hint = "Keep trying."',
+                ]
+            )
+        )
+        spec = harness.ScoringSpec.from_file(path)
+
+        parser = spec.score("tests.Parser.test_empty", False)
+        other = spec.score("test_io", True)
+
+        self.assertEqual((parser.points, parser.hint, parser.was_successful), (5, "Check the parser.", False))
+        self.assertEqual((other.points, other.hint, other.was_successful), (2, "Keep trying.", True))
+
+    def test_from_file__missing(self):
+        with self.assertRaises(harness.HarnessError):
+            harness.ScoringSpec.from_file("/does/not/exist.toml")
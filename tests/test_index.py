@@ -0,0 +1,85 @@
+"""
+test_index.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Test coursework.index
+"""
+
+import grp
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from coursework import index
+from coursework import loaders
+from coursework import models
+
+
+class TestSubmissionIndex(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(self.enterContext(TemporaryDirectory()))
+        self.index = index.SubmissionIndex(self.temp_dir / "index.db")
+        self.assignment = loaders.Configuration.Assignment(
+            "assignment1", "My assignment", datetime.now(), 15, loaders.TestSpec("cmd", "my_script.sh")
+        )
+        self.course = loaders.Configuration.Course("cs141", ["ian"], ["ian"], {"assignment1": self.assignment})
+        self.result = models.RunnerResult(
+            loaders.User("ian", "student"),
+            datetime.now(),
+            self.course,
+            self.assignment,
+            [models.TestCaseResult("First", True, 10), models.TestCaseResult("Second", False, 5)],
+        )
+        self.file = self.temp_dir / "example.txt"
+        self.file.write_text("Example")
+
+    def test_record(self):
+        self.index.record(self.result, self.temp_dir, [self.file])
+
+        submission = self.index.get("ian", "cs141", "assignment1")
+
+        self.assertEqual(submission.score, 10)
+        self.assertEqual(submission.total_points, 15)
+        self.assertEqual(submission.path, self.temp_dir)
+        self.assertEqual(self.index.submitted("ian", "cs141"), {"assignment1"})
+        self.assertEqual(len(self.index.files("ian", "cs141", "assignment1")["example.txt"]), 64)
+
+    def test_record__replaces_previous(self):
+        self.index.record(self.result, self.temp_dir, [self.file])
+        self.index.record(self.result, self.temp_dir, [])
+
+        self.assertEqual(len(self.index.gradebook("cs141")), 1)
+        self.assertEqual(self.index.files("ian", "cs141", "assignment1"), {})
+
+    def test_get__missing(self):
+        self.assertIsNone(self.index.get("ian", "cs141", "assignment1"))
+        self.assertEqual(self.index.submitted("ian", "cs141"), set())
+
+    def test_rebuild(self):
+        config = loaders.Configuration(
+            ["ian"],
+            grp.getgrnam("ian"),
+            str(self.temp_dir / "{student}/{course}/{assignment}"),
+            str(self.temp_dir / "{instructor}/{course}/{assignment}"),
+            courses={"cs141": replace(self.course, students=["ian", "bob"])},
+        )
+        submission_path = self.temp_dir / "ian/cs141/assignment1"
+        submission_path.mkdir(parents=True)
+        self.result.to_file(submission_path / ".runner-output")
+        (submission_path / "example.txt").write_text("Example")
+        self.index.record(self.result, self.temp_dir / "elsewhere", [])
+        damaged_path = self.temp_dir / "bob/cs141/assignment1"
+        damaged_path.mkdir(parents=True)
+        (damaged_path / ".runner-output").write_bytes(b"not a result")
+        errors = []
+
+        self.assertEqual(self.index.rebuild(config, on_error=lambda path, e: errors.append(path)), 1)
+        self.assertEqual(errors, [damaged_path / ".runner-output"])
+
+        submission = self.index.get("ian", "cs141", "assignment1")
+        self.assertEqual(submission.score, 10)
+        self.assertEqual(submission.path, submission_path)
+        self.assertEqual(list(self.index.files("ian", "cs141", "assignment1")), ["example.txt"])
@@ -0,0 +1,82 @@
+"""
+test_jobs.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Test coursework.jobs
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from coursework import jobs
+
+
+class TestJobQueue(TestCase):
+    def setUp(self):
+        self.queue = jobs.JobQueue(Path(self.enterContext(TemporaryDirectory())))
+
+    def enqueue(self):
+        job_id = self.queue.create()
+        return self.queue.enqueue(job_id, "ian", "cs141", "assignment1")
+
+    def test_claim__oldest_first(self):
+        first = self.enqueue()
+        second = self.enqueue()
+
+        self.assertEqual(self.queue.position(second.id), 1)
+        self.assertEqual(self.queue.claim().id, first.id)
+        self.assertEqual(self.queue.claim().id, second.id)
+        self.assertIsNone(self.queue.claim())
+
+    def test_finish(self):
+        job = self.enqueue()
+        self.queue.claim()
+        self.queue.finish(job.id, b"result")
+
+        job = self.queue.get(job.id)
+
+        self.assertEqual(job.status, "finished")
+        self.assertTrue(job.is_done)
+        self.assertEqual(job.result, b"result")
+
+    def test_events(self):
+        job = self.enqueue()
+        self.queue.publish(job.id, "output", "<p>Hello</p>")
+        self.queue.publish(job.id, "done", {"earned_points": 5})
+
+        first, second = self.queue.events(job.id)
+
+        self.assertEqual(first.event, "output")
+        self.assertEqual(first.data, "<p>Hello</p>")
+        self.assertEqual(self.queue.events(job.id, first.offset), [second])
+        self.assertEqual(self.queue.events(job.id, second.offset), [])
+
+    def test_recover(self):
+        job = self.enqueue()
+        self.queue.claim()
+
+        self.assertEqual(self.queue.recover(), 1)
+        self.assertEqual(self.queue.get(job.id).status, "queued")
+
+    def test_get__missing(self):
+        with self.assertRaises(jobs.JobNotFound):
+            self.queue.get("not_a_job")
+
+    def test_prune(self):
+        finished = self.enqueue()
+        self.queue.claim()
+        self.queue.finish(finished.id, b"result")
+        queued = self.enqueue()
+
+        self.queue.publish(finished.id, "done", {})
+
+        self.assertEqual(self.queue.prune(60), 0)
+        self.assertEqual(self.queue.prune(-60), 1)
+        self.assertFalse(self.queue.events_path(finished.id).exists())
+        self.assertFalse(self.queue.files_path(finished.id).exists())
+        self.assertTrue(self.queue.files_path(queued.id).exists())
+        with self.assertRaises(jobs.JobNotFound):
+            self.queue.get(finished.id)
+        self.assertEqual(self.queue.get(queued.id).status, "queued")
@@ -6,8 +6,14 @@ Ian Kollipara <ian.kollipara@cune.edu>
 Test coursework.loaders
 """
 
+import grp
 import io
+import json
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import TestCase
+from unittest import mock
 
 from coursework import loaders
 
@@ -151,3 +157,36 @@ class TestUser(TestCase):
         user = loaders.User.from_env(self.configuration, name="ian")
         self.assertIsInstance(user, loaders.User)
         self.assertTrue(user.is_instructor)
+
+
+class TestGroupCache(TestCase):
+    def setUp(self):
+        self.path = Path(self.enterContext(TemporaryDirectory())) / "groups.json"
+        self.cache = loaders.GroupCache(self.path, ttl=60, timeout=0.05)
+
+    def test_resolve__writes_cache(self):
+        group = self.cache.resolve("ian")
+
+        self.assertEqual(group.gr_gid, grp.getgrnam("ian").gr_gid)
+        self.assertIn("ian", json.loads(self.path.read_text()))
+
+    def test_resolve__fresh_entry_skips_lookup(self):
+        self.cache.resolve("ian")
+
+        with mock.patch.object(loaders, "getgrnam") as getgrnam:
+            group = self.cache.resolve("ian")
+
+        getgrnam.assert_not_called()
+        self.assertEqual(group.gr_name, "ian")
+
+    def test_resolve__slow_lookup_uses_stale_entry(self):
+        self.path.write_text(json.dumps({"ian": {"group": ["ian", "x", 4242, []], "resolved_at": time.time() - 3600}}))
+
+        with mock.patch.object(loaders, "getgrnam", side_effect=lambda name: time.sleep(0.5)):
+            group = self.cache.resolve("ian")
+
+        self.assertEqual(group.gr_gid, 4242)
+
+    def test_resolve__missing_group(self):
+        with self.assertRaises(KeyError):
+            self.cache.resolve("not_a_real_group")
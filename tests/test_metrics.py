@@ -0,0 +1,118 @@
+"""
+test_metrics.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Test coursework.metrics
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from coursework import metrics
+
+# No process has this id, since it is above the kernel's limit.
+DEAD_PID = 2**22 + 1
+
+GAUGE = 'coursework_gradings_in_progress{course="cs141",assignment="assignment1",runner="cmd"}'
+
+
+class TestMetrics(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(self.enterContext(TemporaryDirectory()))
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.addCleanup(metrics.configure, None)
+
+    def test_histogram(self):
+        metrics.QUEUE_WAIT.observe(0.3)
+        metrics.QUEUE_WAIT.observe(0.5)
+        metrics.QUEUE_WAIT.observe(1000)
+
+        text = metrics.collect()
+
+        self.assertIn('coursework_queue_wait_seconds_bucket{le="0.25"} 0', text)
+        self.assertIn('coursework_queue_wait_seconds_bucket{le="0.5"} 2', text)
+        self.assertIn('coursework_queue_wait_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("coursework_queue_wait_seconds_count 3", text)
+        self.assertIn("coursework_queue_wait_seconds_sum 1000.8", text)
+
+    def test_labels(self):
+        metrics.REQUEST_DURATION.observe(0.01, endpoint='say "hi"', method="GET")
+
+        self.assertIn(
+            'coursework_request_duration_seconds_count{endpoint="say \\"hi\\"",method="GET"} 1', metrics.collect()
+        )
+
+    def test_collect__snapshots(self):
+        labels = {"course": "cs141", "assignment": "assignment1", "runner": "cmd"}
+        metrics.configure(self.temp_dir)
+        metrics.SAVE_DURATION.observe(1)
+        metrics.GRADINGS_IN_PROGRESS.inc(**labels)
+        metrics.write_snapshot()
+        metrics.reset()
+        # As if written by another process that is still alive.
+        (self.temp_dir / f"{os.getpid()}.json").rename(self.temp_dir / f"{os.getppid()}.json")
+
+        text = metrics.collect(self.temp_dir)
+        self.assertIn("coursework_save_duration_seconds_count 1", text)
+        self.assertIn(GAUGE + " 1\n", text)
+
+        # The gradings of a process that has exited are over.
+        (self.temp_dir / f"{DEAD_PID}.json").write_text(
+            json.dumps({"coursework_gradings_in_progress": [[list(labels.values()), 5]]})
+        )
+        self.assertIn(GAUGE + " 1\n", metrics.collect(self.temp_dir))
+
+    def test_fold(self):
+        metrics.configure(self.temp_dir)
+        (self.temp_dir / f"{DEAD_PID}.json").write_text(
+            json.dumps({"coursework_save_duration_seconds": [[[], [1] + [0] * 16]]})
+        )
+
+        metrics.fold(DEAD_PID)
+
+        self.assertFalse((self.temp_dir / f"{DEAD_PID}.json").exists())
+        self.assertIn("coursework_save_duration_seconds_count 1", metrics.collect())
+
+    def test_observe__threads(self):
+        def observe():
+            for _ in range(1000):
+                metrics.QUEUE_WAIT.observe(1)
+
+        threads = [threading.Thread(target=observe) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIn("coursework_queue_wait_seconds_count 8000", metrics.collect())
+
+    def test_collect__skips_own_snapshot(self):
+        metrics.configure(self.temp_dir)
+        metrics.SAVE_DURATION.observe(1)
+        metrics.write_snapshot()
+
+        self.assertIn("coursework_save_duration_seconds_count 1", metrics.collect(self.temp_dir))
+
+    def test_collect__skips_temp_files(self):
+        # Left behind by a process that died while writing its snapshot.
+        (self.temp_dir / f".{DEAD_PID}.json").write_text(
+            json.dumps({"coursework_gradings_in_progress": [[["cs141", "assignment1", "cmd"], 5]]})
+        )
+
+        self.assertNotIn(GAUGE, metrics.collect(self.temp_dir))
+
+    def test_write_snapshot__every(self):
+        metrics.configure(self.temp_dir)
+        metrics.write_snapshot()
+        metrics.SAVE_DURATION.observe(1)
+
+        metrics.write_snapshot(every=60)
+
+        snapshot = json.loads((self.temp_dir / f"{os.getpid()}.json").read_text())
+        self.assertEqual(snapshot["coursework_save_duration_seconds"], [])
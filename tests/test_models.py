@@ -6,6 +6,7 @@ Ian Kollipara <ian.kollipara@cune.edu>
 Test coursework.models
 """
 
+import grp
 from datetime import datetime
 from io import BytesIO
 from pathlib import Path
@@ -93,3 +94,101 @@ class TestRunnerResult(TestCase):
         resolved_instance = models.RunnerResult.from_pickle(self.path)
 
         self.assertIsInstance(resolved_instance, models.RunnerResult)
+
+
+class TestRunnerResultFile(TestCase):
+    def setUp(self):
+        self.user = loaders.User("ian", "student")
+        self.assignment = loaders.Configuration.Assignment(
+            "assignment1", "My assignment", datetime.now(), 15, loaders.TestSpec("cmd", "my_script.sh")
+        )
+        self.course = loaders.Configuration.Course("cs141", ["ian"], ["ian"], {"assignment1": self.assignment})
+        self.config = loaders.Configuration(
+            ["ian"],
+            grp.getgrnam("ian"),
+            "/tmp/{student}/{course}/{assignment}",
+            "/tmp/{instructor}/{course}/{assignment}",
+            courses={"cs141": self.course},
+        )
+        self.instance = models.RunnerResult(
+            self.user,
+            datetime.now(),
+            self.course,
+            self.assignment,
+            [models.TestCaseResult("First", True, 10), models.TestCaseResult("Second", False, 5, "Try again")],
+        )
+        self.path = Path(mktemp())
+        self.addCleanup(self.path.unlink, missing_ok=True)
+
+    def test_round_trip(self):
+        self.instance.to_file(self.path)
+
+        resolved_instance = models.RunnerResult.from_file(self.path, self.config)
+
+        self.assertEqual(resolved_instance, self.instance)
+        self.assertTrue(self.path.read_bytes().startswith(models.RESULT_MAGIC))
+
+    def test_round_trip__partial_points(self):
+        benchmark = models.TestCaseResult("Fast", True, 10, partial_points=5, measurements={"speed_ratio": 3.0})
+        instance = models.RunnerResult(self.user, datetime.now(), self.course, self.assignment, [benchmark])
+        instance.to_file(self.path)
+
+        resolved_instance = models.RunnerResult.from_file(self.path, self.config)
+
+        self.assertEqual(resolved_instance, instance)
+        self.assertEqual(resolved_instance.earned_points(), 5)
+
+    def test_round_trip__timed_out(self):
+        instance = models.RunnerResult(self.user, datetime.now(), self.course, self.assignment, [], timed_out=True)
+        instance.to_file(self.path)
+
+        resolved_instance = models.RunnerResult.from_file(self.path, self.config)
+
+        self.assertTrue(resolved_instance.timed_out)
+
+    def test_from_file__pickle(self):
+        self.instance.to_pickle(self.path)
+
+        resolved_instance = models.RunnerResult.from_file(self.path, self.config)
+
+        self.assertEqual(resolved_instance, self.instance)
+
+    def test_from_file__unknown_assignment(self):
+        data = self.instance.encode()
+        config = loaders.Configuration(
+            self.config.admins, self.config.admin_group, self.config.submission, self.config.collection, courses={}
+        )
+
+        resolved_instance = models.RunnerResult.from_file(data, config)
+
+        self.assertEqual(resolved_instance.course.name, "cs141")
+        self.assertEqual(resolved_instance.assignment.name, "assignment1")
+        self.assertEqual(resolved_instance.assignment.total_points, 15)
+        self.assertEqual(resolved_instance.earned_points(), 10)
+
+    def test_from_file__damaged(self):
+        data = self.instance.encode().replace(b'"user"', b'"usr"')
+
+        with self.assertRaises(models.ResultFormatError):
+            models.RunnerResult.from_file(data, self.config)
+
+    def test_load_results(self):
+        self.instance.to_file(self.path)
+
+        results = list(models.load_results([self.path, Path(mktemp())], self.config))
+
+        self.assertEqual(results, [(self.path, self.instance)])
+
+    def test_load_results__damaged(self):
+        self.instance.to_file(self.path)
+        damaged = Path(mktemp())
+        damaged.write_bytes(b"not a result")
+        self.addCleanup(damaged.unlink)
+        errors = []
+
+        results = list(
+            models.load_results([damaged, self.path], self.config, on_error=lambda path, e: errors.append(path))
+        )
+
+        self.assertEqual(results, [(self.path, self.instance)])
+        self.assertEqual(errors, [damaged])
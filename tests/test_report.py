@@ -0,0 +1,31 @@
+"""
+test_report.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Test coursework.report
+"""
+
+from datetime import datetime
+from unittest import TestCase
+
+from coursework import loaders
+from coursework import models
+from coursework import report
+
+
+class TestReport(TestCase):
+    def test_make__markup_in_names(self):
+        assignment = loaders.Configuration.Assignment(
+            "assignment1", "My assignment", datetime.now(), 15, loaders.TestSpec("py", "tests.py")
+        )
+        course = loaders.Configuration.Course("cs141", ["ian"], ["ian"], {"assignment1": assignment})
+        result = models.RunnerResult(
+            loaders.User("ian", "student"),
+            datetime.now(),
+            course,
+            assignment,
+            [models.TestCaseResult("test_parse('</b><i>')", True, 15)],
+        )
+
+        self.assertTrue(report.make(result).getvalue().startswith(b"%PDF"))
@@ -7,13 +7,21 @@ Test coursework.runner
 """
 
 import grp
+import subprocess
+import sys
+import time
+from contextlib import chdir
+from dataclasses import replace
 from datetime import datetime
 from os import close
 from os import devnull
+from os import kill
 from os import write
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from tempfile import mkstemp
 from unittest import TestCase
+from unittest import mock
 
 from rich.console import Console
 
@@ -87,6 +95,495 @@ class TestPythonUnittestRunner(TestCase):
         self.assertEqual(len(result.test_case_results), 3)
         self.assertEqual(result.assignment, self.assignment)
 
+    def write_assignment(self, *lines: str):
+        test_assignment_file = Path(self.enterContext(TemporaryDirectory())) / "my_assignment.py"
+        test_assignment_file.write_text("\n".join(lines))
+        self.assignment = replace(self.assignment, test=TestSpec("py", str(test_assignment_file)))
+
+    def test_run__submitted_files_are_copied(self):
+        self.write_assignment(
+            "from coursework.testing import Assignment, points",
+            "",
+            "class MyAssignment(Assignment):",
+            "    @points(15)",
+            "    def test_overwrite(self):",
+            f"        with open({self.example_file.name!r}, 'w') as f:",
+            "            f.write('Overwritten')",
+        )
+
+        runner.PythonUnittestRunner(self.user, self.config, self.course, self.assignment, [self.example_file]).run(
+            Console(file=self.devnull)
+        )
+
+        self.assertEqual(self.example_file.read_text(), "Example Test")
+
+    def test_run__fixtures(self):
+        self.write_assignment(
+            "from coursework.testing import Assignment, points",
+            "",
+            "calls = []",
+            "",
+            "def setUpModule():",
+            "    calls.append('setUpModule')",
+            "",
+            "class MyAssignment(Assignment):",
+            "    @classmethod",
+            "    def setUpClass(cls):",
+            "        calls.append('setUpClass')",
+            "        cls.graph = {'a': ['b']}",
+            "",
+            "    @points(15)",
+            "    def test_first(self):",
+            "        self.assertEqual(calls, ['setUpModule', 'setUpClass'])",
+            "",
+            "    @points(15)",
+            "    def test_second(self):",
+            "        self.assertEqual(calls, ['setUpModule', 'setUpClass'])",
+            "        self.assertIn('a', self.graph)",
+        )
+        test_runner = runner.PythonUnittestRunner(self.user, self.config, self.course, self.assignment)
+
+        result = test_runner.run(Console(file=self.devnull))
+
+        self.assertEqual([r.was_successful for r in result.test_case_results], [True, True])
+
+    def test_run__fixtures_fail(self):
+        self.write_assignment(
+            "from coursework.testing import Assignment, points",
+            "",
+            "class MyAssignment(Assignment):",
+            "    @classmethod",
+            "    def setUpClass(cls):",
+            "        raise RuntimeError('no dataset')",
+            "",
+            "    @points(15)",
+            "    def test_first(self):",
+            "        pass",
+            "",
+            "    @points(15)",
+            "    def test_second(self):",
+            "        pass",
+        )
+        test_runner = runner.PythonUnittestRunner(self.user, self.config, self.course, self.assignment)
+        console = Console(file=self.devnull, record=True)
+
+        result = test_runner.run(console)
+
+        self.assertEqual([r.was_successful for r in result.test_case_results], [False, False])
+        self.assertIn("no dataset", console.export_text())
+
+    def test_run__timeout(self):
+        self.write_assignment(
+            "from coursework.testing import Assignment, points, timeout",
+            "",
+            "class MyAssignment(Assignment):",
+            "    @timeout(0.1)",
+            "    @points(15)",
+            "    def test_forever(self):",
+            "        while True:",
+            "            try:",
+            "                pass",
+            "            except Exception:",
+            "                pass",
+            "",
+            "    @timeout(5)",
+            "    @points(15)",
+            "    def test_quick(self):",
+            "        pass",
+        )
+        test_runner = runner.PythonUnittestRunner(self.user, self.config, self.course, self.assignment)
+
+        result = test_runner.run(Console(file=self.devnull))
+
+        self.assertEqual([r.was_successful for r in result.test_case_results], [False, True])
+        self.assertIn("0.1 seconds", result.test_case_results[0].hint)
+
+    def test_run__timeout_lets_teardown_finish(self):
+        torn_down = Path(self.enterContext(TemporaryDirectory())) / "torn_down"
+        self.write_assignment(
+            "import time",
+            "from coursework.testing import Assignment, points, timeout",
+            "",
+            "class MyAssignment(Assignment):",
+            "    def tearDown(self):",
+            "        time.sleep(0.3)",
+            f"        open({str(torn_down)!r}, 'w').close()",
+            "",
+            "    @timeout(0.1)",
+            "    @points(15)",
+            "    def test_forever(self):",
+            "        while True:",
+            "            pass",
+        )
+        test_runner = runner.PythonUnittestRunner(self.user, self.config, self.course, self.assignment)
+
+        result = test_runner.run(Console(file=self.devnull))
+
+        self.assertFalse(result.test_case_results[0].was_successful)
+        self.assertTrue(torn_down.exists())
+
+    def test_run__timeout_catching_base_exception(self):
+        self.write_assignment(
+            "import time",
+            "from coursework.testing import Assignment, points, timeout",
+            "",
+            "class MyAssignment(Assignment):",
+            "    @timeout(0.1)",
+            "    @points(15)",
+            "    def test_forever(self):",
+            "        for _ in range(2):",
+            "            try:",
+            "                time.sleep(10)",
+            "            except BaseException:",
+            "                pass",
+            "        time.sleep(10)",
+        )
+        test_runner = runner.PythonUnittestRunner(self.user, self.config, self.course, self.assignment)
+
+        with mock.patch.object(runner, "_TIMEOUT_GRACE", 0.1):
+            result = test_runner.run(Console(file=self.devnull))
+
+        self.assertFalse(result.test_case_results[0].was_successful)
+
+    def test_time_limit__exits_if_never_stopped(self):
+        script = "\n".join(
+            [
+                "from coursework import runner",
+                "runner._TIMEOUT_GRACE = 0.1",
+                "with runner._time_limit(0.1):",
+                "    while True:",
+                "        try:",
+                "            while True:",
+                "                pass",
+                "        except BaseException:",
+                "            pass",
+            ]
+        )
+
+        completed = subprocess.run([sys.executable, "-c", script], capture_output=True, timeout=30)
+
+        self.assertNotEqual(completed.returncode, 0)
+        self.assertIn(b"kept running", completed.stderr)
+
+    def test_run__depends_on(self):
+        self.write_assignment(
+            "from coursework.testing import Assignment, depends_on, points",
+            "",
+            "class MyAssignment(Assignment):",
+            "    @points(15)",
+            "    def test_import(self):",
+            "        import student_module_that_does_not_exist",
+            "",
+            "    @depends_on('test_import')",
+            "    @points(15)",
+            "    def test_add(self):",
+            "        raise AssertionError('should not run')",
+            "",
+            "    @depends_on('test_add')",
+            "    @points(15)",
+            "    def test_sub(self):",
+            "        raise AssertionError('should not run')",
+        )
+        test_runner = runner.PythonUnittestRunner(self.user, self.config, self.course, self.assignment)
+        console = Console(file=self.devnull, record=True)
+
+        result = test_runner.run(console)
+
+        self.assertEqual([r.was_successful for r in result.test_case_results], [False, False, False])
+        self.assertIn("test_import failed", result.test_case_results[1].hint)
+        self.assertIn("test_add failed", result.test_case_results[2].hint)
+        self.assertNotIn("should not run", console.export_text())
+
+    def test_run__depends_on_another_class(self):
+        self.write_assignment(
+            "from coursework.testing import Assignment, depends_on, points",
+            "",
+            "class First(Assignment):",
+            "    @points(15)",
+            "    def test_first(self):",
+            "        pass",
+            "",
+            "class Second(Assignment):",
+            "    @depends_on('test_first')",
+            "    @points(15)",
+            "    def test_second(self):",
+            "        pass",
+        )
+        test_runner = runner.PythonUnittestRunner(self.user, self.config, self.course, self.assignment)
+
+        result = test_runner.run(Console(file=self.devnull))
+
+        self.assertEqual([r.was_successful for r in result.test_case_results], [True, False])
+        self.assertIn("test_first, which is not an assessment", result.test_case_results[1].hint)
+
+    def test_run__markup_in_case_arguments(self):
+        self.write_assignment(
+            "from coursework.testing import Assignment, cases, points",
+            "",
+            "class MyAssignment(Assignment):",
+            "    @cases(('[/]',), ('a',))",
+            "    @points(15)",
+            "    def test_case(self, value):",
+            "        self.assertEqual(value, 'a')",
+        )
+        test_runner = runner.PythonUnittestRunner(self.user, self.config, self.course, self.assignment)
+        console = Console(file=self.devnull, record=True)
+
+        result = test_runner.run(console)
+
+        self.assertEqual([r.was_successful for r in result.test_case_results], [False, True])
+        text = console.export_text()
+        self.assertIn("Running test_case ('[/]')", text)
+        self.assertIn("AssertionError: '[/]' != 'a'", text)
+
+    def test_run__benchmark(self):
+        self.write_assignment(
+            "import time",
+            "from coursework.testing import Assignment, benchmark, points",
+            "",
+            "def reference(n):",
+            "    return n",
+            "",
+            "def slow(n):",
+            "    time.sleep(0.001)",
+            "    return n",
+            "",
+            "class MyAssignment(Assignment):",
+            "    @benchmark(reference, [(1,)], repeat=2, scale=((1.5, 1.0), (float('inf'), 0.5)))",
+            "    @points(15)",
+            "    def test_speed(self):",
+            "        return slow",
+        )
+        test_runner = runner.PythonUnittestRunner(self.user, self.config, self.course, self.assignment)
+
+        result = test_runner.run(Console(file=self.devnull))
+
+        (test_case_result,) = result.test_case_results
+        self.assertEqual(test_case_result.partial_points, 8)
+        self.assertEqual(result.earned_points(), 8)
+        self.assertIn("speed_ratio", test_case_result.measurements)
+
+    def test_run__output(self):
+        self.write_assignment(
+            "import sys",
+            "from coursework.testing import Assignment, points",
+            "",
+            "class MyAssignment(Assignment):",
+            "    @points(15)",
+            "    def test_noisy(self):",
+            "        for i in range(100_000):",
+            "            print(f'line {i}')",
+            "        print('oops', file=sys.stderr)",
+            "",
+            "    @points(15)",
+            "    def test_quiet(self):",
+            "        pass",
+        )
+        test_runner = runner.PythonUnittestRunner(self.user, self.config, self.course, self.assignment)
+
+        result = test_runner.run(Console(file=self.devnull))
+
+        noisy, quiet = result.test_case_results
+        self.assertTrue(noisy.output.startswith("line 0\n"))
+        self.assertTrue(noisy.output.endswith("line 99999\noops\n"))
+        self.assertIn("characters not shown", noisy.output)
+        self.assertLess(len(noisy.output), runner.OUTPUT_HEAD + runner.OUTPUT_TAIL + 100)
+        self.assertIsNone(quiet.output)
+
+
+class TestCmdRunner(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(self.enterContext(TemporaryDirectory()))
+        self.config = Configuration(
+            ["ian"],
+            grp.getgrnam("ian"),
+            "/tmp/{student}/{course}/{assignment}",
+            "/tmp/{instructor}/{course}/{assignment}",
+            courses={},
+        )
+        self.user = User("ian", "student")
+        self.devnull = Path(devnull).open("w")
+        self.addCleanup(self.devnull.close)
+
+    def make_runner(self, script: str, timeout: float | None = None, results: str | None = None) -> runner.CmdRunner:
+        script_path = self.temp_dir / "test_script.sh"
+        script_path.write_text(script)
+        script_path.chmod(0o755)
+        assignment = Configuration.Assignment(
+            "My assignment",
+            "My assignment desc.",
+            datetime.now(),
+            20,
+            TestSpec("cmd", str(script_path)),
+            timeout,
+            results,
+        )
+        course = Configuration.Course("My course", ["ian"], ["ian"], {"My assignment": assignment})
+        return runner.CmdRunner(self.user, self.config, course, assignment)
+
+    def test_run(self):
+        test_runner = self.make_runner(
+            "\n".join(["#!/bin/sh", f"{sys.executable} -m coursework.score first 10 true", ""]), timeout=30
+        )
+
+        result = test_runner.run(Console(file=self.devnull))
+
+        self.assertFalse(result.timed_out)
+        self.assertEqual(result.earned_points(), 10)
+
+    def test_run__timeout(self):
+        pid_file = self.temp_dir / "background.pid"
+        test_runner = self.make_runner(
+            "\n".join(
+                [
+                    "#!/bin/sh",
+                    f"{sys.executable} -m coursework.score first 10 true",
+                    "sleep 60 &",
+                    f"echo $! > {pid_file}",
+                    "sleep 60",
+                    f"{sys.executable} -m coursework.score second 10 true",
+                    "",
+                ]
+            ),
+            timeout=0.5,
+        )
+        start = time.monotonic()
+
+        result = test_runner.run(Console(file=self.devnull))
+
+        self.assertLess(time.monotonic() - start, 30)
+        self.assertTrue(result.timed_out)
+        self.assertEqual([r.name for r in result.test_case_results], ["first"])
+        # Everything the script started was killed along with it.
+        with self.assertRaises(ProcessLookupError):
+            for _ in range(50):
+                kill(int(pid_file.read_text()), 0)
+                time.sleep(0.1)
+
+    def test_run__tap(self):
+        test_runner = self.make_runner(
+            "\n".join(
+                [
+                    "#!/bin/sh",
+                    f"{sys.executable} -m coursework.score first 10 true",
+                    "echo '1..2'",
+                    "echo 'ok 1 - test_parse[empty]'",
+                    "echo 'not ok 2 - test_parse[nested]'",
+                    "",
+                ]
+            ),
+            results="tap",
+        )
+
+        result = test_runner.run(Console(file=self.devnull))
+
+        self.assertEqual(
+            [(r.name, r.was_successful, r.points) for r in result.test_case_results],
+            [("first", True, 10), ("test_parse[empty]", True, 1), ("test_parse[nested]", False, 1)],
+        )
+
+    def test_run__relative_scoring(self):
+        (self.temp_dir / "scoring.toml").write_text("points = 3")
+        self.enterContext(chdir(self.temp_dir))
+        test_runner = self.make_runner(
+            "\n".join(["#!/bin/sh", "echo 'points = 100' > scoring.toml", "echo 'ok 1 - first'", ""]), results="tap"
+        )
+        test_runner.assignment = replace(test_runner.assignment, scoring="scoring.toml")
+
+        result = test_runner.run(Console(file=self.devnull))
+
+        self.assertEqual([r.points for r in result.test_case_results], [3])
+
+    def test_run__junit_outside_submission(self):
+        outside = self.temp_dir / "outside.xml"
+        outside.write_text('<testsuite><testcase name="test_secret"/></testsuite>')
+        test_runner = self.make_runner("\n".join(["#!/bin/sh", f"ln -s {outside} results.xml", ""]))
+        test_runner.assignment = replace(test_runner.assignment, results="junit:results.xml")
+        console = Console(file=self.devnull, record=True)
+
+        result = test_runner.run(console)
+
+        self.assertEqual(result.test_case_results, [])
+        self.assertIn("not in the submission", console.export_text())
+
+    def test_run__build(self):
+        builds = self.temp_dir / "builds.log"
+        source = self.temp_dir / "main.c"
+        source.write_text("int main() { return 0; }")
+        config = replace(self.config, build_cache=str(self.temp_dir / "cache"))
+        test_runner = replace(
+            self.make_runner(
+                "\n".join(["#!/bin/sh", f"test -f main.out && {sys.executable} -m coursework.score built 10 true", ""])
+            ),
+            config=config,
+            files=[source],
+        )
+        test_runner.assignment = replace(
+            test_runner.assignment, build=f"echo built >> {builds}; cp main.c main.out", artifacts=("*.out",)
+        )
+
+        first = test_runner.run(Console(file=self.devnull))
+        second = test_runner.run(Console(file=self.devnull))
+
+        self.assertEqual(first.earned_points(), 10)
+        self.assertEqual(second.earned_points(), 10)
+        self.assertEqual(builds.read_text(), "built\n")
+
+    def test_run__build_without_artifacts(self):
+        builds = self.temp_dir / "builds.log"
+        config = replace(self.config, build_cache=str(self.temp_dir / "cache"))
+        test_runner = replace(
+            self.make_runner(
+                "\n".join(["#!/bin/sh", f"test -f main.out && {sys.executable} -m coursework.score built 10 true", ""])
+            ),
+            config=config,
+        )
+        test_runner.assignment = replace(test_runner.assignment, build=f"echo built >> {builds}; touch main.out")
+
+        first = test_runner.run(Console(file=self.devnull))
+        second = test_runner.run(Console(file=self.devnull))
+
+        self.assertEqual(first.earned_points(), 10)
+        self.assertEqual(second.earned_points(), 10)
+        self.assertEqual(builds.read_text(), "built\nbuilt\n")
+
+    def test_run__build_cache_unusable(self):
+        (self.temp_dir / "cache").write_text("not a directory")
+        config = replace(self.config, build_cache=str(self.temp_dir / "cache"))
+        test_runner = replace(
+            self.make_runner(
+                "\n".join(["#!/bin/sh", f"test -f main.out && {sys.executable} -m coursework.score built 10 true", ""])
+            ),
+            config=config,
+        )
+        test_runner.assignment = replace(test_runner.assignment, build="touch main.out", artifacts=("*.out",))
+
+        with self.assertLogs(runner.logger, "WARNING"):
+            result = test_runner.run(Console(file=self.devnull))
+
+        self.assertEqual(result.earned_points(), 10)
+
+    def test_run__build_timeout(self):
+        test_runner = self.make_runner(
+            "\n".join(["#!/bin/sh", f"{sys.executable} -m coursework.score first 10 true", ""]), timeout=0.5
+        )
+        test_runner.assignment = replace(test_runner.assignment, build="sleep 30")
+
+        result = test_runner.run(Console(file=self.devnull))
+
+        self.assertTrue(result.timed_out)
+        self.assertEqual(result.test_case_results, [])
+
+    def test_run__build_failed(self):
+        test_runner = self.make_runner(
+            "\n".join(["#!/bin/sh", f"{sys.executable} -m coursework.score first 10 true", ""])
+        )
+        test_runner.assignment = replace(test_runner.assignment, build="exit 1")
+
+        result = test_runner.run(Console(file=self.devnull))
+
+        self.assertEqual(result.test_case_results, [])
+
 
 class TestRunnerHelpers(TestCase):
     def test_get_runner_by_name__success(self):
@@ -0,0 +1,72 @@
+"""
+test_scheduler.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Test coursework.scheduler
+"""
+
+import os
+import threading
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from coursework import scheduler
+
+
+class TestScheduler(TestCase):
+    def setUp(self):
+        self.path = Path(self.enterContext(TemporaryDirectory()))
+        self.scheduler = scheduler.Scheduler(self.path, slots=1, max_waiting=3, poll_interval=0.01)
+
+    def enqueue(self, arrived_at: int, user: str) -> scheduler._Ticket:
+        ticket = scheduler._Ticket(arrived_at, os.getpid(), user)
+        self.addCleanup(os.close, self.scheduler._enqueue(ticket))
+        return ticket
+
+    def test_slot__waits_for_a_free_slot(self):
+        positions = []
+        admitted = threading.Event()
+
+        def second():
+            with self.scheduler.slot("bob", on_wait=positions.append):
+                admitted.set()
+
+        with self.scheduler.slot("ian"):
+            thread = threading.Thread(target=second)
+            thread.start()
+            self.assertFalse(admitted.wait(0.1))
+
+        thread.join()
+        self.assertTrue(admitted.is_set())
+        self.assertEqual(positions, [0])
+        self.assertEqual(list(self.path.rglob("*-*")), [])
+
+    def test_waiting_order__is_fair(self):
+        first = self.enqueue(1, "ian")
+        second = self.enqueue(2, "ian")
+        third = self.enqueue(3, "bob")
+
+        self.assertEqual(self.scheduler._waiting_order(), [first, third, second])
+        self.assertEqual(self.scheduler.position(second), 2)
+
+    def test_waiting_order__running_goes_last(self):
+        with self.scheduler.slot("ian"):
+            first = self.enqueue(1, "ian")
+            second = self.enqueue(2, "bob")
+
+            self.assertEqual(self.scheduler._waiting_order(), [second, first])
+
+    def test_full(self):
+        for arrived_at in range(3):
+            self.enqueue(arrived_at, "ian")
+
+        with self.assertRaises(scheduler.SchedulerFull), self.scheduler.slot("bob"):
+            pass
+
+    def test_stale_tickets_are_removed(self):
+        (self.path / "running" / scheduler._Ticket(1, 1, "ian").name).touch()
+
+        with self.scheduler.slot("bob"):
+            self.assertEqual([path.name.split("-", 2)[2] for path in (self.path / "running").iterdir()], ["bob"])
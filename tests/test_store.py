@@ -0,0 +1,77 @@
+"""
+test_store.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Test coursework.store
+"""
+
+from datetime import datetime
+from datetime import timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import mock
+
+from coursework import loaders
+from coursework import models
+from coursework import store
+
+
+class TestBlobStore(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(self.enterContext(TemporaryDirectory()))
+        self.store = store.BlobStore(self.temp_dir / "store")
+        self.assignment = loaders.Configuration.Assignment(
+            "assignment1", "My assignment", datetime.now(), 15, loaders.TestSpec("cmd", "my_script.sh")
+        )
+        self.course = loaders.Configuration.Course("cs141", ["ian"], ["ian"], {"assignment1": self.assignment})
+        self.file = self.temp_dir / "example.txt"
+        self.file.write_text("Example")
+
+    def result(self, ran_at: datetime):
+        return models.RunnerResult(loaders.User("ian", "student"), ran_at, self.course, self.assignment)
+
+    def test_put__deduplicates(self):
+        digest = self.store.put(self.file)
+        copy = self.temp_dir / "copy.txt"
+        copy.write_text("Example")
+
+        self.assertEqual(self.store.put(copy), digest)
+        self.assertEqual(len(list(self.store.blobs.glob("*/*"))), 1)
+
+    def test_history_and_restore(self):
+        digest = self.store.put(self.file)
+        self.store.write_manifest(self.result(datetime.now() - timedelta(days=1)), {"example.txt": digest})
+        self.store.write_manifest(self.result(datetime.now()), {"example.txt": digest})
+
+        history = self.store.history("ian", "cs141", "assignment1")
+        self.store.restore(history[0], self.temp_dir / "restored")
+
+        self.assertEqual(len(history), 2)
+        self.assertEqual((self.temp_dir / "restored" / "example.txt").read_text(), "Example")
+        self.assertTrue((self.temp_dir / "restored" / ".runner-output").exists())
+
+    def test_gc(self):
+        digest = self.store.put(self.file)
+        self.store.write_manifest(self.result(datetime.now() - timedelta(days=1)), {"example.txt": digest})
+        self.store.write_manifest(self.result(datetime.now()), {})
+        unreferenced = self.temp_dir / "unreferenced.txt"
+        unreferenced.write_text("Unreferenced")
+        self.store.put(unreferenced)
+
+        with mock.patch.object(store, "GC_GRACE_PERIOD", -60):
+            removed = self.store.gc(keep=1)
+
+        self.assertEqual(removed, (1, 3))
+        self.assertFalse(self.store.blob_path(digest).exists())
+        self.assertEqual(len(self.store.history("ian", "cs141", "assignment1")), 1)
+
+    def test_checkout__copies(self):
+        digest = self.store.put(self.file)
+        checked_out = self.temp_dir / "checked_out.txt"
+        self.store.checkout(digest, checked_out)
+
+        checked_out.write_text("Changed")
+
+        self.assertEqual(self.store.blob_path(digest).read_text(), "Example")
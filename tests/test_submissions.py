@@ -0,0 +1,166 @@
+"""
+test_submissions.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Test coursework.submissions
+"""
+
+import grp
+import gzip
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from coursework import loaders
+from coursework import models
+from coursework import submissions
+
+
+class TestSave(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(self.enterContext(TemporaryDirectory()))
+        self.assignment = loaders.Configuration.Assignment(
+            "assignment1", "My assignment", datetime.now(), 15, loaders.TestSpec("cmd", "my_script.sh")
+        )
+        self.course = loaders.Configuration.Course("cs141", ["ian"], ["ian"], {"assignment1": self.assignment})
+        self.config = loaders.Configuration(
+            ["ian"],
+            grp.getgrnam("ian"),
+            str(self.temp_dir / "{student}/{course}/{assignment}"),
+            str(self.temp_dir / "{instructor}/{course}/{assignment}"),
+            courses={"cs141": self.course},
+        )
+        self.result = models.RunnerResult(loaders.User("ian", "student"), datetime.now(), self.course, self.assignment)
+        self.save_path = self.temp_dir / "ian" / "cs141" / "assignment1"
+
+    def test_save__replaces_previous(self):
+        first = self.temp_dir / "first.txt"
+        second = self.temp_dir / "second.txt"
+        first.touch()
+        second.touch()
+
+        submissions.save(self.config, self.result, self.save_path, [first]).join()
+        submissions.save(self.config, self.result, self.save_path, [second]).join()
+
+        self.assertEqual(sorted(path.name for path in self.save_path.iterdir()), [".runner-output", "second.txt"])
+
+    def test_save__results_page(self):
+        self.assertIsNone(submissions.read_results_page(self.config, "ian", "cs141", "assignment1"))
+
+        submissions.save(self.config, self.result, self.save_path, [], results_page="<span>Passed!</span>").join()
+
+        self.assertEqual(
+            submissions.read_results_page(self.config, "ian", "cs141", "assignment1"), "<span>Passed!</span>"
+        )
+
+    def test_read_results_page__symlink(self):
+        secret = self.temp_dir / "secret.html.gz"
+        with gzip.open(secret, "wt") as f:
+            f.write("secret")
+        self.save_path.mkdir(parents=True)
+        (self.save_path / submissions.RESULTS_PAGE).symlink_to(secret)
+
+        self.assertIsNone(submissions.read_results_page(self.config, "ian", "cs141", "assignment1"))
+
+    def test_read_results_page__symlinked_directory(self):
+        other_path = self.temp_dir / "bob" / "cs141" / "assignment1"
+        other_path.mkdir(parents=True)
+        with gzip.open(other_path / submissions.RESULTS_PAGE, "wt") as f:
+            f.write("secret")
+        self.save_path.parent.mkdir(parents=True)
+        self.save_path.symlink_to(other_path)
+
+        self.assertIsNone(submissions.read_results_page(self.config, "ian", "cs141", "assignment1"))
+
+    def test_read_results_page__other_owner(self):
+        submissions.save(self.config, self.result, self.save_path, [], results_page="<span>Passed!</span>").join()
+        os.chown(self.save_path / submissions.RESULTS_PAGE, 12345, 12345)
+
+        self.assertIsNone(submissions.read_results_page(self.config, "ian", "cs141", "assignment1"))
+
+    def test_read_results_page__damaged(self):
+        self.save_path.mkdir(parents=True)
+        (self.save_path / submissions.RESULTS_PAGE).write_text("not gzip")
+
+        self.assertIsNone(submissions.read_results_page(self.config, "ian", "cs141", "assignment1"))
+
+    def test_swap_in__removes_old(self):
+        self.save_path.mkdir(parents=True)
+        (self.save_path / "old.txt").touch()
+        staging_path = self.temp_dir / "staging"
+        staging_path.mkdir()
+        (staging_path / "new.txt").touch()
+
+        submissions.swap_in(staging_path, self.save_path).join()
+
+        self.assertEqual(
+            sorted(path.name for path in self.save_path.parent.iterdir()), [".assignment1.lock", "assignment1"]
+        )
+        self.assertEqual([path.name for path in self.save_path.iterdir()], ["new.txt"])
+
+    def test_swap_in__recovers_old(self):
+        self.save_path.mkdir(parents=True)
+        (self.save_path / "old.txt").touch()
+        staging_path = self.temp_dir / "staging"
+        staging_path.mkdir()
+        submissions.swap_in(staging_path, self.save_path).join()
+        (self.save_path / "new.txt").touch()
+        # A swap that died between its renames.
+        self.save_path.rename(self.save_path.with_name(".assignment1.old-99999999999999999999-crashed"))
+
+        self.assertTrue(submissions.recover(self.save_path))
+        self.assertEqual(
+            sorted(path.name for path in self.save_path.parent.iterdir()), [".assignment1.lock", "assignment1"]
+        )
+        self.assertEqual([path.name for path in self.save_path.iterdir()], ["new.txt"])
+
+    def test_swap_in__concurrent(self):
+        self.save_path.mkdir(parents=True)
+        errors = []
+
+        def swap():
+            try:
+                for _ in range(20):
+                    staging_path = Path(mkdtemp(dir=self.save_path.parent))
+                    submissions.swap_in(staging_path, self.save_path).join()
+                    submissions.recover(self.save_path)
+            except OSError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=swap) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertTrue(self.save_path.is_dir())
+
+    def test_swap_in__removes_stale_staging(self):
+        self.save_path.mkdir(parents=True)
+        stale = self.save_path.with_name(".assignment1.staging-stale")
+        stale.mkdir()
+        fresh = self.save_path.with_name(".assignment1.staging-fresh")
+        fresh.mkdir()
+        os.utime(stale, (0, 0))
+        staging_path = self.temp_dir / "staging"
+        staging_path.mkdir()
+
+        submissions.swap_in(staging_path, self.save_path).join()
+
+        self.assertFalse(stale.exists())
+        self.assertTrue(fresh.exists())
+
+    def test_save__move(self):
+        upload = self.temp_dir / "upload.txt"
+        upload.write_text("hello")
+
+        submissions.save(self.config, self.result, self.save_path, [upload], move=True).join()
+
+        self.assertFalse(upload.exists())
+        self.assertEqual((self.save_path / "upload.txt").read_text(), "hello")
@@ -6,6 +6,8 @@ Ian Kollipara <ian.kollipara@cune.edu>
 Test coursework.testing
 """
 
+import time
+import tracemalloc
 from unittest import TestCase
 
 from coursework import testing
@@ -25,3 +27,125 @@ class TestAssignment(TestCase):
         self.assertEqual(ExampleAssignment.__assessments__[0].name, "My test case")
         self.assertEqual(ExampleAssignment.__assessments__[0].hint, "This should always pass!")
         self.assertTrue(callable(ExampleAssignment.__assessments__[0].method))
+
+    def test_timeout(self):
+        class ExampleAssignment(testing.Assignment):
+            @testing.timeout(2.5)
+            @testing.points(15)
+            def test_example_test(self):
+                self.assertTrue(True)
+
+            @testing.points(15)
+            def test_other_test(self):
+                self.assertTrue(True)
+
+        self.assertEqual([a.timeout for a in ExampleAssignment.__assessments__], [2.5, None])
+
+    def test_depends_on(self):
+        class ExampleAssignment(testing.Assignment):
+            @testing.depends_on("test_b")
+            @testing.points(15)
+            def test_a(self):
+                self.assertTrue(True)
+
+            @testing.points(15)
+            def test_b(self):
+                self.assertTrue(True)
+
+            @testing.points(15)
+            def test_c(self):
+                self.assertTrue(True)
+
+        self.assertEqual([a.name for a in ExampleAssignment.__assessments__], ["test_b", "test_a", "test_c"])
+        self.assertEqual(ExampleAssignment.__assessments__[1].depends_on, ("test_b",))
+
+    def test_depends_on__missing(self):
+        class ExampleAssignment(testing.Assignment):
+            @testing.depends_on("test_missing")
+            @testing.points(15)
+            def test_a(self):
+                self.assertTrue(True)
+
+            @testing.depends_on("test_b")
+            @testing.points(15)
+            def test_b(self):
+                self.assertTrue(True)
+
+        self.assertEqual(
+            [a.error for a in ExampleAssignment.__assessments__],
+            ["test_a depends on test_missing, which is not an assessment.", "test_b depends on itself."],
+        )
+
+    def test_benchmark(self):
+        def reference(n):
+            return sum(range(n))
+
+        def slow(n):
+            time.sleep(0.002)
+            return sum(range(n))
+
+        class ExampleAssignment(testing.Assignment):
+            @testing.benchmark(reference, [(10,), (20,)], repeat=3, scale=((1.5, 1.0), (float("inf"), 0.5)))
+            @testing.points(10)
+            def test_fast(self):
+                return reference
+
+            @testing.benchmark(reference, [(10,)], repeat=3, scale=((1.5, 1.0), (float("inf"), 0.5)))
+            @testing.points(10)
+            def test_slow(self):
+                return slow
+
+        fast, slow_ = ExampleAssignment.__assessments__
+        self.assertTrue(fast.method.run().wasSuccessful())
+        self.assertTrue(slow_.method.run().wasSuccessful())
+
+        self.assertEqual(len(fast.method.measurements["student_seconds"]), 2)
+        self.assertEqual(slow_.method.credit, 0.5)
+        self.assertGreater(slow_.method.measurements["speed_ratio"], 1.5)
+
+    def test_benchmark__wrong_answer(self):
+        class ExampleAssignment(testing.Assignment):
+            @testing.benchmark(lambda n: n, [(10,)])
+            @testing.points(10)
+            def test_wrong(self):
+                return lambda n: n + 1
+
+        (assessment,) = ExampleAssignment.__assessments__
+        self.assertFalse(assessment.method.run().wasSuccessful())
+
+    def test_memory_budget(self):
+        class ExampleAssignment(testing.Assignment):
+            @testing.memory_budget(64 * 1024)
+            @testing.points(10)
+            def test_generator(self):
+                sum(i for i in range(100_000))
+
+            @testing.points(10)
+            def test_list(self):
+                with self.assertMaxMemory(64 * 1024):
+                    sum([i for i in range(100_000)])
+
+        generator, list_ = ExampleAssignment.__assessments__
+        self.assertTrue(generator.method.run().wasSuccessful())
+        self.assertFalse(list_.method.run().wasSuccessful())
+
+        self.assertLess(generator.method.measurements["peak_memory"], 64 * 1024)
+        self.assertGreater(list_.method.measurements["peak_memory"], 64 * 1024)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_cases(self):
+        class ExampleAssignment(testing.Assignment):
+            @testing.cases((1, 1), (2, 4), {"n": 3, "expected": 10})
+            @testing.points(5)
+            def test_square(self, n, expected):
+                self.assertEqual(n * n, expected)
+
+        assessments = ExampleAssignment.__assessments__
+        self.assertEqual(
+            [a.name for a in assessments],
+            ["test_square (1, 1)", "test_square (2, 4)", "test_square (n=3, expected=10)"],
+        )
+        self.assertEqual([a.points for a in assessments], [5, 5, 5])
+        # Test cases are only created when they are run.
+        self.assertNotIn("method", vars(assessments[0]))
+        self.assertEqual([a.method.run().wasSuccessful() for a in assessments], [True, True, False])
@@ -0,0 +1,101 @@
+"""
+test_web_auth.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Test coursework.web.auth
+"""
+
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from coursework.web import auth
+
+METADATA = """<?xml version="1.0"?>
+<md:EntityDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata" entityID="{entity_id}">
+  <md:IDPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol">
+    <md:SingleSignOnService
+      Binding="urn:oasis:names:tc:SAML:2.0:bindings:HTTP-Redirect"
+      Location="https://idp.example.com/sso"/>
+  </md:IDPSSODescriptor>
+</md:EntityDescriptor>
+"""
+
+
+class TestIdPMetadataCache(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(self.enterContext(TemporaryDirectory()))
+        self.metadata = self.temp_dir / "metadata.xml"
+        self.metadata.write_text(METADATA.format(entity_id="https://idp.example.com/first"))
+        self.url = self.metadata.as_uri()
+        self.path = self.temp_dir / "cache" / "idp-metadata.json"
+
+    def entity_id(self, cache: auth.IdPMetadataCache):
+        return cache.get()["idp"]["entityId"]
+
+    def test_get__fetches_and_writes_disk_copy(self):
+        cache = auth.IdPMetadataCache(self.url, path=self.path)
+
+        self.assertEqual(self.entity_id(cache), "https://idp.example.com/first")
+        self.assertTrue(self.path.exists())
+
+    def test_get__fresh_copy_is_not_refetched(self):
+        cache = auth.IdPMetadataCache(self.url, path=self.path)
+        cache.get()
+        self.metadata.write_text(METADATA.format(entity_id="https://idp.example.com/second"))
+
+        self.assertEqual(self.entity_id(cache), "https://idp.example.com/first")
+
+    def test_get__disk_copy_survives_restart(self):
+        auth.IdPMetadataCache(self.url, path=self.path).get()
+        self.metadata.unlink()
+
+        self.assertEqual(
+            self.entity_id(auth.IdPMetadataCache(self.url, path=self.path)), "https://idp.example.com/first"
+        )
+
+    def test_get__stale_copy_is_refreshed_in_background(self):
+        cache = auth.IdPMetadataCache(self.url, path=self.path, ttl=0)
+        cache.get()
+        self.metadata.write_text(METADATA.format(entity_id="https://idp.example.com/second"))
+
+        self.assertEqual(self.entity_id(cache), "https://idp.example.com/first")
+        for _ in range(50):
+            if self.entity_id(cache) == "https://idp.example.com/second":
+                break
+            time.sleep(0.05)
+        self.assertEqual(self.entity_id(cache), "https://idp.example.com/second")
+
+    def test_get__failed_refresh_keeps_last_good_copy(self):
+        cache = auth.IdPMetadataCache(self.url, path=self.path, ttl=0)
+        cache.get()
+        self.metadata.unlink()
+
+        cache.get()
+        time.sleep(0.2)
+
+        self.assertEqual(self.entity_id(cache), "https://idp.example.com/first")
+
+    def test_get__failed_refresh_backs_off(self):
+        cache = auth.IdPMetadataCache(self.url, path=self.path, ttl=0)
+        cache.get()
+        self.metadata.unlink()
+        cache.get()
+        time.sleep(0.2)
+        self.metadata.write_text(METADATA.format(entity_id="https://idp.example.com/second"))
+
+        cache.get()
+        time.sleep(0.2)
+
+        self.assertEqual(self.entity_id(cache), "https://idp.example.com/first")
+
+    def test_get__failed_first_fetch_backs_off(self):
+        cache = auth.IdPMetadataCache(self.url, path=self.path)
+        self.metadata.unlink()
+
+        with self.assertRaises(Exception):
+            cache.get()
+        with self.assertRaises(auth.IdPMetadataUnavailable):
+            cache.get()
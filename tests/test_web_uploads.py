@@ -0,0 +1,60 @@
+"""
+test_web_uploads.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Test coursework.web.uploads
+"""
+
+import io
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import flask
+
+from coursework.web import uploads
+
+
+class TestUploadRequest(TestCase):
+    def setUp(self):
+        self.uploads = Path(self.enterContext(TemporaryDirectory()))
+        self.app = flask.Flask(__name__)
+        self.app.request_class = uploads.UploadRequest
+        self.app.config["GRADING_UPLOADS"] = str(self.uploads)
+        self.app.config["GRADING_MAX_FILE_SIZE"] = 16
+        self.seen = {}
+
+        @self.app.post("/")
+        def upload():
+            files = flask.request.files.getlist("files")
+            self.seen["names"] = sorted(path.name for path in flask.request.upload_path.iterdir())
+            self.seen["contents"] = [file.read() for file in files]
+            return ""
+
+        self.client = self.app.test_client()
+
+    def post(self, *files):
+        return self.client.post(
+            "/", data={"files": [(io.BytesIO(data), name) for name, data in files]}, content_type="multipart/form-data"
+        )
+
+    def test_streams_into_upload_directory(self):
+        response = self.post(("a.py", b"print(1)"), ("../../b.py", b"print(2)"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.seen["names"], ["a.py", "b.py"])
+        self.assertEqual(self.seen["contents"], [b"print(1)", b"print(2)"])
+        # Uploads not taken over by the grading helper are removed with the request.
+        self.assertEqual(list(self.uploads.iterdir()), [])
+
+    def test_file_too_large(self):
+        response = self.post(("a.py", b"x" * 17))
+
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(list(self.uploads.iterdir()), [])
+
+    def test_duplicate_name(self):
+        response = self.post(("a.py", b"1"), ("dir/a.py", b"2"))
+
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,192 @@
+"""
+test_web_worker.py
+Ian Kollipara <ian.kollipara@cune.edu>
+2026-10-19
+
+Test coursework.web.worker
+"""
+
+import grp
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import mock
+
+import rich.console
+
+from coursework import jobs
+from coursework import loaders
+from coursework.web import worker
+
+
+class TestGraderServer(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(self.enterContext(TemporaryDirectory()))
+        assignment = loaders.Configuration.Assignment(
+            "assignment1", "My assignment", datetime.now(), 15, loaders.TestSpec("cmd", "my_script.sh")
+        )
+        course = loaders.Configuration.Course("cs141", ["ian"], ["ian"], {"assignment1": assignment})
+        config = loaders.Configuration(
+            ["ian"],
+            grp.getgrnam("ian"),
+            str(self.temp_dir / "{student}/{course}/{assignment}"),
+            str(self.temp_dir / "{instructor}/{course}/{assignment}"),
+            courses={"cs141": course},
+        )
+        self.uploads = self.temp_dir / "uploads"
+        self.uploads.mkdir()
+        socket_path = self.temp_dir / "grader.sock"
+
+        self.server = worker.GraderServer(str(socket_path), config, str(self.temp_dir / "spool"), str(self.uploads))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.client = worker.GraderClient(str(socket_path))
+
+    def upload(self) -> Path:
+        upload = self.uploads / "upload"
+        upload.mkdir()
+        (upload / "main.py").write_text("print('hello')")
+        return upload
+
+    def test_submit(self):
+        job = self.client.submit(self.upload(), "ian", "cs141", "assignment1")
+
+        self.assertEqual(job.status, "queued")
+        self.assertEqual(self.client.job(job.id), job)
+        self.assertEqual(self.client.position(job.id), 0)
+        self.assertEqual([path.name for path in self.server.queue.files_path(job.id).iterdir()], ["main.py"])
+        self.assertFalse((self.uploads / "upload").exists())
+
+    def test_submit__outside_uploads(self):
+        upload = self.temp_dir / "elsewhere"
+        upload.mkdir()
+
+        with self.assertRaises(worker.GraderError):
+            self.client.submit(upload, "ian", "cs141", "assignment1")
+
+    def test_submit__not_regular_files(self):
+        secret = self.temp_dir / "secret"
+        secret.write_text("secret")
+        for name, make in (("symlink", lambda path: path.symlink_to(secret)), ("directory", Path.mkdir)):
+            with self.subTest(name):
+                upload = self.uploads / name
+                upload.mkdir()
+                make(upload / "main.py")
+
+                with self.assertRaises(worker.GraderError):
+                    self.client.submit(upload, "ian", "cs141", "assignment1")
+                self.assertEqual(list(self.server.queue.spool.glob("*/main.py")), [])
+
+    def test_events(self):
+        job = self.client.submit(self.upload(), "ian", "cs141", "assignment1")
+        self.server.queue.publish(job.id, "done", {"earned_points": 15})
+
+        (event,) = self.client.events(job.id)
+
+        self.assertEqual(event.event, "done")
+        self.assertEqual(event.data, {"earned_points": 15})
+        self.assertEqual(self.client.events(job.id, event.offset), [])
+
+    def test_job__not_found(self):
+        with self.assertRaises(jobs.JobNotFound):
+            self.client.job("missing")
+
+    def test_submitted(self):
+        job = self.client.submit(self.upload(), "ian", "cs141", "assignment1")
+        self.assertEqual(self.client.submitted("ian", "cs141"), set())
+
+        # The answer is cached until one of the student's jobs is graded.
+        (self.temp_dir / "ian" / "cs141" / "assignment1").mkdir(parents=True)
+        self.assertEqual(self.client.submitted("ian", "cs141"), set())
+
+        self.server.queue.claim()
+        self.server.queue.finish(job.id, b"")
+        self.assertEqual(self.client.submitted("ian", "cs141"), {"assignment1"})
+
+    def test_submitted__ttl(self):
+        self.server.status.ttl = 0
+        self.assertEqual(self.client.submitted("ian", "cs141"), set())
+
+        (self.temp_dir / "ian" / "cs141" / "assignment1").mkdir(parents=True)
+
+        self.assertEqual(self.client.submitted("ian", "cs141"), {"assignment1"})
+
+
+class TestOutputEvents(TestCase):
+    def setUp(self):
+        self.queue = jobs.JobQueue(Path(self.enterContext(TemporaryDirectory())))
+        self.output = worker._OutputEvents(self.queue, "job")
+        self.console = self.output.console = rich.console.Console(record=True, file=self.output, width=100)
+
+    def test_write__batches_exports(self):
+        self.console.print("first")
+        self.console.print("second")
+
+        self.assertEqual(self.queue.events("job"), [])
+
+        self.output.export()
+
+        (event,) = self.queue.events("job")
+        self.assertIn("first", event.data)
+        self.assertIn("second", event.data)
+        self.assertEqual(self.output.html, [event.data])
+
+
+class TestGrade(TestCase):
+    def test_grade_job__deadline(self):
+        temp_dir = Path(self.enterContext(TemporaryDirectory()))
+        queue = jobs.JobQueue(temp_dir / "spool")
+        queue.enqueue(queue.create(), "ian", "cs141", "assignment1")
+        job = queue.claim()
+
+        with mock.patch.object(worker, "grade", side_effect=lambda *args: time.sleep(60)):
+            worker._grade_job(queue, str(temp_dir / "spool"), job, None, deadline=0.5)
+
+        self.assertEqual(queue.get(job.id).status, "failed")
+        (event,) = queue.events(job.id)
+        self.assertIn("0.5 seconds", event.data["message"])
+
+    def test_grade_job__crashed(self):
+        temp_dir = Path(self.enterContext(TemporaryDirectory()))
+        queue = jobs.JobQueue(temp_dir / "spool")
+        queue.enqueue(queue.create(), "ian", "cs141", "assignment1")
+        job = queue.claim()
+        (queue.files_path(job.id) / "main.py").write_text("print('hello')")
+
+        with mock.patch.object(worker, "grade", side_effect=lambda *args: os._exit(1)):
+            worker._grade_job(queue, str(temp_dir / "spool"), job, None, deadline=30)
+
+        self.assertEqual(queue.get(job.id).status, "failed")
+        self.assertFalse(queue.files_path(job.id).exists())
+
+    def test_grade__scheduler_full(self):
+        temp_dir = Path(self.enterContext(TemporaryDirectory()))
+        assignment = loaders.Configuration.Assignment(
+            "assignment1", "My assignment", datetime.now(), 15, loaders.TestSpec("cmd", "my_script.sh")
+        )
+        course = loaders.Configuration.Course("cs141", ["ian"], ["ian"], {"assignment1": assignment})
+        config = loaders.Configuration(
+            ["ian"],
+            grp.getgrnam("ian"),
+            str(temp_dir / "{student}/{course}/{assignment}"),
+            str(temp_dir / "{instructor}/{course}/{assignment}"),
+            courses={"cs141": course},
+            scheduler=str(temp_dir / "scheduler"),
+            max_waiting=0,
+        )
+        queue = jobs.JobQueue(temp_dir / "spool")
+        queue.enqueue(queue.create(), "ian", "cs141", "assignment1")
+        job = queue.claim()
+
+        worker.grade(queue, job, config)
+
+        self.assertEqual(queue.get(job.id).status, "failed")
+        (event,) = queue.events(job.id)
+        self.assertEqual(event.event, "failed")
+        self.assertIn("try again", event.data["message"])
+        self.assertFalse(queue.files_path(job.id).exists())